@@ -0,0 +1,150 @@
+import copy
+import httpx
+import itertools
+import asyncio
+from music_history_ontology.data_ingestion.musicbrainz.musicbrainz import (
+    MUSICBRAINZ_API_URL,
+    REQUESTS_PER_SECOND,
+    MusicBrainzEndpoints,
+)
+from music_history_ontology.data_ingestion.musicbrainz.cache import create_cache_key
+from music_history_ontology.data_ingestion.resilience import AsyncTokenBucket
+
+
+class AsyncMusicBrainzClient(MusicBrainzEndpoints):
+    def __init__(
+        self,
+        app_name="MusicOntologyPopulator",
+        app_version="0.1",
+        contact="contact@example.com",
+        base_url=MUSICBRAINZ_API_URL,
+        pool_size=4,
+        connect_timeout=5.0,
+        read_timeout=30.0,
+        cache=None,
+        rate_limiter=None,
+    ):
+        """
+        Asynchronous client for the MusicBrainz API, with the same methods as MusicBrainzClient
+        (e.g., await client.search_artist("Queen")), so that requests can be made from the event loop
+        of the async Wikipedia crawl and responses parsed while the next request is in flight.
+        - Concurrent identical requests are coalesced: only the first is made, and the others share its
+          response (each caller gets its own copy).
+
+        Args:
+            app_name (str): The application name sent in the User-Agent.
+            app_version (str): The application version sent in the User-Agent.
+            contact (str): The contact sent in the User-Agent.
+            base_url (str): The URL of the API (e.g., a local stub server for benchmarks).
+            pool_size (int): The maximum number of connections kept open to the API.
+            connect_timeout (float): The timeout for opening a connection (seconds).
+            read_timeout (float): The timeout for each read of the response (seconds).
+            cache (ResponseCache): The response cache, requests answered from it skip the rate limit
+                                   (None to always make the requests).
+            rate_limiter (AsyncTokenBucket): The rate limiter of the requests (defaults to 1 request per
+                                             second), a TokenBucket or SharedTokenBucket is waited on in
+                                             a thread, e.g., to share the rate limit with other processes.
+        """
+        self.headers = {
+            "User-Agent": f"{app_name}/{app_version} ( {contact} )",
+            "Accept": "application/json",
+        }
+        self.base_url = base_url
+        self.http_client = httpx.AsyncClient(
+            headers=self.headers,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )  # Decompresses gzip responses transparently
+        self.cache = cache
+        if rate_limiter is None:
+            rate_limiter = AsyncTokenBucket(rate=REQUESTS_PER_SECOND, capacity=1.0)
+        self.rate_limiter = rate_limiter
+        self.in_flight = {}  # Cache key -> task making the request
+        self.num_network_requests = 0
+        self.num_coalesced = 0
+        self.rate_limit_wait = 0.0  # Total time spent waiting for the rate limit (seconds)
+
+    async def aclose(self):
+        """Closes the pooled connections."""
+        await self.http_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def _request(self, endpoint, params=None):
+        """
+        Makes a request to the MusicBrainz API, answering it from the cache if possible and sharing
+        the response of an identical request that is already in flight.
+        """
+        if params is None:
+            params = {}
+        params["fmt"] = "json"  # Ensure JSON format
+        key = create_cache_key(endpoint, params)
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.num_coalesced += 1
+            return copy.deepcopy(await asyncio.shield(task))
+
+        task = asyncio.ensure_future(self._request_uncoalesced(endpoint, params))
+        self.in_flight[key] = task
+        task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # Not cancelled for the other callers, each caller gets a copy as the response may be modified (e.g., sorted)
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _request_uncoalesced(self, endpoint, params):
+        if self.cache is None:
+            return await self._fetch(endpoint, params)
+
+        # The cache is read and written in a thread, so its SQLite work does not block the event loop
+        response = await asyncio.to_thread(self.cache.get, endpoint, params)
+        if response is not None:
+            return response
+        if self.cache.offline:
+            print(f"Offline mode: no cached response for {endpoint} {params}")
+            return None
+        response = await self._fetch(endpoint, params)
+        if response is not None:  # Errors are not cached
+            await asyncio.to_thread(self.cache.set, endpoint, params, response)
+        return response
+
+    async def _fetch(self, endpoint, params):
+        """Makes a rate-limited request to the MusicBrainz API."""
+        if asyncio.iscoroutinefunction(self.rate_limiter.acquire):
+            self.rate_limit_wait += await self.rate_limiter.acquire()
+        else:
+            self.rate_limit_wait += await asyncio.to_thread(self.rate_limiter.acquire)
+        self.num_network_requests += 1
+        url = f"{self.base_url}{endpoint}"
+        try:
+            response = await self.http_client.get(url, params=params)
+            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+            return response.json()
+        except httpx.HTTPError as e:
+            print(f"Error making request to {url}: {e}")
+            return None
+        except ValueError:
+            print(f"Error decoding JSON response from {url}")
+            print(f"Response text: {response.text[:500]}...")  # Log part of the response
+            return None
+
+    async def iter_browse(self, entity, linked_entity, mbid, inc=[], limit=100, max_pages=None):
+        """
+        Yields all the entities linked to another entity, requesting the next page only when the
+        previous one has been consumed (stops early if a request fails, or after max_pages requests).
+        """
+        offset = 0
+        for _ in itertools.count() if max_pages is None else range(max_pages):
+            page = await self.browse(
+                entity, linked_entity, mbid, inc=inc, limit=limit, offset=offset
+            )
+            results = page.get(f"{entity}s", []) if page else []
+            for result in results:
+                yield result
+            offset += len(results)
+            if not results or offset >= page.get(f"{entity}-count", 0):
+                return
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+DAY = 24 * 60 * 60
+
+# How long cached responses stay fresh for each entity type (seconds)
+DEFAULT_TTLS = {
+    "artist": 30 * DAY,
+    "release-group": 30 * DAY,
+    "release": 90 * DAY,
+    "recording": 90 * DAY,
+    "work": 90 * DAY,
+    "event": 90 * DAY,
+    "instrument": 365 * DAY,
+    "tag": 365 * DAY,
+}
+DEFAULT_TTL = 30 * DAY
+
+
+def normalize_params(params):
+    """
+    Normalizes request parameters so that equivalent requests share a cache entry: whitespace
+    in values is collapsed, "inc" values are sorted and the response format is dropped.
+    """
+    normalized = {}
+    for key, value in (params or {}).items():
+        if key == "fmt" or value is None:
+            continue
+        value = " ".join(str(value).split())
+        if key == "inc":
+            value = "+".join(sorted(part for part in value.split("+") if part))
+        normalized[key] = value
+    return normalized
+
+
+def create_cache_key(endpoint, params):
+    """Returns the cache key of a request, e.g., 'artist?limit=1&query=queen'."""
+    normalized = normalize_params(params)
+    query = "&".join(f"{key}={normalized[key]}" for key in sorted(normalized))
+    return f"{endpoint.strip('/')}?{query}"
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        db_path="generated_data/musicbrainz/response_cache.db",
+        ttls=None,
+        default_ttl=DEFAULT_TTL,
+        offline=False,
+    ):
+        """
+        On-disk cache of MusicBrainz API responses, keyed by the endpoint and the normalized parameters,
+        so that reruns replay the responses instead of repeating the rate-limited requests.
+        - Responses expire after the TTL of their entity type (the first part of the endpoint).
+        - In offline mode, cached responses are used regardless of their age, and requests that are
+          not cached are not made (the client returns None for them).
+
+        Args:
+            db_path (str): The path to the SQLite database.
+            ttls (Dict[str, float]): The TTL (seconds) for each entity type, defaults to DEFAULT_TTLS.
+            default_ttl (float): The TTL for entity types not in ttls.
+            offline (bool): Whether to only replay cached responses.
+        """
+        self.db_path = db_path
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.offline = offline
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    entity TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_expired = 0
+
+    def get_ttl(self, endpoint):
+        return self.ttls.get(endpoint.strip("/").split("/")[0], self.default_ttl)
+
+    def get(self, endpoint, params=None):
+        """
+        Returns the cached response for a request, or None if it is not cached (or expired).
+
+        Args:
+            endpoint (str): The endpoint, e.g., "artist" or "artist/<mbid>".
+            params (Dict[str, str]): The request parameters.
+        """
+        key = create_cache_key(endpoint, params)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and not self.offline:
+                if time.time() - row[1] > self.get_ttl(endpoint):
+                    self.num_expired += 1
+                    row = None
+            if row is None:
+                self.num_misses += 1
+                return None
+            self.num_hits += 1
+        return json.loads(row[0])
+
+    def set(self, endpoint, params, response):
+        """
+        Caches the response for a request.
+
+        Args:
+            endpoint (str): The endpoint.
+            params (Dict[str, str]): The request parameters.
+            response (Dict[str, Any]): The JSON response.
+        """
+        key = create_cache_key(endpoint, params)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, entity, body, fetched_at) VALUES (?, ?, ?, ?)",
+                (key, endpoint.strip("/").split("/")[0], json.dumps(response), time.time()),
+            )
+
+    def get_stats(self):
+        with self.lock:
+            num_requests = self.num_hits + self.num_misses
+            return {
+                "hits": self.num_hits,
+                "misses": self.num_misses,
+                "expired": self.num_expired,
+                "hit_rate": self.num_hits / num_requests if num_requests > 0 else 0.0,
+            }
+
+    def report(self):
+        stats = self.get_stats()
+        print(
+            f"Response cache | Hits: {stats['hits']} | Misses: {stats['misses']} | "
+            f"Expired: {stats['expired']} | Hit rate: {stats['hit_rate']:.1%}"
+            f"{' | Offline' if self.offline else ''}"
+        )
+
+    def close(self):
+        self.connection.close()
@@ -1,16 +1,16 @@
 import os
 import json
-import glob
 
-from copy import deepcopy
 from slugify import slugify
+from music_history_ontology.data_ingestion.object_properties import ObjectPropertyLinks
+from music_history_ontology.data_ingestion.musicbrainz.entity_sink import EntityReader
 
 def convert_files(data_folder, output_folder, class_mappings_file):
     """
-    Convert JSON files from the data folder to the new format and save to the output folder.
+    Convert the entities in the data folder to the new format and save to the output folder.
 
     Args:
-        data_folder (str): Path to the folder containing original JSON files
+        data_folder (str): Path to the folder containing the original entities (written by any entity sink)
         output_folder (str): Path to save the converted files
         class_mappings_file (str): Path to the class property mappings file
     """
@@ -31,14 +31,10 @@ def convert_files(data_folder, output_folder, class_mappings_file):
         "MusicEnsemble": "Thing.MusicArtist.MusicEnsemble",
     }
     
-    # Get all subdirectories in the data folder
-    data_dirs = [
-        d
-        for d in os.listdir(data_folder)
-        if os.path.isdir(os.path.join(data_folder, d))
-    ]
-
-    for entity_type in data_dirs:
+    # Get all entity types in the data folder
+    reader = EntityReader(data_folder)
+
+    for entity_type in reader.get_entity_types():
         # Get class name from mapping or use default
         if entity_type in entity_type_to_class:
             entity_class_name = entity_type_to_class[entity_type]
@@ -59,15 +55,9 @@ def convert_files(data_folder, output_folder, class_mappings_file):
         # Initialize the output structure
         output_data = {"class_name": entity_class_name, "data": []}
 
-        # Get all JSON files for this entity type
-        entity_files = glob.glob(os.path.join(data_folder, entity_type, "*.json"))
-
-        for file_path in entity_files:
-            # Load the original JSON
-            with open(file_path, "r", encoding="utf-8") as f: # Read as UTF-8 to handle special characters
-                print(f"Processing file: {file_path}")
-                original_data = json.load(f)
-
+        # Read all entities of this entity type
+        for original_data in reader.iter_entities(entity_type):
+            print(f"Processing entity: {original_data.get('identifier')}")
             print(original_data)
             # Extract the identifier (without the prefix)
             identifier = original_data.get("identifier", "")
@@ -77,7 +67,7 @@ def convert_files(data_folder, output_folder, class_mappings_file):
             # Create the search query and alias
             name = original_data.get("hasName")
             if name == "Unknown":
-                raise ValueError(f"Name is 'Unknown' for file: {file_path}")
+                raise ValueError(f"Name is 'Unknown' for entity: {identifier}")
             
             final_subclass_in_name = entity_class_name.split(".")[-1]
             alias = f"{name}-{entity_class_name}"
@@ -86,40 +76,40 @@ def convert_files(data_folder, output_folder, class_mappings_file):
             search_query = f"{name}-{final_subclass_in_name}"
             search_query = slugify(search_query) # Turn it into a slug
 
-            base_class_data_props = deepcopy(class_property_mappings[entity_class_name]["data_properties"])
-            base_class_obj_props = deepcopy(class_property_mappings[entity_class_name]["object_properties"])
+            # The class's properties are shared by all files, only the values and IDs are stored per instance
+            class_data_props = class_property_mappings[entity_class_name]["data_properties"]
+            base_class_obj_props = ObjectPropertyLinks(schema=class_property_mappings[entity_class_name]["object_properties"])
 
-            print(base_class_data_props.keys())
+            print(class_data_props.keys())
             print(base_class_obj_props.keys())
 
             # Remove all fields that are not data properties or object properties (we only want the data)
-            instance_properties = deepcopy(original_data) 
+            instance_properties = dict(original_data) # Shallow copy, the values are not modified
             instance_properties.pop("hasName")
             instance_properties.pop("identifier")
             instance_properties.pop("entity_type")
             print(instance_properties)
             print()
 
-            data_props_keep = []
+            data_prop_values = {}
             for prop_name, value in instance_properties.items():
-                is_data_prop = (prop_name in base_class_data_props)
+                is_data_prop = (prop_name in class_data_props)
                 is_obj_prop = (prop_name in base_class_obj_props)
 
                 if is_data_prop:
                     # Add to data properties
-                    base_class_data_props[prop_name] = value
-                    data_props_keep.append(prop_name)
+                    data_prop_values[prop_name] = value
 
                 if is_obj_prop:
-                    base_class_obj_props[prop_name]["ids"].append(short_id)
+                    base_class_obj_props.add(prop_name, short_id)
 
                 if not (is_data_prop or is_obj_prop):
                     # Skip data property, unknown to the ontology
                     print(f"Warning: Property {prop_name} not found in property mappings for {entity_class_name}, skipping")
                     continue
             
-            # Remove data properties that don't have values.
-            base_class_data_props = {k: v for k, v in base_class_data_props.items() if k in data_props_keep}
+            # Only keep data properties that have values (in the order of the class's data properties)
+            base_class_data_props = {k: data_prop_values[k] for k in class_data_props if k in data_prop_values}
 
             new_entry = {
                 "id": short_id,
@@ -128,7 +118,7 @@ def convert_files(data_folder, output_folder, class_mappings_file):
                 "alias": alias,
                 "json_data": {
                             "data_properties": base_class_data_props,
-                            "object_properties": base_class_obj_props,
+                            "object_properties": base_class_obj_props.materialize(),
                             }
             }
 
@@ -139,4 +129,4 @@ def convert_files(data_folder, output_folder, class_mappings_file):
         with open(output_file, "w") as f:
             json.dump(output_data, f, indent=4)
 
-        print(f"Converted {len(entity_files)} files for {entity_type} to {output_file}")
\ No newline at end of file
+        print(f"Converted {len(output_data['data'])} entities for {entity_type} to {output_file}")
\ No newline at end of file
@@ -0,0 +1,473 @@
+import os
+import re
+import bz2
+import gzip
+import json
+import hashlib
+import lzma
+import sqlite3
+import tarfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from music_history_ontology.data_ingestion.musicbrainz.musicbrainz import MusicBrainzEndpoints
+from music_history_ontology.data_ingestion.musicbrainz.resolution import normalize_name
+
+# The entity types of the MusicBrainz JSON dumps (one line-delimited file per type, e.g., mbdump/artist)
+DUMP_ENTITY_TYPES = [
+    "area",
+    "artist",
+    "event",
+    "instrument",
+    "label",
+    "place",
+    "recording",
+    "release",
+    "release-group",
+    "series",
+    "work",
+]
+# The fields kept for the releases listed in a release group lookup (inc=releases), as in the API
+RELEASE_SUMMARY_FIELDS = [
+    "id",
+    "title",
+    "status",
+    "status-id",
+    "date",
+    "country",
+    "release-events",
+    "disambiguation",
+    "packaging",
+    "packaging-id",
+    "barcode",
+    "quality",
+    "text-representation",
+]
+QUERY_FIELD_PATTERN = re.compile(r'(\w+):"([^"]*)"')
+BATCH_SIZE = 1000
+
+
+def get_shard_entity_type(path):
+    """Returns the entity type of a dump file from its name, e.g., 'dumps/release-group.tar.xz' -> 'release-group'."""
+    name = os.path.basename(path).split(".")[0]
+    if name not in DUMP_ENTITY_TYPES:
+        raise ValueError(f"Unknown entity type of dump file {path}, expected one of {DUMP_ENTITY_TYPES}.")
+    return name
+
+
+def get_shard_signature(path):
+    """
+    Returns the path, size and modification time of a dump file, which change when it is replaced
+    (e.g., by a newer dump published under the same name).
+    """
+    stat = os.stat(path)
+    return json.dumps([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+
+
+def get_index_db_name(path):
+    """Returns the name of the index database of a dump file, unique to its full path."""
+    path_hash = hashlib.blake2b(os.path.abspath(path).encode("utf-8"), digest_size=8).hexdigest()
+    return f"{os.path.basename(path)}-{path_hash}.db"
+
+
+def read_shard_lines(path):
+    """
+    Streams the lines of a dump file, decompressing it on the fly.
+    - Dump archives (e.g., artist.tar.xz) are read from the mbdump/<entity type> member.
+    - Other files are line-delimited JSON, optionally compressed (.gz, .bz2 or .xz).
+    """
+    if ".tar" in os.path.basename(path):
+        entity_type = get_shard_entity_type(path)
+        with tarfile.open(path, mode="r|*") as archive:  # Streamed, without seeking
+            for member in archive:
+                if member.isfile() and member.name.endswith(f"mbdump/{entity_type}"):
+                    for line in archive.extractfile(member):
+                        yield line.decode("utf-8")
+                    return
+        return
+
+    openers = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+    opener = openers.get(os.path.splitext(path)[1], open)
+    with opener(path, "rt", encoding="utf-8") as file:
+        yield from file
+
+
+def get_entity_name(entity):
+    return entity.get("name") or entity.get("title") or ""
+
+
+def get_entity_score(entity):
+    """
+    Returns how prominent an entity is (standing in for the ranking of the search API), from its
+    tag counts, number of relations and number of ratings.
+    """
+    score = sum(tag.get("count", 0) for tag in entity.get("tags") or [])
+    score += len(entity.get("relations") or [])
+    score += (entity.get("rating") or {}).get("votes-count") or 0
+    return score
+
+
+def get_credited_artists(entity, entity_type):
+    """Returns the (MBID, name) of the artists credited on an entity (or of the artist itself)."""
+    artists = [
+        (credit["artist"].get("id"), credit["artist"].get("name"))
+        for credit in entity.get("artist-credit") or []
+        if credit.get("artist")
+    ]
+    if entity_type == "artist":
+        artists.append((entity.get("id"), entity.get("name")))
+    return artists
+
+
+def create_shard_index(connection):
+    with connection:
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS entities (
+                mbid TEXT PRIMARY KEY,
+                name TEXT,
+                score REAL,
+                body TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS names (name TEXT NOT NULL, mbid TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS links (
+                linked_entity TEXT NOT NULL,
+                linked_mbid TEXT NOT NULL,
+                mbid TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS genres (key TEXT PRIMARY KEY, name TEXT, id TEXT);
+            """
+        )
+
+
+def index_shard(path, db_path):
+    """
+    Indexes a dump file into an SQLite database: the entities by MBID, their names and aliases,
+    the entities they link to (for browsing, e.g., the release group of a release) and the genres
+    seen on them. Runs in a worker process, one per dump file. Returns the number of entities.
+    """
+    entity_type = get_shard_entity_type(path)
+    signature = get_shard_signature(path)  # Before reading, so a file replaced during indexing is detected
+    if os.path.exists(db_path):
+        os.remove(db_path)  # Incomplete or stale
+    connection = sqlite3.connect(db_path)
+    create_shard_index(connection)
+
+    def write(batch):
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO entities (mbid, name, score, body) VALUES (?, ?, ?, ?)",
+                [row[:4] for row in batch],
+            )
+            connection.executemany(
+                "INSERT INTO names (name, mbid) VALUES (?, ?)",
+                [(name, row[0]) for row in batch for name in row[4]],
+            )
+            connection.executemany(
+                "INSERT INTO links (linked_entity, linked_mbid, mbid) VALUES (?, ?, ?)",
+                [(*link, row[0]) for row in batch for link in row[5]],
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO genres (key, name, id) VALUES (?, ?, ?)",
+                [genre for row in batch for genre in row[6]],
+            )
+
+    num_entities = 0
+    batch = []
+    for line in read_shard_lines(path):
+        if not line.strip():
+            continue
+        entity = json.loads(line)
+        mbid = entity.get("id")
+        if not mbid:
+            continue
+        name = get_entity_name(entity)
+        names = {normalize_name(name)} | {
+            normalize_name(alias["name"])
+            for alias in entity.get("aliases") or []
+            if alias.get("name")
+        }
+        links = [
+            ("artist", artist_mbid)
+            for artist_mbid, _ in get_credited_artists(entity, entity_type)
+            if artist_mbid
+        ]
+        if entity.get("release-group", {}).get("id"):
+            links.append(("release-group", entity["release-group"]["id"]))
+        for label_info in entity.get("label-info") or []:
+            if (label_info.get("label") or {}).get("id"):
+                links.append(("label", label_info["label"]["id"]))
+        genres = [
+            (normalize_name(genre["name"]), genre["name"], genre.get("id"))
+            for genre in entity.get("genres") or []
+            if genre.get("name")
+        ]
+        batch.append((mbid, name, get_entity_score(entity), line.strip(), names, links, genres))
+        num_entities += 1
+        if len(batch) >= BATCH_SIZE:
+            write(batch)
+            batch = []
+    write(batch)
+
+    with connection:
+        connection.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS names_index ON names (name);
+            CREATE INDEX IF NOT EXISTS links_index ON links (linked_entity, linked_mbid);
+            """
+        )
+        connection.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("entity_type", entity_type), ("source", signature), ("complete", "1")],  # Written last
+        )
+    connection.close()
+    return num_entities
+
+
+def has_tag(entity, tags):
+    """Returns whether an entity has one of the (normalized) tags or genres."""
+    names = {
+        normalize_name(tag["name"])
+        for tag in (entity.get("tags") or []) + (entity.get("genres") or [])
+        if tag.get("name")
+    }
+    return bool(names & tags)
+
+
+def has_artist(entity, entity_type, artists):
+    """Returns whether an entity is, or is credited to, one of the artists (normalized names or MBIDs)."""
+    return any(
+        artist_mbid in artists or normalize_name(artist_name or "") in artists
+        for artist_mbid, artist_name in get_credited_artists(entity, entity_type)
+    )
+
+
+class MusicBrainzDump:
+    def __init__(self, paths, index_dir="generated_data/musicbrainz/dump_index", num_index_workers=None):
+        """
+        Local source of MusicBrainz entities read from the JSON data dumps (one line-delimited file per
+        entity type, e.g., artist.tar.xz or artist.jsonl.xz), without the rate limit of the API.
+        - The dump files are streamed once and indexed into one SQLite database each, in parallel across
+          worker processes. Indexes of earlier runs are reused, and incomplete ones rebuilt, as are the
+          indexes of dump files replaced since (their size or modification time changed).
+        - Entities are looked up by MBID, searched by name (or alias) and browsed by the entities they
+          link to, in the format of the API responses (see MusicBrainzDumpClient).
+
+        Args:
+            paths (Union[str, List[str]]): The dump files.
+            index_dir (str): The directory of the index databases.
+            num_index_workers (int): The number of processes indexing the dump files (None for one per CPU).
+        """
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.index_dir = index_dir
+        self.num_index_workers = num_index_workers
+        self.lock = threading.Lock()
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.db_paths = [
+            os.path.join(self.index_dir, get_index_db_name(path)) for path in self.paths
+        ]
+        self.build_index()
+        self.shards = []  # (entity type, connection) of each dump file
+        for db_path in self.db_paths:
+            connection = sqlite3.connect(db_path, check_same_thread=False)
+            entity_type = connection.execute(
+                "SELECT value FROM meta WHERE key = 'entity_type'"
+            ).fetchone()[0]
+            self.shards.append((entity_type, connection))
+
+    def is_shard_indexed(self, path, db_path):
+        """Returns whether a dump file has a complete index, built from the same version of the file."""
+        if not os.path.exists(db_path):
+            return False
+        connection = sqlite3.connect(db_path)
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+            return "complete" in meta and meta.get("source") == get_shard_signature(path)
+        except sqlite3.Error:
+            return False
+        finally:
+            connection.close()
+
+    def build_index(self):
+        missing = [
+            (path, db_path)
+            for path, db_path in zip(self.paths, self.db_paths)
+            if not self.is_shard_indexed(path, db_path)
+        ]
+        if not missing:
+            return
+        print(f"Indexing {len(missing)} MusicBrainz dump files...")
+        with ProcessPoolExecutor(max_workers=self.num_index_workers) as executor:
+            for (path, _), num_entities in zip(
+                missing, executor.map(index_shard, *zip(*missing))
+            ):
+                print(f"  -> Indexed {num_entities} entities from {path}")
+
+    def get_shards(self, entity_type):
+        return [connection for shard_type, connection in self.shards if shard_type == entity_type]
+
+    def get(self, entity_type, mbid):
+        """Returns an entity by MBID, or None if it is not in the dumps."""
+        with self.lock:
+            for connection in self.get_shards(entity_type):
+                row = connection.execute(
+                    "SELECT body FROM entities WHERE mbid = ?", (mbid,)
+                ).fetchone()
+                if row is not None:
+                    return json.loads(row[0])
+        return None
+
+    def search(self, entity_type, name):
+        """Returns the entities with a name (or alias), the most prominent first."""
+        rows = []
+        with self.lock:
+            for connection in self.get_shards(entity_type):
+                rows.extend(
+                    connection.execute(
+                        "SELECT DISTINCT entities.score, entities.body FROM names "
+                        "JOIN entities ON entities.mbid = names.mbid WHERE names.name = ?",
+                        (normalize_name(name),),
+                    ).fetchall()
+                )
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return [json.loads(body) for _, body in rows]
+
+    def browse(self, entity_type, linked_entity, mbid):
+        """Returns the entities linked to another entity, e.g., the releases of a release group."""
+        entities = []
+        with self.lock:
+            for connection in self.get_shards(entity_type):
+                entities.extend(
+                    json.loads(body)
+                    for (body,) in connection.execute(
+                        "SELECT entities.body FROM links JOIN entities ON entities.mbid = links.mbid "
+                        "WHERE links.linked_entity = ? AND links.linked_mbid = ? ORDER BY entities.rowid",
+                        (linked_entity, mbid),
+                    )
+                )
+        return entities
+
+    def get_genre(self, name=None, mbid=None):
+        """Returns a genre seen in the dumps as {"id", "name"} by name or MBID, or None."""
+        query, value = (
+            ("SELECT name, id FROM genres WHERE key = ?", normalize_name(name))
+            if mbid is None
+            else ("SELECT name, id FROM genres WHERE id = ?", mbid)
+        )
+        with self.lock:
+            for _, connection in self.shards:
+                row = connection.execute(query, (value,)).fetchone()
+                if row is not None:
+                    return {"id": row[1], "name": row[0]}
+        return None
+
+    def iter_entities(self, entity_type, tags=None, artists=None):
+        """
+        Streams the entities of a type, optionally only those with one of the tags (or genres) and
+        those by (or being) one of the artists (names or MBIDs).
+        """
+        tags = {normalize_name(tag) for tag in tags} if tags else None
+        artists = (
+            {normalize_name(artist) for artist in artists} | set(artists) if artists else None
+        )
+        for connection in self.get_shards(entity_type):
+            last_rowid = 0
+            while True:
+                with self.lock:
+                    rows = connection.execute(
+                        "SELECT rowid, body FROM entities WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                        (last_rowid, BATCH_SIZE),
+                    ).fetchall()
+                if not rows:
+                    break
+                last_rowid = rows[-1][0]
+                for _, body in rows:
+                    entity = json.loads(body)
+                    if tags is not None and not has_tag(entity, tags):
+                        continue
+                    if artists is not None and not has_artist(entity, entity_type, artists):
+                        continue
+                    yield entity
+
+    def close(self):
+        for _, connection in self.shards:
+            connection.close()
+
+
+class MusicBrainzDumpClient(MusicBrainzEndpoints):
+    def __init__(self, dump):
+        """
+        Client answering the requests of MusicBrainzClient (searches, lookups and browses) from a
+        MusicBrainzDump, so that the same processing logic populates the data from the dumps.
+        - Lookups return the full entities of the dumps (which include all the relations and tags),
+          except that release group lookups list the releases of the group as with inc=releases.
+        - Searches match the normalized name (or an alias) exactly, filtered by the fields of the query
+          (e.g., type:"Group", artistname:"Queen", primarytype:"Album").
+
+        Args:
+            dump (MusicBrainzDump): The dump.
+        """
+        self.dump = dump
+        self.num_network_requests = 0  # Never makes requests
+        self.rate_limit_wait = 0.0
+
+    def close(self):
+        self.dump.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _request(self, endpoint, params=None):
+        params = params or {}
+        parts = endpoint.strip("/").split("/")
+        entity_type = parts[0]
+        if len(parts) == 2:
+            return self.lookup(entity_type, parts[1], params.get("inc", "").split("+"))
+        if "query" in params:
+            return self.search(entity_type, params["query"], int(params.get("limit", 25)))
+        for linked_entity in ("release-group", "artist", "label"):
+            if linked_entity in params:
+                results = self.dump.browse(entity_type, linked_entity, params[linked_entity])
+                offset = int(params.get("offset", 0))
+                return {
+                    f"{entity_type}-count": len(results),
+                    f"{entity_type}-offset": offset,
+                    f"{entity_type}s": results[offset : offset + int(params.get("limit", 25))],
+                }
+        print(f"Unsupported request for the MusicBrainz dump: {endpoint} {params}")
+        return None
+
+    def lookup(self, entity_type, mbid, inc):
+        if entity_type == "tag":
+            return self.dump.get_genre(mbid=mbid)
+        entity = self.dump.get(entity_type, mbid)
+        if entity is not None and entity_type == "release-group" and "releases" in inc:
+            entity["releases"] = [
+                {key: release[key] for key in RELEASE_SUMMARY_FIELDS if key in release}
+                for release in self.dump.browse("release", "release-group", mbid)
+            ]
+        return entity
+
+    def search(self, entity_type, query, limit):
+        fields = dict(QUERY_FIELD_PATTERN.findall(query))
+        name = next(iter(fields.values())) if fields else query
+        if entity_type == "tag":
+            genre = self.dump.get_genre(name=name)
+            return {"count": int(genre is not None), "tags": [genre] if genre else []}
+
+        results = []
+        for entity in self.dump.search(entity_type, name):
+            if "type" in fields and entity.get("type") != fields["type"]:
+                continue
+            if "primarytype" in fields and entity.get("primary-type") != fields["primarytype"]:
+                continue
+            if "artistname" in fields and not has_artist(
+                entity, entity_type, {normalize_name(fields["artistname"])}
+            ):
+                continue
+            results.append(entity)
+        key = "release-groups" if entity_type == "release-group" else f"{entity_type}s"
+        return {"count": len(results), "offset": 0, key: results[:limit]}
@@ -0,0 +1,233 @@
+import os
+import glob
+import json
+import sqlite3
+import threading
+
+SQLITE_SINK_FILENAME = "entities.db"
+
+
+class EntitySink:
+    """
+    Destination of the entities generated from MusicBrainz, written as dictionaries (the JSON of
+    the Pydantic models) by entity type and identifier. Read back with EntityReader.
+    """
+
+    name = None
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.num_written = 0
+        self.lock = threading.Lock()  # Entities are written by several tasks at once
+
+    def write(self, entity_type, identifier, entity_dict):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class DirectorySink(EntitySink):
+    """One pretty-printed JSON file per entity, at <data_dir>/<entity type>/<identifier>.json."""
+
+    name = "directory"
+
+    def write(self, entity_type, identifier, entity_dict):
+        dir_path = os.path.join(self.data_dir, entity_type)
+        os.makedirs(dir_path, exist_ok=True)
+        with open(os.path.join(dir_path, f"{identifier}.json"), "w", encoding="utf-8") as f:
+            json.dump(entity_dict, f, indent=2, ensure_ascii=False)
+        with self.lock:
+            self.num_written += 1
+
+
+def truncate_partial_line(file_path, chunk_size=65536):
+    """Truncates a file after its last newline, removing a partial last line if there is one."""
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(position - chunk_size, 0)
+            f.seek(start)
+            index = f.read(position - start).rfind(b"\n")
+            if index != -1:
+                position = start + index + 1
+                break
+            position = start
+        if position < end:
+            print(f"Truncating a partial last line of {file_path} ({end - position} bytes)")
+            f.truncate(position)
+
+
+class JSONLSink(EntitySink):
+    """
+    One append-only JSON Lines file per entity type, at <data_dir>/<entity type>.jsonl. Entities
+    written again (e.g., by a later run) are appended, and the reader keeps the last version.
+    - A partial last line (e.g., from a run that was killed) is truncated when the file is opened.
+    """
+
+    name = "jsonl"
+
+    def __init__(self, data_dir):
+        super().__init__(data_dir)
+        self.files = {}  # Entity type -> open file
+
+    def write(self, entity_type, identifier, entity_dict):
+        line = json.dumps(entity_dict, ensure_ascii=False) + "\n"
+        with self.lock:
+            if entity_type not in self.files:
+                os.makedirs(self.data_dir, exist_ok=True)
+                file_path = os.path.join(self.data_dir, f"{entity_type}.jsonl")
+                truncate_partial_line(file_path)
+                self.files[entity_type] = open(file_path, "a", encoding="utf-8")
+            self.files[entity_type].write(line)
+            self.num_written += 1
+
+    def flush(self):
+        with self.lock:
+            for f in self.files.values():
+                f.flush()
+
+    def close(self):
+        with self.lock:
+            for f in self.files.values():
+                f.close()
+            self.files = {}
+
+
+class SQLiteSink(EntitySink):
+    """
+    A single SQLite database, at <data_dir>/entities.db, where writing an entity again replaces it
+    (upsert). Writes are committed in batches.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, data_dir, batch_size=1000):
+        super().__init__(data_dir)
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(
+            os.path.join(self.data_dir, SQLITE_SINK_FILENAME), check_same_thread=False
+        )
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entities (
+                    identifier TEXT PRIMARY KEY,
+                    entity_type TEXT NOT NULL,
+                    body TEXT NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS entity_type_index ON entities (entity_type)"
+            )
+        self.num_pending = 0
+
+    def write(self, entity_type, identifier, entity_dict):
+        body = json.dumps(entity_dict, ensure_ascii=False)
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO entities (identifier, entity_type, body) VALUES (?, ?, ?) "
+                "ON CONFLICT (identifier) DO UPDATE SET entity_type = excluded.entity_type, body = excluded.body",
+                (identifier, entity_type, body),
+            )
+            self.num_written += 1
+            self.num_pending += 1
+            if self.num_pending >= self.batch_size:
+                self.connection.commit()
+                self.num_pending = 0
+
+    def flush(self):
+        with self.lock:
+            self.connection.commit()
+            self.num_pending = 0
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+ENTITY_SINKS = {
+    DirectorySink.name: DirectorySink,
+    JSONLSink.name: JSONLSink,
+    SQLiteSink.name: SQLiteSink,
+}
+
+
+def create_sink(name, data_dir):
+    """Creates an entity sink by name (see ENTITY_SINKS)."""
+    if name not in ENTITY_SINKS:
+        raise ValueError(f"Unknown entity sink '{name}', expected one of {list(ENTITY_SINKS)}.")
+    return ENTITY_SINKS[name](data_dir)
+
+
+class EntityReader:
+    def __init__(self, data_dir):
+        """
+        Reads the entities written by any of the sinks (or a mix of them, e.g., from runs with different
+        sinks), by entity type. An entity written more than once is read once, in its last version
+        (the directory layout is read first, then the JSONL files, then the SQLite database).
+
+        Args:
+            data_dir (str): The directory the entities were written to.
+        """
+        self.data_dir = data_dir
+        self.db_path = os.path.join(self.data_dir, SQLITE_SINK_FILENAME)
+
+    def get_entity_types(self):
+        """Returns the entity types with entities, sorted."""
+        entity_types = set()
+        for name in os.listdir(self.data_dir):
+            path = os.path.join(self.data_dir, name)
+            if os.path.isdir(path) and glob.glob(os.path.join(path, "*.json")):
+                entity_types.add(name)
+            elif name.endswith(".jsonl"):
+                entity_types.add(name[: -len(".jsonl")])
+        if os.path.exists(self.db_path):
+            connection = sqlite3.connect(self.db_path)
+            entity_types.update(
+                entity_type
+                for (entity_type,) in connection.execute("SELECT DISTINCT entity_type FROM entities")
+            )
+            connection.close()
+        return sorted(entity_types)
+
+    def iter_entities(self, entity_type):
+        """Yields the entities of a type (as dictionaries)."""
+        entities = {}  # Identifier -> entity, the last version of each
+        for file_path in sorted(glob.glob(os.path.join(self.data_dir, entity_type, "*.json"))):
+            with open(file_path, "r", encoding="utf-8") as f:
+                entity = json.load(f)
+            entities[entity.get("identifier", file_path)] = entity
+
+        jsonl_path = os.path.join(self.data_dir, f"{entity_type}.jsonl")
+        if os.path.exists(jsonl_path):
+            with open(jsonl_path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entity = json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"Warning: Skipping undecodable line {line_number} of {jsonl_path}")
+                        continue
+                    entities.pop(entity.get("identifier"), None)  # Keep the order of the last writes
+                    entities[entity.get("identifier")] = entity
+
+        if os.path.exists(self.db_path):
+            connection = sqlite3.connect(self.db_path)
+            for identifier, body in connection.execute(
+                "SELECT identifier, body FROM entities WHERE entity_type = ? ORDER BY rowid",
+                (entity_type,),
+            ):
+                entities.pop(identifier, None)
+                entities[identifier] = json.loads(body)
+            connection.close()
+        yield from entities.values()
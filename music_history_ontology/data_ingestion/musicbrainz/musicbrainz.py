@@ -1,46 +1,24 @@
 import requests
-from ratelimit import limits, sleep_and_retry
+import itertools
+import threading
+from collections import deque
+from music_history_ontology.data_ingestion.musicbrainz.session import (
+    create_session,
+    timed_get,
+    summarize_timings,
+)
+from music_history_ontology.data_ingestion.resilience import TokenBucket
 
 MUSICBRAINZ_API_URL = "https://musicbrainz.org/ws/2/"
-ONE_SECOND = 1
+REQUESTS_PER_SECOND = 1.0  # The rate limit of the API
 
 
-class MusicBrainzClient:
-    def __init__(
-        self,
-        app_name="MusicOntologyPopulator",
-        app_version="0.1",
-        contact="contact@example.com",
-    ):
-        self.headers = {
-            "User-Agent": f"{app_name}/{app_version} ( {contact} )",
-            "Accept": "application/json",
-        }
-        self.base_url = MUSICBRAINZ_API_URL
-
-    @sleep_and_retry
-    @limits(calls=1, period=ONE_SECOND)
-    def _request(self, endpoint, params=None):
-        """Makes a rate-limited request to the MusicBrainz API."""
-        if params is None:
-            params = {}
-        params["fmt"] = "json"  # Ensure JSON format
-
-        url = f"{self.base_url}{endpoint}"
-        try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error making request to {url}: {e}")
-            # Consider more robust error handling/logging
-            return None
-        except requests.exceptions.JSONDecodeError:
-            print(f"Error decoding JSON response from {url}")
-            print(
-                f"Response text: {response.text[:500]}..."
-            )  # Log part of the response
-            return None
+class MusicBrainzEndpoints:
+    """
+    The search, lookup and browse methods of the MusicBrainz API, shared by the clients, which implement
+    _request(endpoint, params) (returning the response, or an awaitable of it for the async client,
+    which also overrides iter_browse).
+    """
 
     def search_artist(self, name, limit=1):
         """Searches for an artist by name."""
@@ -131,6 +109,164 @@ class MusicBrainzClient:
         params = {"inc": "+".join(inc)} if inc else {}
         return self._request(f"tag/{mbid}", params=params)  # Using tag endpoint
 
+    # --- Browse methods (entities linked to an MBID, paginated) ---
+
+    def browse(self, entity, linked_entity, mbid, inc=[], limit=100, offset=0):
+        """
+        Browses the entities linked to another entity, e.g., the releases of a release group
+        (entity="release", linked_entity="release-group"), returning up to 100 of them per request
+        instead of one per lookup.
+        """
+        params = {linked_entity: mbid, "limit": limit, "offset": offset}
+        if inc:
+            params["inc"] = "+".join(inc)
+        return self._request(entity, params=params)
+
+    def iter_browse(self, entity, linked_entity, mbid, inc=[], limit=100, max_pages=None):
+        """
+        Yields all the entities linked to another entity, requesting the next page only when the
+        previous one has been consumed (stops early if a request fails, or after max_pages requests).
+        """
+        offset = 0
+        for _ in itertools.count() if max_pages is None else range(max_pages):
+            page = self.browse(
+                entity, linked_entity, mbid, inc=inc, limit=limit, offset=offset
+            )
+            results = page.get(f"{entity}s", []) if page else []
+            yield from results
+            offset += len(results)
+            if not results or offset >= page.get(f"{entity}-count", 0):
+                return
+
+    def browse_releases(self, release_group_mbid, inc=[], limit=100, offset=0):
+        """Browses the releases of a release group (e.g., inc=["recordings", "artist-credits"])."""
+        return self.browse(
+            "release", "release-group", release_group_mbid, inc=inc, limit=limit, offset=offset
+        )
+
+
+class MusicBrainzClient(MusicBrainzEndpoints):
+    def __init__(
+        self,
+        app_name="MusicOntologyPopulator",
+        app_version="0.1",
+        contact="contact@example.com",
+        base_url=MUSICBRAINZ_API_URL,
+        pool_size=4,
+        connect_timeout=5.0,
+        read_timeout=30.0,
+        max_timings=1000,
+        cache=None,
+        rate_limiter=None,
+    ):
+        """
+        Client for the MusicBrainz API, sending requests over a pooled keep-alive session so that
+        the rate-limited request slots are not spent on DNS, TCP and TLS setup.
+
+        Args:
+            app_name (str): The application name sent in the User-Agent.
+            app_version (str): The application version sent in the User-Agent.
+            contact (str): The contact sent in the User-Agent.
+            base_url (str): The URL of the API (e.g., a local stub server for benchmarks).
+            pool_size (int): The maximum number of connections kept open to the API.
+            connect_timeout (float): The timeout for opening a connection (seconds).
+            read_timeout (float): The timeout for each read of the response (seconds).
+            max_timings (int): The number of most recent request timings kept for get_timing_stats.
+            cache (ResponseCache): The response cache, requests answered from it skip the rate limit
+                                   (None to always make the requests).
+            rate_limiter (TokenBucket): The rate limiter of the requests, e.g., a SharedTokenBucket shared
+                                        by several worker processes (defaults to 1 request per second
+                                        within this client).
+        """
+        self.headers = {
+            "User-Agent": f"{app_name}/{app_version} ( {contact} )",
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",  # Decompressed transparently
+        }
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = create_session(headers=self.headers, pool_size=pool_size)
+        self.timings = deque(maxlen=max_timings)
+        self.cache = cache
+        self.num_network_requests = 0
+        if rate_limiter is None:
+            rate_limiter = TokenBucket(rate=REQUESTS_PER_SECOND, capacity=1.0)
+        self.rate_limiter = rate_limiter
+        self.rate_limit_wait = 0.0  # Total time spent waiting for the rate limit (seconds)
+        self.lock = threading.Lock()  # The client can be shared by several threads
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_timing_stats(self):
+        """
+        Returns the mean DNS, connect, TLS, wait and transfer times of the recent requests (seconds),
+        and the fraction of them that reused a pooled connection.
+        """
+        return summarize_timings(list(self.timings))
+
+    def report_timings(self):
+        stats = self.get_timing_stats()
+        if not stats:
+            return
+        print(
+            f"MusicBrainz requests: {len(self.timings)} | Reused connections: {stats['reused']:.1%} | "
+            f"Mean DNS: {stats['dns'] * 1000:.1f}ms | Connect: {stats['connect'] * 1000:.1f}ms | "
+            f"TLS: {stats['tls'] * 1000:.1f}ms | Wait: {stats['wait'] * 1000:.1f}ms | "
+            f"Transfer: {stats['transfer'] * 1000:.1f}ms | Total: {stats['total'] * 1000:.1f}ms"
+        )
+
+    def _request(self, endpoint, params=None):
+        """Makes a request to the MusicBrainz API, answering it from the cache if possible."""
+        if params is None:
+            params = {}
+        params["fmt"] = "json"  # Ensure JSON format
+        if self.cache is None:
+            return self._fetch(endpoint, params)
+
+        response = self.cache.get(endpoint, params)
+        if response is not None:
+            return response
+        if self.cache.offline:
+            print(f"Offline mode: no cached response for {endpoint} {params}")
+            return None
+        response = self._fetch(endpoint, params)
+        if response is not None:  # Errors are not cached
+            self.cache.set(endpoint, params, response)
+        return response
+
+    def _fetch(self, endpoint, params):
+        """Makes a rate-limited request to the MusicBrainz API."""
+        wait = self.rate_limiter.acquire()
+        with self.lock:
+            self.rate_limit_wait += wait
+            self.num_network_requests += 1
+        url = f"{self.base_url}{endpoint}"
+        try:
+            response, timing = timed_get(
+                self.session, url, params=params, timeout=self.timeout
+            )
+            self.timings.append(timing)
+            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error making request to {url}: {e}")
+            # Consider more robust error handling/logging
+            return None
+        except requests.exceptions.JSONDecodeError:
+            print(f"Error decoding JSON response from {url}")
+            print(
+                f"Response text: {response.text[:500]}..."
+            )  # Log part of the response
+            return None
+
 
 # Example Usage (Optional - can be removed or run under if __name__ == '__main__')
 if __name__ == "__main__":
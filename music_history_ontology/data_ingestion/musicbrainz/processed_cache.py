@@ -0,0 +1,153 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def hash_entity(entity_dict):
+    """Returns the hash of the content of an entity (independent of the order of its keys)."""
+    content = json.dumps(entity_dict, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ProcessedCache:
+    def __init__(
+        self,
+        db_path="generated_data/musicbrainz/processed.db",
+        resume=False,
+        max_memory_entries=10000,
+        commit_every=500,
+        before_commit=None,
+    ):
+        """
+        Persistent table of the entities processed and saved, mapping each identifier to the hash of
+        the content saved and the run it was processed in, e.g., "identifier in cache" is True if the
+        entity was processed in the current run.
+        - Resuming continues the last run (e.g., after it was interrupted), so the entities it already
+          processed are skipped, while a new run starts with no entity processed.
+        - Only the most recently used entries are kept in memory, so memory use does not grow with the
+          number of processed entities.
+
+        Args:
+            db_path (str): The path to the SQLite database.
+            resume (bool): Whether to continue the last run instead of starting a new one.
+            max_memory_entries (int): The maximum number of entries kept in memory.
+            commit_every (int): The number of entries added between commits to the database.
+            before_commit (Callable[[], None]): Called before each commit, e.g., to flush the entity sink
+                                                so that no entity is recorded as saved before it is written.
+        """
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.commit_every = commit_every
+        self.before_commit = before_commit
+        self.lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS processed (
+                    identifier TEXT PRIMARY KEY,
+                    entity_type TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    run_id INTEGER NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS run_id_index ON processed (run_id)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'run_id'"
+            ).fetchone()
+            last_run_id = int(row[0]) if row is not None else 0
+            self.run_id = max(last_run_id, 1) if resume else last_run_id + 1
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('run_id', ?)",
+                (str(self.run_id),),
+            )
+
+        self.entries = OrderedDict()  # Identifier -> (content hash, run ID), least recently used first
+        self.num_pending = 0
+        self.num_unchanged = 0  # Entities saved again with the same content
+
+    def get(self, identifier):
+        """Returns the (content hash, run ID) of an entity, or None if it was never saved."""
+        with self.lock:
+            if identifier in self.entries:
+                self.entries.move_to_end(identifier)
+                return self.entries[identifier]
+            row = self.connection.execute(
+                "SELECT content_hash, run_id FROM processed WHERE identifier = ?",
+                (identifier,),
+            ).fetchone()
+            entry = tuple(row) if row is not None else None
+            self._remember(identifier, entry)
+            return entry
+
+    def _remember(self, identifier, entry):
+        self.entries[identifier] = entry
+        self.entries.move_to_end(identifier)
+        while len(self.entries) > self.max_memory_entries:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, identifier):
+        entry = self.get(identifier)
+        return entry is not None and entry[1] == self.run_id
+
+    def add(self, identifier, entity_type, content_hash):
+        """
+        Records an entity as processed in the current run, once it has been saved (or skipped as
+        unchanged), returning True if it was saved before with the same content.
+        """
+        with self.lock:
+            unchanged = self.is_saved(identifier, content_hash)
+            if unchanged:
+                self.num_unchanged += 1
+            self.connection.execute(
+                "INSERT OR REPLACE INTO processed (identifier, entity_type, content_hash, run_id) VALUES (?, ?, ?, ?)",
+                (identifier, entity_type, content_hash, self.run_id),
+            )
+            self._remember(identifier, (content_hash, self.run_id))
+            self.num_pending += 1
+            if self.num_pending >= self.commit_every:
+                self.commit()
+            return unchanged
+
+    def is_saved(self, identifier, content_hash):
+        """Returns whether an entity was saved before (in any run) with the same content."""
+        entry = self.get(identifier)
+        return entry is not None and entry[0] == content_hash
+
+    def commit(self):
+        with self.lock:
+            if self.before_commit is not None:
+                self.before_commit()
+            self.connection.commit()
+            self.num_pending = 0
+
+    def __len__(self):
+        """Returns the number of entities processed in the current run."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM processed WHERE run_id = ?", (self.run_id,)
+            ).fetchone()[0]
+
+    def report(self):
+        with self.lock:
+            num_entries = self.connection.execute(
+                "SELECT COUNT(*) FROM processed"
+            ).fetchone()[0]
+        print(
+            f"Processed cache | Run: {self.run_id} | Processed: {len(self)} | "
+            f"Unchanged: {self.num_unchanged} | Entries: {num_entries}"
+        )
+
+    def close(self):
+        self.commit()
+        self.connection.close()
@@ -0,0 +1,107 @@
+import os
+import json
+import sqlite3
+import threading
+import unicodedata
+
+
+def normalize_name(name):
+    """Normalizes a name for resolution, e.g., ' The  Beatles' -> 'the beatles'."""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+
+class ResolutionTable:
+    def __init__(self, db_path="generated_data/musicbrainz/resolution.db"):
+        """
+        Persistent table resolving (entity type, normalized name) to the MBID and identifier of an
+        entity, consulted before searching MusicBrainz so that names seen before (in this or a
+        previous run) cost no search request.
+        - The search result the name resolved to is stored with it, so that the entity can be
+          processed exactly as if the search had been made.
+
+        Args:
+            db_path (str): The path to the SQLite database.
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS resolutions (
+                    entity_type TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    mbid TEXT,
+                    identifier TEXT NOT NULL,
+                    mb_name TEXT,
+                    search_result TEXT,
+                    PRIMARY KEY (entity_type, name)
+                )
+                """
+            )
+
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def get(self, entity_type, name):
+        """
+        Returns the resolution of a name as {"mbid", "identifier", "mb_name", "search_result"},
+        or None if it has not been resolved before.
+
+        Args:
+            entity_type (str): The entity type, e.g., "Musician" or "Instrument".
+            name (str): The name (e.g., the search term).
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT mbid, identifier, mb_name, search_result FROM resolutions WHERE entity_type = ? AND name = ?",
+                (entity_type, normalize_name(name)),
+            ).fetchone()
+            if row is None:
+                self.num_misses += 1
+                return None
+            self.num_hits += 1
+        mbid, identifier, mb_name, search_result = row
+        return {
+            "mbid": mbid,
+            "identifier": identifier,
+            "mb_name": mb_name,
+            "search_result": json.loads(search_result) if search_result is not None else None,
+        }
+
+    def set(self, entity_type, name, identifier, mbid=None, mb_name=None, search_result=None):
+        """
+        Records the resolution of a name.
+
+        Args:
+            entity_type (str): The entity type.
+            name (str): The name (e.g., the search term).
+            identifier (str): The identifier of the entity.
+            mbid (str): The MBID of the entity (None for entities not from MusicBrainz, e.g., some genres).
+            mb_name (str): The name of the entity on MusicBrainz.
+            search_result (Dict[str, Any]): The search result the name resolved to.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO resolutions (entity_type, name, mbid, identifier, mb_name, search_result) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    entity_type,
+                    normalize_name(name),
+                    mbid,
+                    identifier,
+                    mb_name,
+                    json.dumps(search_result) if search_result is not None else None,
+                ),
+            )
+
+    def report(self):
+        with self.lock:
+            num_entries = self.connection.execute("SELECT COUNT(*) FROM resolutions").fetchone()[0]
+            print(
+                f"Resolution table | Hits: {self.num_hits} | Misses: {self.num_misses} | Entries: {num_entries}"
+            )
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,179 @@
+import time
+import socket
+import threading
+import requests
+
+from typing import Dict, List, Tuple, Union
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+# The setup timings of the connection opened by the current thread's request (if any)
+_connection_timings = threading.local()
+
+
+class TimedConnectionMixin:
+    """
+    Records the time spent on DNS resolution, the TCP connection and the TLS handshake
+    when a new connection is opened (reused keep-alive connections skip all three).
+    """
+
+    def _new_conn(self) -> socket.socket:
+        start_time = time.perf_counter()
+        addresses = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        resolved_time = time.perf_counter()
+        _connection_timings.dns = resolved_time - start_time
+        _connection_timings.opened = True
+
+        # Connect to the resolved addresses in order, as create_connection would
+        dns_host = self._dns_host
+        error = None
+        try:
+            for address in dict.fromkeys(address[4][0] for address in addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    _connection_timings.connect = time.perf_counter() - resolved_time
+                    return sock
+                except NewConnectionError as e:
+                    error = e
+        finally:
+            self._dns_host = dns_host
+        raise error
+
+    def connect(self) -> None:
+        start_time = time.perf_counter()
+        super().connect()
+        total_time = time.perf_counter() - start_time
+        # The TLS handshake is the remainder of the setup (0 for plain HTTP)
+        _connection_timings.tls = max(
+            total_time - _connection_timings.dns - _connection_timings.connect, 0.0
+        )
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections record their setup timings.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class RequestTiming:
+    __slots__ = ("dns", "connect", "tls", "wait", "transfer", "total", "reused")
+
+    def __init__(self, dns, connect, tls, wait, transfer, total, reused):
+        """
+        The timings of a request (in seconds).
+
+        Args:
+            dns (float): DNS resolution (0 if the connection was reused).
+            connect (float): TCP connection (0 if the connection was reused).
+            tls (float): TLS handshake (0 if the connection was reused or is plain HTTP).
+            wait (float): Sending the request until the response headers arrived, excluding the setup.
+            transfer (float): Receiving (and decompressing) the response body.
+            total (float): The total time of the request.
+            reused (bool): Whether a pooled keep-alive connection was reused.
+        """
+        self.dns = dns
+        self.connect = connect
+        self.tls = tls
+        self.wait = wait
+        self.transfer = transfer
+        self.total = total
+        self.reused = reused
+
+    @property
+    def setup(self) -> float:
+        return self.dns + self.connect + self.tls
+
+
+def create_session(headers: Dict[str, str], pool_size: int = 4) -> requests.Session:
+    """
+    Creates a session with a pool of keep-alive connections (per host) that record their setup timings.
+
+    Args:
+        headers (Dict[str, str]): The headers sent with every request.
+        pool_size (int): The maximum number of connections kept open to each host.
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def timed_get(
+    session: requests.Session,
+    url: str,
+    params: Dict[str, str] = None,
+    timeout: Union[float, tuple] = None,
+) -> Tuple[requests.Response, RequestTiming]:
+    """
+    Makes a GET request with the session, returning the response and its RequestTiming.
+
+    Args:
+        session (requests.Session): The session (created with create_session).
+        url (str): The URL.
+        params (Dict[str, str]): The query parameters.
+        timeout (Union[float, tuple]): The (connect, read) timeouts in seconds.
+    """
+    _connection_timings.dns = 0.0
+    _connection_timings.connect = 0.0
+    _connection_timings.tls = 0.0
+    _connection_timings.opened = False
+    start_time = time.perf_counter()
+    response = session.get(url, params=params, timeout=timeout)
+    total_time = time.perf_counter() - start_time
+    setup_time = _connection_timings.dns + _connection_timings.connect + _connection_timings.tls
+    headers_time = response.elapsed.total_seconds()  # Until the response headers were parsed
+    timing = RequestTiming(
+        dns=_connection_timings.dns,
+        connect=_connection_timings.connect,
+        tls=_connection_timings.tls,
+        wait=max(headers_time - setup_time, 0.0),
+        transfer=max(total_time - headers_time, 0.0),
+        total=total_time,
+        reused=not _connection_timings.opened,
+    )
+    return response, timing
+
+
+def summarize_timings(timings: List[RequestTiming]) -> Dict[str, float]:
+    """
+    Returns the mean of each timing (in seconds) and the fraction of requests that reused a connection.
+
+    Args:
+        timings (List[RequestTiming]): The timings of the requests.
+    """
+    if len(timings) == 0:
+        return {}
+    summary = {
+        phase: sum(getattr(timing, phase) for timing in timings) / len(timings)
+        for phase in ("dns", "connect", "tls", "wait", "transfer", "total")
+    }
+    summary["reused"] = sum(timing.reused for timing in timings) / len(timings)
+    return summary
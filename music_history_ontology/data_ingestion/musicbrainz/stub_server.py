@@ -0,0 +1,219 @@
+import gzip
+import json
+import time
+import uuid
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# The key of the results list in search responses for each entity type
+SEARCH_RESULT_KEYS = {
+    "artist": "artists",
+    "release-group": "release-groups",
+    "release": "releases",
+    "work": "works",
+    "tag": "tags",
+    "instrument": "instruments",
+    "event": "events",
+    "recording": "recordings",
+}
+STUB_NAMESPACE = uuid.UUID("6f1b3c2e-6d2a-4c55-9a43-4f5d0c1b7a10")
+# The entities that can be browsed by each linked entity, e.g., releases by release group
+BROWSE_LINKED_ENTITIES = {"release": ["release-group", "artist", "label"]}
+RELEASE_GROUPS = {}  # Release MBID -> release group MBID, for the releases created so far
+
+
+def create_stub_mbid(entity, name):
+    """Returns a deterministic MBID for a stub entity."""
+    return str(uuid.uuid5(STUB_NAMESPACE, f"{entity}|{name.lower()}"))
+
+
+def create_search_response(entity, query, limit, offset=0, num_results=25):
+    """Creates a search response in the format of the MusicBrainz API."""
+    name = query.split('"')[1] if '"' in query else query
+    results = [
+        {
+            "id": create_stub_mbid(entity, name if i == 0 else f"{name} {i}"),
+            "name" if entity not in ("release-group", "release") else "title": (
+                name if i == 0 else f"{name} {i}"
+            ),
+            "score": 100 - i,
+        }
+        for i in range(offset, min(offset + limit, num_results))
+    ]
+    return {
+        "created": "2024-01-01T00:00:00.000Z",
+        "count": num_results,
+        "offset": offset,
+        SEARCH_RESULT_KEYS.get(entity, f"{entity}s"): results,
+    }
+
+
+def create_releases(release_group_mbid, num_releases=3):
+    """Creates the releases of a stub release group (without their media)."""
+    releases = [
+        {
+            "id": create_stub_mbid("release", f"{release_group_mbid}|{i}"),
+            "title": f"release {release_group_mbid[:8]}",
+            "status": "Official",
+            "date": f"{2000 + i}-01-01",
+            "country": "GB",
+        }
+        for i in range(num_releases)
+    ]
+    for release in releases:
+        RELEASE_GROUPS[release["id"]] = release_group_mbid
+    return releases
+
+
+def create_media(release_group_mbid, num_tracks=3):
+    """Creates the media of a release, the releases of a release group share their recordings."""
+    artist_name = f"artist {release_group_mbid[:8]}"
+    artist = {"id": create_stub_mbid("artist", artist_name), "name": artist_name, "type": "Person"}
+    tracks = [
+        {
+            "position": i + 1,
+            "recording": {
+                "id": create_stub_mbid("recording", f"{release_group_mbid}|{i}"),
+                "title": f"recording {i + 1}",
+                "length": 180000 + i * 1000,
+                "artist-credit": [{"name": artist_name, "artist": artist}],
+            },
+        }
+        for i in range(num_tracks)
+    ]
+    return [{"format": "CD", "track-count": num_tracks, "tracks": tracks}]
+
+
+def create_lookup_response(entity, mbid, inc):
+    """Creates a lookup response, with the releases of release groups and the media of releases."""
+    body = {"id": mbid, "name": f"{entity} {mbid[:8]}"}
+    if entity == "artist":
+        body["type"] = "Person"
+    elif entity == "release-group" and "releases" in inc:
+        body["releases"] = create_releases(mbid)
+    elif entity == "release" and "recordings" in inc:
+        body["media"] = create_media(RELEASE_GROUPS.get(mbid, mbid))
+    return body
+
+
+def create_browse_response(entity, linked_entity, mbid, inc, limit, offset=0):
+    """Creates a browse response (e.g., the releases of a release group) in the format of the API."""
+    results = []
+    if entity == "release" and linked_entity == "release-group":
+        results = create_releases(mbid)
+        if "recordings" in inc:
+            for release in results:
+                release["media"] = create_media(mbid)
+    return {
+        f"{entity}-count": len(results),
+        f"{entity}-offset": offset,
+        SEARCH_RESULT_KEYS.get(entity, f"{entity}s"): results[offset : offset + limit],
+    }
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive connections
+
+    def setup(self):
+        super().setup()
+        self.server.record("connections")
+        if self.server.setup_delay > 0:
+            time.sleep(self.server.setup_delay)  # Simulates the handshake round trips of a new connection
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        if len(parts) >= 3 and parts[0] == "ws" and parts[1] == "2":
+            parts = parts[2:]
+
+        linked_entities = [
+            entity for entity in BROWSE_LINKED_ENTITIES.get(parts[0], []) if entity in params
+        ]
+
+        self.server.record("requests")
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        if url.path.rstrip("/") == "/stats":
+            body = dict(self.server.stats)
+        elif len(parts) == 1 and linked_entities:
+            body = create_browse_response(
+                entity=parts[0],
+                linked_entity=linked_entities[0],
+                mbid=params[linked_entities[0]],
+                inc=params.get("inc", "").split("+"),
+                limit=int(params.get("limit", 25)),
+                offset=int(params.get("offset", 0)),
+            )
+        elif len(parts) == 1 and "query" in params:
+            body = create_search_response(
+                entity=parts[0],
+                query=params["query"],
+                limit=int(params.get("limit", 25)),
+                offset=int(params.get("offset", 0)),
+            )
+        elif len(parts) == 2:
+            body = create_lookup_response(parts[0], parts[1], params.get("inc", "").split("+"))
+        else:
+            self.send_json(400, {"error": "Invalid request"})
+            return
+        self.send_json(200, body)
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        is_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        if is_gzip:
+            data = gzip.compress(data)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if is_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Quiet
+
+
+class MusicBrainzStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address=("127.0.0.1", 0), latency=0.0, setup_delay=0.0):
+        """
+        Local HTTP server that stands in for the MusicBrainz API (under /ws/2/), used to benchmark
+        the clients without network access.
+        - Search requests (e.g., /ws/2/artist?query=...) return deterministic results, lookups
+          (e.g., /ws/2/artist/<mbid>) return the MBID with a name, and release groups have releases
+          with recordings, which can be browsed (e.g., /ws/2/release?release-group=<mbid>).
+        - Connections are kept alive, and responses are gzip compressed when accepted.
+
+        Args:
+            server_address (tuple): The (host, port) to listen on (port 0 for any free port).
+            latency (float): The simulated latency of each request (seconds).
+            setup_delay (float): The simulated setup time of each new connection (seconds), standing in
+                                 for the TCP and TLS handshakes with the real API (seen by the client as
+                                 the wait time of the first request on the connection).
+        """
+        super().__init__(server_address, StubRequestHandler)
+        self.latency = latency
+        self.setup_delay = setup_delay
+        self.lock = threading.Lock()
+        self.stats = {"connections": 0, "requests": 0}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/ws/2/"
+
+    def record(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def start(self):
+        """Serves requests in a background thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
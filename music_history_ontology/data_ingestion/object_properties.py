@@ -0,0 +1,108 @@
+import json
+import threading
+
+from typing import Dict, Any, List, KeysView, TextIO, Tuple
+
+_encode = json.JSONEncoder().encode
+
+# Maps id(schema) to (schema, encoded property prefixes), the schema is kept so that the id is not reused
+_ENCODED_SCHEMAS = {}
+_ENCODED_SCHEMAS_LOCK = threading.Lock()
+
+def get_property_info(obj_prop_info_dict:Dict[str, Any], ids:List[str]) -> Dict[str, Any]:
+    """
+    Returns the information on an object property (range names, characteristics, URI) with the given IDs.
+
+    Args:
+        obj_prop_info_dict (Dict[str, Any]): The information on the object property from the class property mappings.
+        ids (List[str]): The IDs of the instances linked by the object property.
+    """
+    property_info = {key: value for key, value in obj_prop_info_dict.items() if key != "ids"}
+    property_info["ids"] = list(ids)
+    return property_info
+
+def get_encoded_schema(schema:Dict[str, Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """
+    Returns the (object property, encoded prefix) pairs for a schema, where the prefix is the JSON
+    of the property up to its IDs, e.g., '"hasGenre": {"range_names": [...], ..., "ids": '.
+    - Each schema is only encoded once, as it is shared by all instances of the class.
+
+    Args:
+        schema (Dict[str, Dict[str, Any]]): The object properties of a class from the class property mappings.
+    """
+    with _ENCODED_SCHEMAS_LOCK:
+        if id(schema) not in _ENCODED_SCHEMAS:
+            encoded_properties = []
+            for obj_prop, obj_prop_info_dict in schema.items():
+                encoded_info = _encode({key: value for key, value in obj_prop_info_dict.items() if key != "ids"})
+                prefix = "{" if encoded_info == "{}" else f"{encoded_info[:-1]}, "
+                encoded_properties.append((obj_prop, f'{_encode(obj_prop)}: {prefix}"ids": '))
+            _ENCODED_SCHEMAS[id(schema)] = (schema, encoded_properties)
+        return _ENCODED_SCHEMAS[id(schema)][1]
+
+class ObjectPropertyLinks:
+    __slots__ = ("schema", "links")
+
+    def __init__(self, schema:Dict[str, Dict[str, Any]], links:Dict[str, List[str]]=None):
+        """
+        The object property links of an instance, stored as a sparse {object property: [IDs]} overlay
+        over the object properties of its class, rather than a deep copy of them per instance.
+        - The schema is shared by all instances of the class and is never modified.
+        - The full object properties (range names, characteristics, URI and IDs) are only
+          materialized when the instance is serialized.
+
+        Args:
+            schema (Dict[str, Dict[str, Any]]): The object properties of the class from the class property mappings.
+            links (Dict[str, List[str]]): The IDs linked by each object property.
+        """
+        self.schema = schema
+        self.links = {} if links is None else links
+
+    def add(self, obj_prop:str, instance_id:str) -> None:
+        """
+        Links an instance via an object property.
+
+        Args:
+            obj_prop (str): The object property.
+            instance_id (str): The ID of the linked instance.
+        """
+        if obj_prop not in self.schema:
+            raise KeyError(f"Object property '{obj_prop}' is not defined for the class.")
+        if obj_prop not in self.links:
+            self.links[obj_prop] = []
+        self.links[obj_prop].append(instance_id)
+
+    def get_ids(self, obj_prop:str) -> List[str]:
+        return self.links.get(obj_prop, [])
+
+    def keys(self) -> KeysView[str]:
+        return self.schema.keys()
+
+    def __contains__(self, obj_prop:str) -> bool:
+        return obj_prop in self.schema
+
+    def materialize(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the object properties in the format of the class property mappings, with the linked IDs.
+        """
+        return {
+                obj_prop: get_property_info(obj_prop_info_dict, ids=self.links.get(obj_prop, []))
+                for obj_prop, obj_prop_info_dict in self.schema.items()
+                }
+
+    def write_json(self, stream:TextIO) -> None:
+        """
+        Writes the JSON equivalent of materialize directly to a text stream, reusing the encoded schema.
+
+        Args:
+            stream (TextIO): The stream to write to.
+        """
+        write = stream.write
+        write("{")
+        for i, (obj_prop, prefix) in enumerate(get_encoded_schema(self.schema)):
+            if i > 0:
+                write(", ")
+            write(prefix)
+            write(_encode(self.links.get(obj_prop, [])))
+            write("}")
+        write("}")
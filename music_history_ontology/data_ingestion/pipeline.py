@@ -0,0 +1,212 @@
+import time
+import queue
+import threading
+
+from typing import Dict, Any, Callable, Union
+
+_STOP = object() # Sentinel telling a worker to exit
+
+class PipelineStage:
+
+    def __init__(self, name:str, func:Callable[[Any, Callable[[str, Any], None]], None], num_workers:int=1, max_queue_size:int=16):
+        """
+        A stage of a Pipeline, processing the items in its input queue with a pool of worker threads.
+
+        Args:
+            name (str): The name of the stage.
+            func (Callable[[Any, Callable[[str, Any], None]], None]): Processes an item, called as func(item, emit) where
+                                                                      emit(stage_name, item) passes an item to another stage.
+            num_workers (int): The number of worker threads.
+            max_queue_size (int): The maximum number of items waiting in the input queue (0 for unbounded).
+        """
+        self.name = name
+        self.func = func
+        self.num_workers = num_workers
+        self.input_queue = queue.Queue(maxsize=max_queue_size)
+        self.workers = []
+        self.lock = threading.Lock()
+
+        self.num_processed = 0
+        self.num_failed = 0
+        self.busy_time = 0.0 # Time spent processing items (excluding the time blocked on downstream stages)
+        self.blocked_time = 0.0 # Time spent waiting for space in a downstream stage's queue (backpressure)
+        self.max_queue_length = 0
+
+    def add_blocked_time(self, seconds:float) -> None:
+        with self.lock:
+            self.blocked_time += seconds
+
+    def record(self, processing_time:float, blocked_time:float, failed:bool) -> None:
+        with self.lock:
+            self.num_processed += 1
+            self.num_failed += int(failed)
+            self.busy_time += processing_time - blocked_time
+
+    def get_stats(self, elapsed_time:float) -> Dict[str, Any]:
+        """
+        Returns the statistics of the stage, where the utilization is the fraction of the workers'
+        time spent processing items.
+
+        Args:
+            elapsed_time (float): The time the pipeline has been running for.
+        """
+        with self.lock:
+            worker_time = max(self.num_workers * elapsed_time, 1e-9)
+            return {
+                    "workers": self.num_workers,
+                    "processed": self.num_processed,
+                    "failed": self.num_failed,
+                    "busy_time": self.busy_time,
+                    "blocked_time": self.blocked_time,
+                    "utilization": self.busy_time / worker_time,
+                    "blocked": self.blocked_time / worker_time,
+                    "queue_length": self.input_queue.qsize(),
+                    "max_queue_length": self.max_queue_length
+                    }
+
+class Pipeline:
+
+    def __init__(self):
+        """
+        Staged producer/consumer pipeline, where each stage has a bounded input queue and its own pool of
+        worker threads, so that independent stages (e.g., fetching the next page while extracting from the
+        current one) overlap.
+        - Items are passed between stages with emit, which blocks while the downstream queue is full, so a
+          slow stage throttles the stages feeding it (backpressure).
+        - The number of pending items (queued or being processed) is tracked so that the caller can tell
+          when all submitted work, including the items it led to, has finished.
+        - The per-stage utilization identifies the bottleneck: the stage with the highest utilization
+          (while its upstream stages are blocked) limits the throughput.
+        """
+        self.stages = {}
+        self.num_pending = 0
+        self.pending_condition = threading.Condition()
+        self.start_time = None
+        self.thread_local = threading.local()
+
+    def add_stage(self, name:str, func:Callable[[Any, Callable[[str, Any], None]], None], num_workers:int=1, max_queue_size:int=16) -> None:
+        """
+        Adds a stage to the pipeline (see PipelineStage).
+
+        Args:
+            name (str): The name of the stage.
+            func (Callable[[Any, Callable[[str, Any], None]], None]): Processes an item, called as func(item, emit).
+            num_workers (int): The number of worker threads.
+            max_queue_size (int): The maximum number of items waiting in the input queue (0 for unbounded).
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists.")
+        self.stages[name] = PipelineStage(name=name, func=func, num_workers=num_workers, max_queue_size=max_queue_size)
+
+    def start(self) -> None:
+        self.start_time = time.perf_counter()
+        for stage in self.stages.values():
+            for i in range(stage.num_workers):
+                worker = threading.Thread(target=self.run_worker, args=(stage,), name=f"{stage.name}-{i}", daemon=True)
+                worker.start()
+                stage.workers.append(worker)
+
+    def emit(self, stage_name:str, item:Any) -> None:
+        """
+        Passes an item to a stage, blocking while its queue is full.
+
+        Args:
+            stage_name (str): The name of the stage.
+            item (Any): The item to process.
+        """
+        stage = self.stages[stage_name]
+        with self.pending_condition:
+            self.num_pending += 1
+        start_time = time.perf_counter()
+        stage.input_queue.put(item)
+        blocked_time = time.perf_counter() - start_time
+
+        # Attribute the time blocked to the stage that emitted the item (if called from a worker)
+        emitting_stage = getattr(self.thread_local, "stage", None)
+        if emitting_stage is not None:
+            emitting_stage.add_blocked_time(blocked_time)
+            self.thread_local.blocked_time += blocked_time
+        with stage.lock:
+            stage.max_queue_length = max(stage.max_queue_length, stage.input_queue.qsize())
+
+    def submit(self, stage_name:str, item:Any) -> None:
+        """
+        Submits an item from outside of the pipeline, blocking while the stage's queue is full.
+
+        Args:
+            stage_name (str): The name of the stage.
+            item (Any): The item to process.
+        """
+        self.emit(stage_name, item)
+
+    def run_worker(self, stage:PipelineStage) -> None:
+        self.thread_local.stage = stage
+        while True:
+            item = stage.input_queue.get()
+            if item is _STOP:
+                break
+            self.thread_local.blocked_time = 0.0
+            start_time = time.perf_counter()
+            failed = False
+            try:
+                stage.func(item, self.emit)
+            except Exception as e:
+                failed = True
+                print(f"Error in pipeline stage '{stage.name}': {e}")
+            stage.record(
+                        processing_time=time.perf_counter() - start_time,
+                        blocked_time=self.thread_local.blocked_time,
+                        failed=failed
+                        )
+            # Decremented after the item's emits, so the count never drops to 0 while work remains
+            with self.pending_condition:
+                self.num_pending -= 1
+                self.pending_condition.notify_all()
+
+    def wait_for_progress(self, timeout:Union[float, None]=None) -> int:
+        """
+        Waits until an item has finished processing (or the timeout has passed), returning the number of pending items.
+
+        Args:
+            timeout (Union[float, None]): The maximum number of seconds to wait.
+        """
+        with self.pending_condition:
+            if self.num_pending > 0:
+                self.pending_condition.wait(timeout=timeout)
+            return self.num_pending
+
+    def join(self) -> None:
+        """
+        Waits until all pending items have been processed.
+        """
+        with self.pending_condition:
+            while self.num_pending > 0:
+                self.pending_condition.wait()
+
+    def stop(self) -> None:
+        """
+        Waits for the pending items and stops the workers.
+        """
+        self.join()
+        for stage in self.stages.values():
+            for _ in stage.workers:
+                stage.input_queue.put(_STOP)
+        for stage in self.stages.values():
+            for worker in stage.workers:
+                worker.join()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        elapsed_time = time.perf_counter() - self.start_time if self.start_time is not None else 0.0
+        return {name: stage.get_stats(elapsed_time) for name, stage in self.stages.items()}
+
+    def report(self) -> None:
+        stats = self.get_stats()
+        for name, stage_stats in stats.items():
+            print(
+                f"Stage: {name} | Workers: {stage_stats['workers']} | Processed: {stage_stats['processed']} | "
+                f"Failed: {stage_stats['failed']} | Utilization: {stage_stats['utilization']:.1%} | "
+                f"Blocked: {stage_stats['blocked']:.1%} | Max queue length: {stage_stats['max_queue_length']}"
+                )
+        if len(stats) > 0:
+            bottleneck = max(stats, key=lambda name: stats[name]["utilization"])
+            print(f"Bottleneck stage: {bottleneck}")
@@ -0,0 +1,463 @@
+import os
+import json
+import time
+import asyncio
+import random
+import threading
+import requests
+
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Callable, Tuple, Union, Iterator
+
+try:
+    import fcntl
+except ImportError: # Not available on Windows
+    fcntl = None
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+THROTTLE_STATUS_CODES = {429, 503}
+
+class TransientError(Exception):
+
+    def __init__(self, message:str, status_code:int=None, retry_after:float=None):
+        """
+        Raised for errors that may succeed if the request is retried, e.g., connection errors
+        or rate limits.
+
+        Args:
+            message (str): Description of the error.
+            status_code (int): The HTTP status code returned by the service (if any).
+            retry_after (float): The number of seconds the service asked to wait before retrying (if any).
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def parse_retry_after(value:Union[str, float, None]) -> Union[float, None]:
+    """
+    Parses the value of a Retry-After header, which is either a number of seconds
+    or an HTTP date.
+
+    Args:
+        value (Union[str, float, None]): The value of the Retry-After header.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def classify_exception(
+                    exception:Exception,
+                    retry_on:Tuple[type, ...]=()
+                    ) -> Tuple[bool, bool, Union[float, None]]:
+    """
+    Classifies an exception raised by a call to an external service.
+    Returns a tuple of (is_retryable, is_throttled, retry_after).
+
+    Args:
+        exception (Exception): The exception to classify.
+        retry_on (Tuple[type, ...]): Additional exception types that should be retried for the endpoint.
+    """
+    response = getattr(exception, "response", None)
+    status_code = getattr(exception, "status_code", None)
+    if status_code is None and response is not None:
+        status_code = getattr(response, "status_code", None)
+
+    retry_after = getattr(exception, "retry_after", None)
+    if retry_after is None and response is not None and getattr(response, "headers", None) is not None:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+    if status_code is not None:
+        is_retryable = status_code in RETRYABLE_STATUS_CODES
+        is_throttled = status_code in THROTTLE_STATUS_CODES
+    else:
+        is_retryable = isinstance(
+                                exception,
+                                (
+                                TransientError,
+                                ConnectionError,
+                                TimeoutError,
+                                requests.exceptions.ConnectionError,
+                                requests.exceptions.Timeout,
+                                ) + tuple(retry_on)
+                                )
+        is_throttled = False
+    return is_retryable, is_throttled, retry_after
+
+class TokenBucket:
+
+    def __init__(self, rate:Union[float, None], capacity:float=1.0):
+        """
+        Thread-safe token bucket rate limiter.
+
+        Args:
+            rate (Union[float, None]): The number of tokens added per second, None for no rate limit.
+            capacity (float): The maximum number of tokens (i.e., the largest burst of requests allowed).
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds:float) -> None:
+        """
+        Stops all callers from acquiring tokens for a number of seconds, e.g., after the
+        service responded with a Retry-After header.
+
+        Args:
+            seconds (float): The number of seconds to pause for.
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+    def acquire(self) -> float:
+        """
+        Blocks until a token is available and takes it. Returns the number of seconds spent waiting.
+        """
+        total_wait = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.rate is None:
+                    return total_wait
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                    self.last_refill = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return total_wait
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            total_wait += wait
+
+class SharedTokenBucket(TokenBucket):
+
+    def __init__(self, path:str, rate:Union[float, None], capacity:float=1.0):
+        """
+        Token bucket rate limiter shared by all the processes (and threads) using the same state file,
+        so that the total rate of requests stays within the limit however many workers are running.
+        - The state (tokens, last refill and pause) is read and written under an exclusive lock on the file.
+        - Without fcntl (e.g., on Windows), the rate is only limited within the process.
+
+        Args:
+            path (str): The path to the state file.
+            rate (Union[float, None]): The number of tokens added per second, None for no rate limit.
+            capacity (float): The maximum number of tokens (i.e., the largest burst of requests allowed).
+        """
+        super().__init__(rate=rate, capacity=capacity)
+        self.path = path
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    @contextmanager
+    def locked_state(self) -> Iterator[Dict[str, float]]:
+        """
+        Yields the shared state while holding the lock on the state file, writing it back afterwards.
+        """
+        with self.lock, open(self.path, "a+") as file:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                try:
+                    state = json.loads(file.read())
+                except ValueError: # New (or corrupted) state file
+                    state = {"tokens": self.capacity, "last_refill": time.time(), "paused_until": 0.0}
+                yield state
+                file.seek(0)
+                file.truncate()
+                file.write(json.dumps(state))
+                file.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def pause(self, seconds:float) -> None:
+        """
+        Stops all callers (in all processes) from acquiring tokens for a number of seconds.
+
+        Args:
+            seconds (float): The number of seconds to pause for.
+        """
+        with self.locked_state() as state:
+            state["paused_until"] = max(state["paused_until"], time.time() + seconds)
+            state["tokens"] = 0.0
+
+    def acquire(self) -> float:
+        """
+        Blocks until a token is available in the shared bucket and takes it. Returns the number of seconds spent waiting.
+        """
+        total_wait = 0.0
+        while True:
+            with self.locked_state() as state:
+                now = time.time() # Shared by all processes (unlike time.monotonic)
+                if now < state["paused_until"]:
+                    wait = state["paused_until"] - now
+                elif self.rate is None:
+                    return total_wait
+                else:
+                    elapsed = max(0.0, now - state["last_refill"])
+                    state["tokens"] = min(self.capacity, state["tokens"] + elapsed * self.rate)
+                    state["last_refill"] = now
+                    if state["tokens"] >= 1:
+                        state["tokens"] -= 1
+                        return total_wait
+                    wait = (1 - state["tokens"]) / self.rate
+            time.sleep(wait)
+            total_wait += wait
+
+class AsyncTokenBucket:
+
+    def __init__(self, rate:Union[float, None], capacity:float=1.0):
+        """
+        Token bucket rate limiter for coroutines of one event loop, where waiting callers take tokens in
+        the order they arrived.
+
+        Args:
+            rate (Union[float, None]): The number of tokens added per second, None for no rate limit.
+            capacity (float): The maximum number of tokens (i.e., the largest burst of requests allowed).
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def pause(self, seconds:float) -> None:
+        """
+        Stops all callers from acquiring tokens for a number of seconds.
+
+        Args:
+            seconds (float): The number of seconds to pause for.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self) -> float:
+        """
+        Waits until a token is available and takes it. Returns the number of seconds spent waiting.
+        """
+        total_wait = 0.0
+        async with self.lock: # Callers queue up behind the first one waiting
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.rate is None:
+                    return total_wait
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                    self.last_refill = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return total_wait
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+                total_wait += wait
+
+class AIMDLimiter:
+
+    def __init__(self, initial_limit:int=4, min_limit:int=1, max_limit:int=32, decrease_factor:float=0.5):
+        """
+        Concurrency limiter using additive-increase/multiplicative-decrease (AIMD).
+        - The limit grows by one after a full window of successful calls.
+        - The limit is multiplied by the decrease factor whenever the service throttles a call.
+
+        Args:
+            initial_limit (int): The initial number of concurrent calls allowed.
+            min_limit (int): The minimum number of concurrent calls allowed.
+            max_limit (int): The maximum number of concurrent calls allowed.
+            decrease_factor (float): The factor the limit is multiplied by when a call is throttled.
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self) -> None:
+        with self.condition:
+            self.limit = min(self.max_limit, self.limit + 1 / max(1.0, self.limit))
+            self.condition.notify_all()
+
+    def on_throttle(self) -> None:
+        with self.condition:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+class ResilientEndpoint:
+
+    def __init__(
+                self,
+                name:str,
+                requests_per_second:Union[float, None]=None,
+                burst:float=1.0,
+                max_retries:int=5,
+                base_delay:float=0.5,
+                max_delay:float=30.0,
+                initial_concurrency:int=4,
+                max_concurrency:int=32,
+                retry_on:Tuple[type, ...]=(),
+                ):
+        """
+        Wraps the calls made to a single external service (e.g., the OpenAI API or Wikipedia) with
+        token bucket rate limiting, retries with exponential backoff and jitter, Retry-After handling
+        and AIMD concurrency control, keeping counters of the retries and the time spent throttled.
+
+        Args:
+            name (str): The name of the endpoint, used when reporting the counters.
+            requests_per_second (Union[float, None]): The rate limit of the service, None for no rate limit.
+            burst (float): The largest burst of requests allowed by the rate limit.
+            max_retries (int): The maximum number of retries for a single call.
+            base_delay (float): The base delay of the exponential backoff in seconds.
+            max_delay (float): The maximum delay between two attempts in seconds.
+            initial_concurrency (int): The initial number of concurrent calls allowed.
+            max_concurrency (int): The maximum number of concurrent calls allowed.
+            retry_on (Tuple[type, ...]): Additional exception types that should be retried.
+        """
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.bucket = TokenBucket(rate=requests_per_second, capacity=burst)
+        self.limiter = AIMDLimiter(initial_limit=initial_concurrency, max_limit=max_concurrency)
+
+        self.stats_lock = threading.Lock()
+        self.stats = {
+                    "calls": 0,
+                    "successes": 0,
+                    "failures": 0,
+                    "retries": 0,
+                    "throttled": 0,
+                    "throttle_time": 0.0,
+                    }
+
+    def record(self, **increments:Dict[str, Union[int, float]]) -> None:
+        with self.stats_lock:
+            for counter, increment in increments.items():
+                self.stats[counter] += increment
+
+    def get_backoff_delay(self, attempt:int) -> float:
+        """
+        Returns the delay before the next attempt, using exponential backoff with full jitter.
+
+        Args:
+            attempt (int): The number of the attempt that failed (starting from 0).
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, func:Callable, *args:Any, **kwargs:Any) -> Any:
+        """
+        Calls a function that makes a request to the service, retrying transient errors.
+        Non-retryable errors and errors remaining after the final retry are re-raised.
+
+        Args:
+            func (Callable): The function that makes the request.
+            args: Positional arguments for the function.
+            kwargs: Keyword arguments for the function.
+        """
+        self.record(calls=1)
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire()
+            if waited > 0:
+                self.record(throttle_time=waited)
+
+            with self.limiter:
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                    is_retryable, is_throttled, retry_after = classify_exception(exception=e, retry_on=self.retry_on)
+                    if not is_retryable or attempt == self.max_retries:
+                        self.record(failures=1)
+                        raise
+                else:
+                    self.limiter.on_success()
+                    self.record(successes=1)
+                    return result
+
+            # Wait before retrying (outside the concurrency limiter, so other calls can proceed)
+            if retry_after is not None:
+                # Spread the callers waking up after the Retry-After period, avoiding a burst of requests
+                delay = min(retry_after, self.max_delay) + random.uniform(0, self.base_delay)
+            else:
+                delay = self.get_backoff_delay(attempt=attempt)
+            if is_throttled:
+                self.limiter.on_throttle()
+                self.bucket.pause(delay) # All callers wait, avoiding a storm of throttled requests
+                self.record(throttled=1, throttle_time=delay)
+            print(f"[{self.name}] Retrying after error ({type(error).__name__}: {error}) in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+            self.record(retries=1)
+            time.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["concurrency_limit"] = int(self.limiter.limit)
+        return stats
+
+ENDPOINTS = {}
+_ENDPOINTS_LOCK = threading.Lock()
+
+def configure_endpoint(name:str, **config:Any) -> ResilientEndpoint:
+    """
+    Creates (or replaces) the shared endpoint with the given name and configuration.
+
+    Args:
+        name (str): The name of the endpoint, e.g., "wikipedia".
+        config: Keyword arguments for ResilientEndpoint.
+    """
+    with _ENDPOINTS_LOCK:
+        ENDPOINTS[name] = ResilientEndpoint(name=name, **config)
+        return ENDPOINTS[name]
+
+def get_endpoint(name:str, **default_config:Any) -> ResilientEndpoint:
+    """
+    Returns the shared endpoint with the given name, creating it with the default configuration
+    if it has not been configured yet.
+
+    Args:
+        name (str): The name of the endpoint, e.g., "wikipedia".
+        default_config: Keyword arguments for ResilientEndpoint, used if the endpoint does not exist yet.
+    """
+    with _ENDPOINTS_LOCK:
+        if name not in ENDPOINTS:
+            ENDPOINTS[name] = ResilientEndpoint(name=name, **default_config)
+        return ENDPOINTS[name]
+
+def report_endpoint_stats() -> None:
+    """
+    Prints the counters for every endpoint.
+    """
+    for name, endpoint in ENDPOINTS.items():
+        stats = endpoint.get_stats()
+        print(
+            f"Endpoint: {name} | Calls: {stats['calls']} | Successes: {stats['successes']} | Failures: {stats['failures']} | "
+            f"Retries: {stats['retries']} | Throttled: {stats['throttled']} | Time throttled: {stats['throttle_time']:.2f}s | "
+            f"Concurrency limit: {stats['concurrency_limit']}"
+            )
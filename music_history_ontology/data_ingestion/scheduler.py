@@ -0,0 +1,135 @@
+import time
+import threading
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Callable, Hashable, Iterable, List
+
+class Task:
+
+    def __init__(self, key:Hashable, func:Callable[..., Any], args:tuple, dependencies:Iterable[Hashable]):
+        """
+        A task of a TaskGraph.
+
+        Args:
+            key (Hashable): The key of the task, e.g., ("artist", "Queen").
+            func (Callable[..., Any]): The function to run, called as func(*args).
+            args (tuple): The arguments to the function.
+            dependencies (Iterable[Hashable]): The keys of the tasks that must finish before this task starts.
+        """
+        self.key = key
+        self.func = func
+        self.args = args
+        self.dependencies = list(dependencies)
+
+class TaskGraph:
+
+    def __init__(self, num_workers:int=4):
+        """
+        Dependency-aware scheduler running the tasks of a graph with a pool of worker threads, where each task starts
+        once all of the tasks it depends on have finished (e.g., processing a release after its artist).
+        - Independent tasks overlap, so the local work of some tasks (parsing, validation, writing files) runs while
+          others wait for the network (e.g., for a rate-limited client shared by all the tasks).
+        - Dependencies only order the tasks: a task still runs if one of its dependencies failed, and dependencies
+          on keys that are not tasks of the graph are ignored.
+        - Ready tasks start in the order they were added.
+
+        Args:
+            num_workers (int): The number of worker threads.
+        """
+        self.num_workers = num_workers
+        self.tasks:Dict[Hashable, Task] = {}
+        self.results:Dict[Hashable, Any] = {}
+        self.errors:Dict[Hashable, Exception] = {}
+        self.lock = threading.Lock()
+
+        self.busy_time = 0.0 # Total time spent running tasks
+        self.elapsed_time = 0.0
+
+    def add_task(self, key:Hashable, func:Callable[..., Any], *args:Any, dependencies:Iterable[Hashable]=()) -> None:
+        """
+        Adds a task to the graph.
+
+        Args:
+            key (Hashable): The unique key of the task.
+            func (Callable[..., Any]): The function to run, called as func(*args).
+            *args (Any): The arguments to the function.
+            dependencies (Iterable[Hashable]): The keys of the tasks that must finish before this task starts.
+        """
+        if key in self.tasks:
+            raise ValueError(f"Task {key} was already added.")
+        self.tasks[key] = Task(key=key, func=func, args=args, dependencies=dependencies)
+
+    def run_task(self, task:Task) -> None:
+        start_time = time.perf_counter()
+        try:
+            result = task.func(*task.args)
+            with self.lock:
+                self.results[task.key] = result
+        except Exception as e:
+            print(f"Task {task.key} failed: {e}")
+            with self.lock:
+                self.errors[task.key] = e
+        finally:
+            with self.lock:
+                self.busy_time += time.perf_counter() - start_time
+
+    def run(self) -> Dict[Hashable, Any]:
+        """
+        Runs all the tasks, returning the result of each task that succeeded (the exceptions raised by
+        the others are in self.errors).
+        """
+        remaining = {
+                    key: set(dependency for dependency in task.dependencies if dependency in self.tasks and dependency != key)
+                    for key, task in self.tasks.items()
+                    }
+        dependents:Dict[Hashable, List[Hashable]] = defaultdict(list)
+        for key, dependencies in remaining.items():
+            for dependency in dependencies:
+                dependents[dependency].append(key)
+        ready = [key for key, dependencies in remaining.items() if not dependencies]
+
+        start_time = time.perf_counter()
+        num_finished = 0
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            running = {}
+            while ready or running:
+                for key in ready:
+                    running[executor.submit(self.run_task, self.tasks[key])] = key
+                ready = []
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    num_finished += 1
+                    for dependent in dependents[key]:
+                        remaining[dependent].discard(key)
+                        if not remaining[dependent]:
+                            ready.append(dependent)
+        self.elapsed_time = time.perf_counter() - start_time
+
+        if num_finished < len(self.tasks):
+            raise ValueError(f"The dependencies of {len(self.tasks) - num_finished} tasks form a cycle.")
+        return self.results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns the statistics of the run, where the utilization is the fraction of the workers' time
+        spent running tasks.
+        """
+        with self.lock:
+            worker_time = max(self.num_workers * self.elapsed_time, 1e-9)
+            return {
+                    "tasks": len(self.tasks),
+                    "failed": len(self.errors),
+                    "workers": self.num_workers,
+                    "elapsed_time": self.elapsed_time,
+                    "utilization": self.busy_time / worker_time
+                    }
+
+    def report(self) -> None:
+        stats = self.get_stats()
+        print(
+            f"Task graph | Tasks: {stats['tasks']} | Failed: {stats['failed']} | Workers: {stats['workers']} | "
+            f"Elapsed: {stats['elapsed_time']:.2f}s | Utilization: {stats['utilization']:.1%}"
+            )
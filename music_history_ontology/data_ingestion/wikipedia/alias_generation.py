@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import threading
+
+from slugify import slugify
+from typing import Dict, List, Union
+from music_history_ontology.data_ingestion.wikipedia.llm import LLMTextGenerator
+from music_history_ontology.data_ingestion.wikipedia.work_queue import WorkQueue
+
+DISAMBIGUATION_PATTERN = re.compile(r"^(.*?)\s*\(([^()]*)\)\s*$") # E.g., "Thriller (album)" -> ("Thriller", "album")
+AMBIGUOUS_TITLE_PREFIXES = ("list of", "index of", "outline of", "timeline of", "glossary of")
+
+class AliasRegistry:
+
+    def __init__(self, file_path:str=None, save_every:int=100, shared_store:WorkQueue=None):
+        """
+        Persistent registry of the aliases that have been assigned, mapping each alias to the
+        source it was assigned to (e.g., the canonical Wikipedia title and class), so that aliases
+        stay unique and stable across runs.
+        - With a shared store, aliases are assigned in the store, so that they are unique and stable across
+          all of the workers (e.g., a page processed again by another worker after a crash keeps its alias).
+
+        Args:
+            file_path (str): Path to the JSON file the registry is persisted to (None to keep it in memory only).
+            save_every (int): The number of new aliases after which the registry is saved.
+            shared_store (WorkQueue): The store the aliases are assigned in, shared with other processes (None if the
+                                      registry is not shared), e.g., the SQLite work queue.
+        """
+        self.file_path = file_path
+        self.save_every = save_every
+        self.shared_store = shared_store
+        self.lock = threading.Lock()
+        self.alias_to_source = {}
+        self.source_to_alias = {}
+        self.num_unsaved = 0
+
+        if self.file_path is not None and os.path.exists(self.file_path):
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                self.alias_to_source = json.load(f)
+            self.source_to_alias = {source: alias for alias, source in self.alias_to_source.items()}
+
+    def get_alias(self, source_key:str) -> Union[str, None]:
+        with self.lock:
+            return self.get_assigned_alias(source_key)
+
+    def get_assigned_alias(self, source_key:str) -> Union[str, None]:
+        # Called with the lock held
+        alias = self.source_to_alias.get(source_key, None)
+        if alias is None and self.shared_store is not None:
+            alias = self.shared_store.get_alias(source_key)
+            if alias is not None:
+                self.alias_to_source[alias] = source_key
+                self.source_to_alias[source_key] = alias
+        return alias
+
+    def is_available(self, alias:str, source_key:str) -> bool:
+        if alias in self.alias_to_source:
+            return self.alias_to_source[alias] == source_key
+        return self.shared_store is None or self.shared_store.claim_alias(alias, source_key)
+
+    def register(self, source_key:str, candidate_aliases:List[str]) -> str:
+        """
+        Assigns the first candidate alias that is not taken by another source, falling back to
+        numbered suffixes of the first candidate (e.g., "mozart-musician-2"). Returns the alias
+        already assigned to the source if there is one.
+
+        Args:
+            source_key (str): The key identifying the source of the alias.
+            candidate_aliases (List[str]): The aliases to try, in order of preference.
+        """
+        with self.lock:
+            alias = self.get_assigned_alias(source_key)
+            if alias is not None:
+                return alias
+
+            for candidate_alias in candidate_aliases:
+                if self.is_available(candidate_alias, source_key):
+                    alias = candidate_alias
+                    break
+            suffix = 2
+            while alias is None:
+                if self.is_available(f"{candidate_aliases[0]}-{suffix}", source_key):
+                    alias = f"{candidate_aliases[0]}-{suffix}"
+                suffix += 1
+
+            self.alias_to_source[alias] = source_key
+            self.source_to_alias[source_key] = alias
+            self.num_unsaved += 1
+            should_save = self.num_unsaved >= self.save_every
+        if should_save:
+            self.save()
+        return alias
+
+    def save(self) -> None:
+        if self.file_path is None:
+            return
+        with self.lock:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            temp_file_path = f"{self.file_path}.tmp"
+            with open(temp_file_path, "w", encoding="utf-8") as f:
+                json.dump(self.alias_to_source, f, indent=4, ensure_ascii=False)
+            os.replace(temp_file_path, self.file_path) # Atomic, so the registry is never left half-written
+            self.num_unsaved = 0
+
+class RuleBasedAliasGenerator:
+
+    def __init__(self, registry:AliasRegistry, llm:LLMTextGenerator=None):
+        """
+        Generates aliases locally from the canonical Wikipedia title and the last part of the predicted
+        class, i.e., slugify(f"{name}-{class name}") (e.g., "wolfgang-amadeus-mozart-musician"). This differs
+        from the MusicBrainz aliases of conversion.convert_files, which use the full class path
+        (e.g., "wolfgang-amadeus-mozart-thing-musicartist-musician").
+        - Aliases are made unique with the registry, using the disambiguation from the title
+          on collisions (e.g., "Thriller (Michael Jackson album)" -> "thriller-album", or
+          "thriller-michael-jackson-album" if taken), otherwise a numbered suffix.
+        - Only ambiguous titles (e.g., lists, disambiguation pages) fall back to the LLM (if provided).
+
+        Args:
+            registry (AliasRegistry): The registry of assigned aliases.
+            llm (LLMTextGenerator): The LLMTextGenerator with the role "alias_generation", used for ambiguous titles.
+        """
+        if llm is not None and llm.role != "alias_generation":
+            raise ValueError(f"The LLM fallback must have the role 'alias_generation', not '{llm.role}'.")
+        self.registry = registry
+        self.llm = llm
+        self.num_rule_based = 0
+        self.num_llm_fallbacks = 0
+
+    def is_ambiguous(self, page_title:Union[str, None]) -> bool:
+        """
+        Checks whether a title cannot be turned into a meaningful alias by the rules.
+
+        Args:
+            page_title (Union[str, None]): The canonical Wikipedia title of the page.
+        """
+        if page_title is None or slugify(page_title) == "":
+            return True
+        lower_title = page_title.lower()
+        if lower_title.startswith(AMBIGUOUS_TITLE_PREFIXES):
+            return True
+        match = DISAMBIGUATION_PATTERN.match(page_title)
+        return match is not None and match.group(2).lower() == "disambiguation"
+
+    def get_candidate_aliases(self, page_title:str, predicted_class:str) -> List[str]:
+        """
+        Returns the candidate aliases for a title in order of preference.
+
+        Args:
+            page_title (str): The canonical Wikipedia title of the page.
+            predicted_class (str): The predicted class of the instance, e.g., "Thing.MusicArtist.Musician".
+        """
+        class_name = predicted_class.split(".")[-1]
+        match = DISAMBIGUATION_PATTERN.match(page_title)
+        if match is None or not match.group(1):
+            return [slugify(f"{page_title}-{class_name}")]
+
+        name, disambiguation = match.group(1), match.group(2)
+        if slugify(class_name) in slugify(disambiguation): # E.g., "album" in "michael-jackson-album"
+            return [slugify(f"{name}-{class_name}"), slugify(f"{name}-{disambiguation}")]
+        return [slugify(f"{name}-{class_name}"), slugify(f"{name}-{disambiguation}-{class_name}")]
+
+    def get_source_key(self, page_title:Union[str, None], predicted_class:str, search_query:str=None) -> str:
+        """
+        Returns the key identifying the source of an alias in the registry (the search query is used
+        if the page title is unknown).
+
+        Args:
+            page_title (Union[str, None]): The canonical Wikipedia title of the page.
+            predicted_class (str): The predicted class of the instance.
+            search_query (str): The search query of the instance.
+        """
+        if page_title is None:
+            return f"query:{search_query}|{predicted_class}"
+        return f"{page_title}|{predicted_class}"
+
+    def register_generated_alias(
+                                self,
+                                generated_alias:str,
+                                page_title:Union[str, None],
+                                predicted_class:str,
+                                search_query:str=None
+                                ) -> Union[str, None]:
+        """
+        Registers an alias generated by the LLM, returning the unique alias assigned (None if it is empty).
+
+        Args:
+            generated_alias (str): The alias generated by the LLM.
+            page_title (Union[str, None]): The canonical Wikipedia title of the page.
+            predicted_class (str): The predicted class of the instance.
+            search_query (str): The search query of the instance.
+        """
+        alias = slugify(generated_alias)
+        if alias == "":
+            return None
+        source_key = self.get_source_key(page_title=page_title, predicted_class=predicted_class, search_query=search_query)
+        return self.registry.register(source_key, [alias])
+
+    def execute(
+                self,
+                page_title:str,
+                predicted_class:str,
+                text:str=None,
+                search_query:str=None,
+                class_hierarchy_tree:str=None
+                ) -> Union[Dict[str, str], None]:
+        """
+        Generates a unique alias for an instance, returning the same structure as the LLM alias generator.
+
+        Args:
+            page_title (str): The canonical Wikipedia title of the page.
+            predicted_class (str): The predicted class of the instance.
+            text (str): The context text (only used for the LLM fallback).
+            search_query (str): The search query of the instance (only used for the LLM fallback).
+            class_hierarchy_tree (str): The string equivalent of the class hierarchy tree JSON for the ontology (only used for the LLM fallback).
+        """
+        source_key = self.get_source_key(page_title=page_title, predicted_class=predicted_class, search_query=search_query)
+        alias = self.registry.get_alias(source_key)
+        if alias is not None:
+            return {"alias": alias}
+
+        if not self.is_ambiguous(page_title):
+            self.num_rule_based += 1
+            candidate_aliases = self.get_candidate_aliases(page_title=page_title, predicted_class=predicted_class)
+            return {"alias": self.registry.register(source_key, candidate_aliases)}
+
+        if self.llm is None:
+            return None
+        self.num_llm_fallbacks += 1
+        generated_alias_json = self.llm.execute(
+                                                text=text,
+                                                search_query=search_query,
+                                                class_hierarchy_tree=class_hierarchy_tree,
+                                                predicted_class=predicted_class
+                                                )
+        if generated_alias_json is None:
+            return None
+        alias = self.register_generated_alias(
+                                            generated_alias=generated_alias_json["alias"],
+                                            page_title=page_title,
+                                            predicted_class=predicted_class,
+                                            search_query=search_query
+                                            )
+        return None if alias is None else {"alias": alias}
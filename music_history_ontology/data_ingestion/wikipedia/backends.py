@@ -0,0 +1,273 @@
+import os
+import json
+import httpx
+import asyncio
+import hashlib
+import threading
+import openai
+
+from typing import Dict, Any, Union
+from langchain_openai import ChatOpenAI
+from music_history_ontology.data_ingestion.resilience import TransientError
+from music_history_ontology.data_ingestion.wikipedia.standin_server import synthesise_response
+
+class LLMBackendError(TransientError):
+    """
+    Raised when an LLM backend fails to produce a completion. Errors with a status code are
+    retried depending on the status code (e.g., 429, 5xx), errors without one (e.g., connection
+    errors) are always retried.
+    """
+
+class LLMBackend:
+    """
+    Interface for the model providers used by LLMTextGenerator. Backends only turn a
+    (system prompt, user prompt) pair into a completion; prompt rendering and parsing
+    stay within LLMTextGenerator.
+    - Backends must be safe to use from several threads, as a single instance is shared 
+      by all roles (see client_pool.py).
+    - Backends that make HTTP requests accept the shared httpx clients of the pool 
+      (accepts_http_clients = True), so that keep-alive connections are reused.
+    """
+    name = None
+    accepts_http_clients = False
+
+    def generate(self, system_prompt:str, user_prompt:str, role:str, response_format:Dict[str, Any]=None) -> str:
+        """
+        Generates a completion for the given prompts.
+
+        Args:
+            system_prompt (str): The system prompt for the role.
+            user_prompt (str): The rendered user prompt.
+            role (str): The role of the LLMTextGenerator making the request.
+            response_format (Dict[str, Any]): The JSON schema response format to request (if any), see structured_output.py.
+        """
+        raise NotImplementedError
+    
+    async def agenerate(self, system_prompt:str, user_prompt:str, role:str, response_format:Dict[str, Any]=None) -> str:
+        """
+        Generates a completion for the given prompts asynchronously (runs generate in a thread by default).
+
+        Args:
+            system_prompt (str): The system prompt for the role.
+            user_prompt (str): The rendered user prompt.
+            role (str): The role of the LLMTextGenerator making the request.
+            response_format (Dict[str, Any]): The JSON schema response format to request (if any), see structured_output.py.
+        """
+        return await asyncio.to_thread(
+                                    self.generate, 
+                                    system_prompt=system_prompt, 
+                                    user_prompt=user_prompt, 
+                                    role=role, 
+                                    response_format=response_format
+                                    )
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+    accepts_http_clients = True
+
+    def __init__(
+                self, 
+                model:str="gpt-4o-mini", 
+                api_key:str=None, 
+                http_client:httpx.Client=None, 
+                http_async_client:httpx.AsyncClient=None
+                ):
+        """
+        Backend for the OpenAI chat completions API.
+
+        Args:
+            model (str): The name of the OpenAI model.
+            api_key (str): The OpenAI API key, defaults to the OPENAI_API_KEY environment variable.
+            http_client (httpx.Client): The (shared) HTTP client for synchronous requests.
+            http_async_client (httpx.AsyncClient): The (shared) HTTP client for asynchronous requests.
+        """
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if api_key is None:
+            raise ValueError("OPENAI_API_KEY environment variable is not set.")
+        self.model_name = model
+        self.model = ChatOpenAI(
+                                api_key=api_key, 
+                                model=model, 
+                                max_retries=0, # Retries are handled by the resilience layer
+                                http_client=http_client,
+                                http_async_client=http_async_client
+                                )
+
+    def generate(self, system_prompt:str, user_prompt:str, role:str, response_format:Dict[str, Any]=None) -> str:
+        kwargs = {"response_format": response_format} if response_format is not None else {}
+        try:
+            generated_answer = self.model.invoke([("system", system_prompt), ("user", user_prompt)], **kwargs)
+        except openai.APIConnectionError as e: # Includes timeouts
+            raise LLMBackendError(f"Error connecting to the OpenAI API: {e}") from e
+        return generated_answer.content
+    
+    async def agenerate(self, system_prompt:str, user_prompt:str, role:str, response_format:Dict[str, Any]=None) -> str:
+        kwargs = {"response_format": response_format} if response_format is not None else {}
+        try:
+            generated_answer = await self.model.ainvoke([("system", system_prompt), ("user", user_prompt)], **kwargs)
+        except openai.APIConnectionError as e:
+            raise LLMBackendError(f"Error connecting to the OpenAI API: {e}") from e
+        return generated_answer.content
+
+class StandInBackend(LLMBackend):
+    name = "standin"
+    accepts_http_clients = True
+
+    def __init__(
+                self, 
+                url:str=None, 
+                timeout:float=60.0, 
+                http_client:httpx.Client=None, 
+                http_async_client:httpx.AsyncClient=None
+                ):
+        """
+        Backend for the local stand-in server (see standin_server.py), used for offline
+        load testing and benchmarking.
+
+        Args:
+            url (str): The base URL of the stand-in server, defaults to the LLM_STANDIN_URL environment
+                       variable or http://127.0.0.1:8765.
+            timeout (float): The request timeout in seconds.
+            http_client (httpx.Client): The (shared) HTTP client for synchronous requests.
+            http_async_client (httpx.AsyncClient): The (shared) HTTP client for asynchronous requests.
+        """
+        self.url = (url or os.getenv("LLM_STANDIN_URL", "http://127.0.0.1:8765")).rstrip("/")
+        self.timeout = timeout
+        self.http_client = http_client if http_client is not None else httpx.Client()
+        self.http_async_client = http_async_client
+
+    def get_request_body(self, system_prompt:str, user_prompt:str, role:str, response_format:Dict[str, Any]=None) -> Dict[str, Any]:
+        return {"role": role, "system": system_prompt, "user": user_prompt, "response_format": response_format}
+
+    def parse_response(self, response:httpx.Response) -> str:
+        """
+        Returns the completion from a response of the stand-in server.
+
+        Args:
+            response (httpx.Response): The response of the stand-in server.
+        """
+        if response.status_code != 200:
+            retry_after = response.headers.get("Retry-After")
+            raise LLMBackendError(
+                                f"Stand-in server returned status code {response.status_code}",
+                                status_code=response.status_code,
+                                retry_after=float(retry_after) if retry_after is not None else None
+                                )
+        return response.json()["content"]
+
+    def generate(self, system_prompt:str, user_prompt:str, role:str, response_format:Dict[str, Any]=None) -> str:
+        try:
+            response = self.http_client.post(
+                                            f"{self.url}/v1/generate",
+                                            json=self.get_request_body(system_prompt, user_prompt, role, response_format),
+                                            timeout=self.timeout
+                                            )
+        except httpx.HTTPError as e:
+            raise LLMBackendError(f"Error making request to the stand-in server: {e}")
+        return self.parse_response(response)
+    
+    async def agenerate(self, system_prompt:str, user_prompt:str, role:str, response_format:Dict[str, Any]=None) -> str:
+        if self.http_async_client is None:
+            self.http_async_client = httpx.AsyncClient()
+        try:
+            response = await self.http_async_client.post(
+                                                        f"{self.url}/v1/generate",
+                                                        json=self.get_request_body(system_prompt, user_prompt, role, response_format),
+                                                        timeout=self.timeout
+                                                        )
+        except httpx.HTTPError as e:
+            raise LLMBackendError(f"Error making request to the stand-in server: {e}")
+        return self.parse_response(response)
+
+class ReplayBackend(LLMBackend):
+    name = "replay"
+
+    def __init__(self, fixture_path:str=None, record_backend:LLMBackend=None):
+        """
+        Deterministic backend that replays completions from a JSONL fixture file.
+        - Prompts that are not in the fixture are answered with a synthesised completion, or,
+          if a record backend is provided, with a completion from that backend, which is then
+          appended to the fixture for later replays.
+
+        Args:
+            fixture_path (str): Path to the JSONL fixture file, defaults to the LLM_REPLAY_FIXTURE environment variable.
+            record_backend (LLMBackend): The backend used to record completions for prompts missing from the fixture.
+        """
+        self.fixture_path = fixture_path or os.getenv("LLM_REPLAY_FIXTURE")
+        self.record_backend = record_backend
+        self.lock = threading.Lock()
+        self.completions = {}
+
+        if self.fixture_path is not None and os.path.exists(self.fixture_path):
+            with open(self.fixture_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    self.completions[record["key"]] = record["completion"]
+
+    def get_key(self, system_prompt:str, user_prompt:str, role:str) -> str:
+        """
+        Creates the fixture key for a request.
+
+        Args:
+            system_prompt (str): The system prompt for the role.
+            user_prompt (str): The rendered user prompt.
+            role (str): The role of the LLMTextGenerator making the request.
+        """
+        return hashlib.sha256(f"{role}\n{system_prompt}\n{user_prompt}".encode("utf-8")).hexdigest()
+
+    def generate(self, system_prompt:str, user_prompt:str, role:str, response_format:Dict[str, Any]=None) -> str:
+        key = self.get_key(system_prompt=system_prompt, user_prompt=user_prompt, role=role)
+        with self.lock:
+            if key in self.completions:
+                return self.completions[key]
+
+        if self.record_backend is None:
+            return synthesise_response(role=role, user_prompt=user_prompt)
+
+        completion = self.record_backend.generate(
+                                                system_prompt=system_prompt,
+                                                user_prompt=user_prompt,
+                                                role=role,
+                                                response_format=response_format
+                                                )
+        with self.lock:
+            self.completions[key] = completion
+            if self.fixture_path is not None:
+                with open(self.fixture_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "role": role, "completion": completion}, ensure_ascii=False) + "\n")
+        return completion
+
+LLM_BACKENDS = {
+            OpenAIBackend.name: OpenAIBackend,
+            StandInBackend.name: StandInBackend,
+            ReplayBackend.name: ReplayBackend,
+            }
+
+def register_backend(name:str, backend_class:type) -> None:
+    """
+    Registers a new backend so that it can be selected by name.
+
+    Args:
+        name (str): The name used to select the backend, e.g., via the LLM_BACKEND environment variable.
+        backend_class (type): The LLMBackend subclass.
+    """
+    LLM_BACKENDS[name] = backend_class
+
+def create_backend(backend:Union[str, LLMBackend, None]=None, **kwargs:Dict[str, Any]) -> LLMBackend:
+    """
+    Creates an LLM backend from its registered name.
+
+    Args:
+        backend (Union[str, LLMBackend, None]): The name of the backend, an existing backend (returned as is) or None
+                                                to use the LLM_BACKEND environment variable (defaults to "openai").
+        kwargs: Keyword arguments passed to the backend.
+    """
+    if isinstance(backend, LLMBackend):
+        return backend
+    if backend is None:
+        backend = os.getenv("LLM_BACKEND", OpenAIBackend.name)
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Backend '{backend}' is not supported. Supported backends are: {list(LLM_BACKENDS.keys())}.")
+    return LLM_BACKENDS[backend](**kwargs)
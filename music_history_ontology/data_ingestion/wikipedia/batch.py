@@ -0,0 +1,392 @@
+import os
+import json
+import time
+import openai
+
+from typing import Dict, Any, List, Tuple, Union
+from music_history_ontology.data_ingestion.wikipedia.llm import LLMTextGenerator
+from music_history_ontology.data_ingestion.wikipedia.backends import LLMBackend
+from music_history_ontology.data_ingestion.object_properties import ObjectPropertyLinks
+from music_history_ontology.data_ingestion.wikipedia.instance import DataInstance
+from music_history_ontology.data_ingestion.wikipedia.alias_generation import RuleBasedAliasGenerator
+from music_history_ontology.data_ingestion.wikipedia.constants import CLASS_PROPERTY_MAPPINGS
+from music_history_ontology.data_ingestion.wikipedia.standin_server import synthesise_response
+from music_history_ontology.data_ingestion.wikipedia.structured_output import build_response_format
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+def create_custom_id(role:str, instance_id:str) -> str:
+    """
+    Creates the custom ID of a batch request, e.g., "information_extraction:<DataInstance ID>".
+
+    Args:
+        role (str): The role of the LLMTextGenerator the request is for.
+        instance_id (str): The ID of the DataInstance the request is for.
+    """
+    return f"{role}:{instance_id}"
+
+def parse_custom_id(custom_id:str) -> Tuple[str, str]:
+    """
+    Splits a custom ID into the (role, DataInstance ID).
+
+    Args:
+        custom_id (str): The custom ID of a batch request.
+    """
+    role, instance_id = custom_id.split(":", 1)
+    return role, instance_id
+
+def render_batch_request(
+                        llm:LLMTextGenerator,
+                        custom_id:str,
+                        model:str,
+                        **kwargs:Any
+                        ) -> Dict[str, Any]:
+    """
+    Renders a single line of a batch request file (OpenAI batch format) using the prompt of the given role.
+
+    Args:
+        llm (LLMTextGenerator): The LLMTextGenerator for the role of the request.
+        custom_id (str): The custom ID used to join the result back to the request.
+        model (str): The name of the model.
+        kwargs: Keyword arguments for LLMTextGenerator.execute (e.g., text, json_structure).
+    """
+    body = {
+            "model": model,
+            "messages": [
+                        {"role": "system", "content": llm.system_prompt},
+                        {"role": "user", "content": llm.render_prompt(**kwargs)}
+                        ],
+            }
+    if llm.structured_output:
+        body["response_format"] = build_response_format(
+                                                        role=llm.role,
+                                                        json_structure=kwargs.get("json_structure", None),
+                                                        candidate_classes=kwargs.get("candidate_classes", None)
+                                                        )
+    return {"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_URL, "body": body}
+
+def write_jsonl(records:List[Dict[str, Any]], file_path:str) -> None:
+    with open(file_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def read_batch_results(file_path:str) -> Dict[str, Union[str, None]]:
+    """
+    Reads a batch output file, returning the completion for each custom ID (None if the request failed).
+
+    Args:
+        file_path (str): Path to the batch output file.
+    """
+    results = {}
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response", None)
+            if record.get("error", None) is not None or response is None or response.get("status_code", None) != 200:
+                results[record["custom_id"]] = None
+                continue
+            results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    return results
+
+class BatchBackend:
+    """
+    Interface for providers that process a batch request file offline.
+    """
+    name = None
+
+    def submit(self, request_file_path:str) -> str:
+        """
+        Submits a batch request file, returning the ID of the batch job.
+
+        Args:
+            request_file_path (str): Path to the JSONL batch request file.
+        """
+        raise NotImplementedError
+
+    def wait(self, batch_id:str, output_file_path:str) -> str:
+        """
+        Waits for a batch job to complete and writes its results to the output file, returning the path.
+
+        Args:
+            batch_id (str): The ID of the batch job.
+            output_file_path (str): Path to write the JSONL batch output file to.
+        """
+        raise NotImplementedError
+
+class OpenAIBatchBackend(BatchBackend):
+    name = "openai"
+
+    def __init__(self, api_key:str=None, completion_window:str="24h", poll_interval:float=60.0):
+        """
+        Batch backend for the OpenAI Batch API.
+
+        Args:
+            api_key (str): The OpenAI API key, defaults to the OPENAI_API_KEY environment variable.
+            completion_window (str): The time frame within which the batch should be processed.
+            poll_interval (float): The number of seconds between checks of the batch status.
+        """
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if api_key is None:
+            raise ValueError("OPENAI_API_KEY environment variable is not set.")
+        self.client = openai.OpenAI(api_key=api_key)
+        self.completion_window = completion_window
+        self.poll_interval = poll_interval
+
+    def submit(self, request_file_path:str) -> str:
+        with open(request_file_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+                                        input_file_id=input_file.id,
+                                        endpoint=CHAT_COMPLETIONS_URL,
+                                        completion_window=self.completion_window
+                                        )
+        return batch.id
+
+    def wait(self, batch_id:str, output_file_path:str) -> str:
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            print(f"Batch {batch_id} | Status: {batch.status} | Request counts: {batch.request_counts}")
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch {batch_id} finished with status: {batch.status}")
+            time.sleep(self.poll_interval)
+
+        with open(output_file_path, "w", encoding="utf-8") as f:
+            if batch.output_file_id is not None:
+                f.write(self.client.files.content(batch.output_file_id).text)
+            if batch.error_file_id is not None: # Failed requests (these are retried synchronously)
+                f.write(self.client.files.content(batch.error_file_id).text)
+        return output_file_path
+
+class StandInBatchBackend(BatchBackend):
+    name = "standin"
+
+    def __init__(self, backend:LLMBackend=None):
+        """
+        Batch backend that processes the request file locally, used for offline runs and testing.
+        - Completions are synthesised deterministically, or generated with the given LLM backend.
+
+        Args:
+            backend (LLMBackend): The LLM backend used to generate the completions (if any).
+        """
+        self.backend = backend
+        self.batches = {}
+
+    def submit(self, request_file_path:str) -> str:
+        batch_id = f"batch_{len(self.batches)}"
+        self.batches[batch_id] = request_file_path
+        return batch_id
+
+    def wait(self, batch_id:str, output_file_path:str) -> str:
+        output_records = []
+        with open(self.batches[batch_id], "r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                role, _ = parse_custom_id(request["custom_id"])
+                system_prompt = request["body"]["messages"][0]["content"]
+                user_prompt = request["body"]["messages"][1]["content"]
+                if self.backend is None:
+                    content = synthesise_response(role=role, user_prompt=user_prompt)
+                else:
+                    content = self.backend.generate(
+                                                system_prompt=system_prompt,
+                                                user_prompt=user_prompt,
+                                                role=role,
+                                                response_format=request["body"].get("response_format", None)
+                                                )
+                output_records.append({
+                                    "id": f"{batch_id}_request_{i}",
+                                    "custom_id": request["custom_id"],
+                                    "response": {
+                                                "status_code": 200,
+                                                "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+                                                },
+                                    "error": None
+                                    })
+        write_jsonl(output_records, output_file_path)
+        return output_file_path
+
+BATCH_BACKENDS = {
+                OpenAIBatchBackend.name: OpenAIBatchBackend,
+                StandInBatchBackend.name: StandInBatchBackend,
+                }
+
+class BatchExtractor:
+
+    def __init__(
+                self,
+                batch_backend:BatchBackend,
+                information_extractor:LLMTextGenerator,
+                alias_generator:LLMTextGenerator,
+                batch_dir:str="generated_data/batches",
+                model:str="gpt-4o-mini",
+                fallback_to_sync:bool=True,
+                alias_engine:RuleBasedAliasGenerator=None
+                ):
+        """
+        Runs information extraction and alias generation for a crawl wave as a single batch job.
+        - The prompts for all queued instances are rendered into a JSONL request file, keyed by
+          custom IDs containing the role and the DataInstance ID.
+        - The results are joined back to the DataInstance objects by custom ID and parsed with the
+          same repair and post-processing as the synchronous path.
+        - Requests that failed or produced invalid answers are retried synchronously (if enabled).
+        - If a rule-based alias engine is provided, aliases are generated locally when the instance
+          is added, and only ambiguous titles are sent as alias generation requests.
+
+        Args:
+            batch_backend (BatchBackend): The backend that processes the batch request file.
+            information_extractor (LLMTextGenerator): The LLMTextGenerator for information extraction.
+            alias_generator (LLMTextGenerator): The LLMTextGenerator for alias generation.
+            batch_dir (str): The directory for the request and output files.
+            model (str): The name of the model used in the batch requests.
+            fallback_to_sync (bool): Whether to retry failed requests with the synchronous path.
+            alias_engine (RuleBasedAliasGenerator): The rule-based alias generator (None to generate all aliases with the LLM).
+        """
+        self.batch_backend = batch_backend
+        self.information_extractor = information_extractor
+        self.alias_generator = alias_generator
+        self.batch_dir = batch_dir
+        self.model = model
+        self.fallback_to_sync = fallback_to_sync
+        self.alias_engine = alias_engine
+        self.num_waves = 0
+
+        # Maps the DataInstance ID to (data instance, page text, JSON structure, class hierarchy tree, page title)
+        self.pending = {}
+        os.makedirs(self.batch_dir, exist_ok=True)
+
+    def add(
+            self,
+            data_instance:DataInstance,
+            text:str,
+            json_structure:Dict[str, Any],
+            class_hierarchy_tree:str,
+            page_title:str=None
+            ) -> None:
+        """
+        Queues a data instance for extraction in the next batch job.
+
+        Args:
+            data_instance (DataInstance): The data instance (with its search query and predicted class set).
+            text (str): The text to extract the information from, i.e., the page summary.
+            json_structure (Dict[str, Any]): A structure describing the JSON fields to extract.
+            class_hierarchy_tree (str): The string equivalent of the class hierarchy tree JSON for the ontology.
+            page_title (str): The canonical Wikipedia title of the page (used by the rule-based alias engine).
+        """
+        if self.alias_engine is not None and not self.alias_engine.is_ambiguous(page_title):
+            generated_alias_json = self.alias_engine.execute(page_title=page_title, predicted_class=data_instance.predicted_class)
+            data_instance.set_alias(generated_alias_json["alias"])
+        self.pending[data_instance.id] = (data_instance, text, json_structure, class_hierarchy_tree, page_title)
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def render_requests(self) -> List[Dict[str, Any]]:
+        requests = []
+        for instance_id, (data_instance, text, json_structure, class_hierarchy_tree, page_title) in self.pending.items():
+            requests.append(render_batch_request(
+                                                self.information_extractor,
+                                                custom_id=create_custom_id(self.information_extractor.role, instance_id),
+                                                model=self.model,
+                                                text=text,
+                                                json_structure=json_structure
+                                                ))
+            if data_instance.alias is not None: # Generated by the rule-based alias engine
+                continue
+            requests.append(render_batch_request(
+                                                self.alias_generator,
+                                                custom_id=create_custom_id(self.alias_generator.role, instance_id),
+                                                model=self.model,
+                                                text=text,
+                                                search_query=data_instance.search_query,
+                                                class_hierarchy_tree=class_hierarchy_tree,
+                                                predicted_class=data_instance.predicted_class
+                                                ))
+        return requests
+
+    def parse_result(self, llm:LLMTextGenerator, generated_text:Union[str, None], **kwargs:Any) -> Union[Dict[str, Any], None]:
+        """
+        Parses a batch result with the repair and post-processing of the synchronous path,
+        falling back to a synchronous request if the result is missing or invalid.
+
+        Args:
+            llm (LLMTextGenerator): The LLMTextGenerator for the role of the request.
+            generated_text (Union[str, None]): The completion from the batch output (None if the request failed).
+            kwargs: Keyword arguments for LLMTextGenerator.execute.
+        """
+        json_output = llm.extract_answer(generated_text) if generated_text is not None else None
+        invalid_fields = llm.find_invalid_fields(json_output, json_structure=kwargs.get("json_structure", None))
+        if invalid_fields is None or len(invalid_fields) > 0:
+            if not self.fallback_to_sync:
+                return None
+            return llm.execute(**kwargs)
+        return llm.postprocess_json(json_output, json_structure=kwargs.get("json_structure", None))
+
+    def run(self) -> List[Tuple[DataInstance, str]]:
+        """
+        Runs the batch job for all queued data instances, returning the (data instance, page text) pairs
+        that were completed successfully. The queue is emptied afterwards.
+        """
+        if len(self.pending) == 0:
+            return []
+
+        request_file_path = os.path.join(self.batch_dir, f"wave_{self.num_waves}_requests.jsonl")
+        output_file_path = os.path.join(self.batch_dir, f"wave_{self.num_waves}_output.jsonl")
+        self.num_waves += 1
+
+        write_jsonl(self.render_requests(), request_file_path)
+        batch_id = self.batch_backend.submit(request_file_path)
+        print(f"Submitted batch {batch_id} with {len(self.pending)} instances ({request_file_path})")
+        self.batch_backend.wait(batch_id, output_file_path)
+        results = read_batch_results(output_file_path)
+
+        completed = []
+        for instance_id, (data_instance, text, json_structure, class_hierarchy_tree, page_title) in self.pending.items():
+            extracted_info_json = self.parse_result(
+                                                    self.information_extractor,
+                                                    results.get(create_custom_id(self.information_extractor.role, instance_id), None),
+                                                    text=text,
+                                                    json_structure=json_structure
+                                                    )
+            if extracted_info_json is None:
+                print(f"Failed to extract information for search query: {data_instance.search_query}")
+                continue
+            if data_instance.alias is not None:
+                generated_alias_json = {"alias": data_instance.alias}
+            else:
+                generated_alias_json = self.parse_result(
+                                                        self.alias_generator,
+                                                        results.get(create_custom_id(self.alias_generator.role, instance_id), None),
+                                                        text=text,
+                                                        search_query=data_instance.search_query,
+                                                        class_hierarchy_tree=class_hierarchy_tree,
+                                                        predicted_class=data_instance.predicted_class
+                                                        )
+                if generated_alias_json is not None and self.alias_engine is not None:
+                    # Register the LLM alias so that it stays unique
+                    alias = self.alias_engine.register_generated_alias(
+                                                                    generated_alias=generated_alias_json["alias"],
+                                                                    page_title=page_title,
+                                                                    predicted_class=data_instance.predicted_class,
+                                                                    search_query=data_instance.search_query
+                                                                    )
+                    generated_alias_json = None if alias is None else {"alias": alias}
+            if generated_alias_json is None:
+                print(f"Alias generation failed for search query: {data_instance.search_query}")
+                continue
+
+            class_obj_props = CLASS_PROPERTY_MAPPINGS[data_instance.predicted_class]["object_properties"]
+            data_instance.set_alias(generated_alias_json["alias"])
+            data_instance.set_json_data({
+                                        "object_properties": ObjectPropertyLinks(schema=class_obj_props),
+                                        "data_properties": extracted_info_json
+                                        })
+            completed.append((data_instance, text))
+
+        self.pending = {}
+        return completed
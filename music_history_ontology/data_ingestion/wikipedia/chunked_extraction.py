@@ -0,0 +1,234 @@
+import re
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple, Union
+from music_history_ontology.data_ingestion.wikipedia.llm import LLMTextGenerator
+
+# Sections that do not contain information about the subject of the article
+SKIPPED_SECTIONS = {
+                    "references", "external links", "see also", "further reading", "notes",
+                    "bibliography", "sources", "citations", "footnotes", "discography", "filmography"
+                    }
+SECTION_HEADING_PATTERN = re.compile(r"^(={2,})\s*(.+?)\s*\1\s*$", flags=re.MULTILINE)
+CHARS_PER_TOKEN = 4 # Approximation used when tiktoken (or its encoding files) are unavailable
+
+_ENCODING = None
+_ENCODING_LOCK = threading.Lock()
+
+def count_tokens(text:str) -> int:
+    """
+    Counts the number of tokens in a text using tiktoken, falling back to an approximation
+    based on the number of characters if the encoding cannot be loaded (e.g., offline).
+
+    Args:
+        text (str): The text to count the tokens of.
+    """
+    global _ENCODING
+    with _ENCODING_LOCK:
+        if _ENCODING is None:
+            try:
+                import tiktoken
+                _ENCODING = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                print(f"Using approximate token counts, unable to load tiktoken encoding: {e}")
+                _ENCODING = False
+    if _ENCODING is False:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(_ENCODING.encode(text))
+
+def split_into_sections(content:str) -> List[Tuple[Union[str, None], str]]:
+    """
+    Splits the full text of a Wikipedia article (page.content) into (heading, text) sections,
+    skipping sections that do not describe the subject (e.g., references). The lead section
+    before the first heading has the heading None.
+
+    Args:
+        content (str): The full text of the article.
+    """
+    sections = []
+    skipped_level = None # The heading level of the skipped section we are in (its subsections are also skipped)
+    previous_end = 0
+    heading = None
+    level = 1
+    for match in SECTION_HEADING_PATTERN.finditer(content):
+        if skipped_level is None:
+            sections.append((heading, content[previous_end:match.start()].strip()))
+        heading = match.group(2)
+        level = len(match.group(1))
+        if skipped_level is not None and level <= skipped_level:
+            skipped_level = None
+        if skipped_level is None and heading.lower() in SKIPPED_SECTIONS:
+            skipped_level = level
+        previous_end = match.end()
+    if skipped_level is None:
+        sections.append((heading, content[previous_end:].strip()))
+    return [(heading, text) for heading, text in sections if text]
+
+def split_text(text:str, max_tokens:int) -> List[str]:
+    """
+    Splits a text into parts of at most max_tokens tokens, splitting on paragraphs,
+    then sentences, then characters.
+
+    Args:
+        text (str): The text to split.
+        max_tokens (int): The maximum number of tokens in each part.
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text]
+    for separator in ("\n\n", "\n", ". "):
+        pieces = text.split(separator)
+        if len(pieces) == 1:
+            continue
+        parts = []
+        current = ""
+        for piece in pieces:
+            candidate = f"{current}{separator}{piece}" if current else piece
+            if current and count_tokens(candidate) > max_tokens:
+                parts.append(current)
+                current = piece
+            else:
+                current = candidate
+        if current:
+            parts.append(current)
+        # Pieces that are still too long are split with the next separator
+        return [sub_part for part in parts for sub_part in split_text(part, max_tokens)]
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+def create_chunks(
+                summary:str,
+                content:Union[str, None],
+                max_chunk_tokens:int,
+                page_token_budget:int
+                ) -> List[str]:
+    """
+    Creates the token-bounded chunks to extract from, in order of precedence: the summary first,
+    then the sections in the order they appear in the article. Chunks are added until the
+    per-page token budget is used up.
+
+    Args:
+        summary (str): The summary of the article.
+        content (Union[str, None]): The full text of the article.
+        max_chunk_tokens (int): The maximum number of tokens in a chunk.
+        page_token_budget (int): The maximum number of tokens extracted from per page.
+    """
+    sections = [(None, summary)]
+    if content is not None:
+        sections += [(heading, text) for heading, text in split_into_sections(content) if heading is not None] # The lead section is the summary
+
+    chunks = []
+    used_tokens = 0
+    for heading, text in sections:
+        for part in split_text(text, max_chunk_tokens):
+            num_tokens = count_tokens(part)
+            if used_tokens + num_tokens > page_token_budget:
+                return chunks
+            chunks.append(part if heading is None else f"{heading}:\n{part}")
+            used_tokens += num_tokens
+    return chunks
+
+class ChunkedExtractor:
+
+    def __init__(
+                self,
+                llm:LLMTextGenerator,
+                max_chunk_tokens:int=1500,
+                page_token_budget:int=6000,
+                max_workers:int=4
+                ):
+        """
+        Extracts information from the full text of an article rather than only its summary,
+        by splitting it into token-bounded chunks, extracting from them in parallel and
+        merging the results (map-reduce).
+        - Information extraction: for each field, the first value that is not None wins, with the
+          summary taking precedence, followed by the sections in article order. Conflicting values
+          from later chunks are ignored (and counted).
+        - Time interval generation: the time intervals from all chunks are combined, the first
+          time interval generated for an alias wins.
+
+        Args:
+            llm (LLMTextGenerator): The LLMTextGenerator with the role "information_extraction" or "time_interval_generation".
+            max_chunk_tokens (int): The maximum number of tokens in a chunk.
+            page_token_budget (int): The maximum number of tokens extracted from per page (bounds the cost and latency).
+            max_workers (int): The number of chunks extracted from in parallel.
+        """
+        if llm.role not in ("information_extraction", "time_interval_generation"):
+            raise ValueError(f"Chunked extraction is not supported for the role '{llm.role}'.")
+        self.llm = llm
+        self.max_chunk_tokens = max_chunk_tokens
+        self.page_token_budget = page_token_budget
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.num_conflicts = 0
+        self.lock = threading.Lock() # Shared by the extraction workers
+
+    def merge_fields(self, json_outputs:List[Union[Dict[str, Any], None]], json_structure:Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merges the extracted fields from each chunk (in order of precedence).
+
+        Args:
+            json_outputs (List[Union[Dict[str, Any], None]]): The extracted JSON output for each chunk.
+            json_structure (Dict[str, Any]): A structure describing the JSON fields to extract.
+        """
+        merged = {field: None for field in json_structure.keys()}
+        for json_output in json_outputs:
+            if json_output is None:
+                continue
+            for field in json_structure.keys():
+                value = json_output.get(field, None)
+                if value is None:
+                    continue
+                if merged[field] is None:
+                    merged[field] = value
+                elif merged[field] != value:
+                    with self.lock:
+                        self.num_conflicts += 1
+        return merged
+
+    def merge_time_intervals(self, json_outputs:List[Union[Dict[str, Any], None]]) -> Dict[str, Any]:
+        """
+        Combines the time intervals generated from each chunk (in order of precedence).
+
+        Args:
+            json_outputs (List[Union[Dict[str, Any], None]]): The generated JSON output for each chunk.
+        """
+        time_intervals = {}
+        for json_output in json_outputs:
+            if json_output is None:
+                continue
+            for generated_alias, data_dict in json_output["time_intervals"].items():
+                if generated_alias in time_intervals:
+                    if time_intervals[generated_alias] != data_dict:
+                        with self.lock:
+                            self.num_conflicts += 1
+                    continue
+                time_intervals[generated_alias] = data_dict
+        return {"time_intervals": time_intervals}
+
+    def execute(self, summary:str, content:Union[str, None], json_structure:Dict[str, Any]) -> Union[Dict[str, Any], None]:
+        """
+        Extracts the fields from the summary and full text of an article, returning the
+        same structure as LLMTextGenerator.execute (None if extraction failed for every chunk).
+
+        Args:
+            summary (str): The summary of the article.
+            content (Union[str, None]): The full text of the article (page.content), None to only use the summary.
+            json_structure (Dict[str, Any]): A structure describing the JSON fields to extract.
+        """
+        chunks = create_chunks(
+                            summary=summary,
+                            content=content,
+                            max_chunk_tokens=self.max_chunk_tokens,
+                            page_token_budget=self.page_token_budget
+                            )
+        json_outputs = list(self.executor.map(
+                                            lambda chunk: self.llm.execute(text=chunk, json_structure=json_structure),
+                                            chunks
+                                            ))
+        print(f"Extracted from {len(chunks)} chunks ({sum(json_output is not None for json_output in json_outputs)} successful)")
+        if all(json_output is None for json_output in json_outputs):
+            return None
+
+        if self.llm.role == "time_interval_generation":
+            return self.merge_time_intervals(json_outputs)
+        return self.merge_fields(json_outputs, json_structure=json_structure)
@@ -0,0 +1,134 @@
+import os
+import httpx
+import threading
+
+from typing import Dict, Any, Tuple, Union
+from music_history_ontology.data_ingestion.resilience import get_endpoint
+from music_history_ontology.data_ingestion.wikipedia.backends import LLMBackend, LLM_BACKENDS, create_backend
+
+class LLMClientPool:
+
+    def __init__(
+                self,
+                max_connections:int=32,
+                max_keepalive_connections:int=16,
+                keepalive_expiry:float=30.0,
+                timeout:float=60.0,
+                ):
+        """
+        Process-wide pool of LLM backends shared by all roles (i.e., all LLMTextGenerator instances).
+        - A single backend instance is created for each backend name (and configuration).
+        - Backends making HTTP requests share one sync and one async httpx client, so keep-alive
+          connections (and their TLS sessions) are reused across roles.
+        - The concurrency limit of each backend's endpoint (see resilience.py) is capped at the
+          number of connections, so that concurrent stages cannot exhaust the sockets.
+        - All methods are thread-safe. The async client is safe to share between tasks of the
+          same event loop.
+
+        Args:
+            max_connections (int): The maximum number of open connections.
+            max_keepalive_connections (int): The maximum number of idle keep-alive connections.
+            keepalive_expiry (float): The number of seconds an idle keep-alive connection is kept open.
+            timeout (float): The request timeout in seconds.
+        """
+        self.max_connections = max_connections
+        self.limits = httpx.Limits(
+                                max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive_connections,
+                                keepalive_expiry=keepalive_expiry
+                                )
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.backends = {}
+        self.http_client = None
+        self.http_async_client = None
+
+    def get_http_client(self) -> httpx.Client:
+        with self.lock:
+            if self.http_client is None:
+                self.http_client = httpx.Client(limits=self.limits, timeout=self.timeout)
+            return self.http_client
+
+    def get_http_async_client(self) -> httpx.AsyncClient:
+        with self.lock:
+            if self.http_async_client is None:
+                self.http_async_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            return self.http_async_client
+
+    def get_key(self, name:str, kwargs:Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+        return (name, tuple(sorted((key, repr(value)) for key, value in kwargs.items())))
+
+    def get_backend(self, backend:Union[str, LLMBackend, None]=None, **kwargs:Dict[str, Any]) -> LLMBackend:
+        """
+        Returns the shared backend with the given name, creating it on first use.
+
+        Args:
+            backend (Union[str, LLMBackend, None]): The name of the backend, an existing backend (returned as is) or None
+                                                    to use the LLM_BACKEND environment variable (defaults to "openai").
+            kwargs: Keyword arguments passed to the backend when it is created.
+        """
+        if isinstance(backend, LLMBackend):
+            return backend
+        name = backend if backend is not None else os.getenv("LLM_BACKEND", "openai")
+        key = self.get_key(name, kwargs)
+
+        with self.lock:
+            if key in self.backends:
+                return self.backends[key]
+
+        if name in LLM_BACKENDS and LLM_BACKENDS[name].accepts_http_clients:
+            kwargs.setdefault("http_client", self.get_http_client())
+            kwargs.setdefault("http_async_client", self.get_http_async_client())
+
+        with self.lock:
+            if key not in self.backends: # Another thread may have created the backend in the meantime
+                self.backends[key] = create_backend(name, **kwargs)
+                endpoint = get_endpoint(f"llm.{name}")
+                endpoint.limiter.max_limit = min(endpoint.limiter.max_limit, self.max_connections)
+            return self.backends[key]
+
+    def close(self) -> None:
+        """
+        Closes the shared sync HTTP client and removes all backends from the pool.
+        (The async client must be closed from its event loop with aclose.)
+        """
+        with self.lock:
+            if self.http_client is not None:
+                self.http_client.close()
+                self.http_client = None
+            self.backends = {}
+
+    async def aclose(self) -> None:
+        with self.lock:
+            http_async_client = self.http_async_client
+            self.http_async_client = None
+        if http_async_client is not None:
+            await http_async_client.aclose()
+
+_CLIENT_POOL = None
+_CLIENT_POOL_LOCK = threading.Lock()
+
+def configure_client_pool(**config:Any) -> LLMClientPool:
+    """
+    Replaces the process-wide client pool with one using the given configuration.
+    Should be called before any LLMTextGenerator is created.
+
+    Args:
+        config: Keyword arguments for LLMClientPool.
+    """
+    global _CLIENT_POOL
+    with _CLIENT_POOL_LOCK:
+        if _CLIENT_POOL is not None:
+            _CLIENT_POOL.close()
+        _CLIENT_POOL = LLMClientPool(**config)
+        return _CLIENT_POOL
+
+def get_client_pool() -> LLMClientPool:
+    """
+    Returns the process-wide client pool, creating it with the default configuration on first use.
+    """
+    global _CLIENT_POOL
+    with _CLIENT_POOL_LOCK:
+        if _CLIENT_POOL is None:
+            _CLIENT_POOL = LLMClientPool()
+        return _CLIENT_POOL
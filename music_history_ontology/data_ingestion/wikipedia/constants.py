@@ -20,6 +20,12 @@ _SEARCH_QUERY_CLASSIFICATION_QUERY_TEMPLATE = """
                         The output must be valid JSON and match the structure exactly as requested by the user.
                         """
 
+_HIERARCHICAL_CLASSIFICATION_QUERY_TEMPLATE = """
+                        You are a strict multi-class classifier that only outputs a valid JSON object.
+                        You will only output a valid JSON object that contains the predicted classes, with no extra explanation, greeting, or commentary.
+                        The output must be valid JSON and match the structure exactly as requested by the user.
+                        """
+
 _ALIAS_GENERATION_QUERY_TEMPLATE = """
                         You are a strict alias generator.
                         You will only output a valid JSON object that contains the alias that you have generated, with no extra explanation, greeting, or commentary.
@@ -185,6 +191,48 @@ _SEARCH_QUERY_GENERATION_EMBEDDING_TEMPLATE = """
                         \"\"\"{all_generated_queries}\"\"\"
                         """
 
+_HIERARCHICAL_CLASSIFICATION_EMBEDDING_TEMPLATE = """
+                        You are a multi-class classifier that classifies instances one level of a class hierarchy at a time.
+                        Given a current class and a numbered list of items (each with a search query and accompanying context text, e.g., from Wikipedia),
+                        decide for each item which of the candidate subclasses of the current class it belongs to.
+
+                        If the search query something that relates to a candidate class but is not a direct match, then it should not be assigned to that class.
+                        For example a book about Mozart or a biography about Mozart would be not be an instance for the class "Musician"; only the actual
+                        musician "Mozart" would be assigned to the "Musician" class.
+
+                        If an item does not belong to any of the candidate subclasses, or if you cannot determine which candidate subclass it belongs to with
+                        high confidence, output "None" for that item.
+
+                        You must only answer with one of the candidate subclasses exactly as written (including the "Thing" prefix and "." separators) or "None".
+                        You must respond with a valid JSON object containing only the predicted classes, and nothing else — no explanations, commentary, or greetings.
+
+                        Return your result in the following format, where each key is the number of an item:
+
+                        {{
+                        "classes": {{
+                            "<item number>": <predicted candidate subclass or None>,
+                            ...
+                            }}
+                        }}
+
+                        Example result for two items with the current class "Thing.MusicArtist", where the first is a musician and the second is not a music artist:
+                        {{
+                        "classes": {{
+                            "0": "Thing.MusicArtist.Musician",
+                            "1": "None"
+                            }}
+                        }}
+
+                        Current class:
+                        \"\"\"{current_class}\"\"\"
+
+                        Candidate subclasses:
+                        \"\"\"{candidate_classes}\"\"\"
+
+                        Items:
+                        \"\"\"{items}\"\"\"
+                        """
+
 _TIME_INTERVAL_GENERATION_EMBEDDING_TEMPLATE = """
                         You are a strict JSON extractor.
 
@@ -275,7 +323,8 @@ QUERY_TEMPLATES = {
                 "search_query_classification": _SEARCH_QUERY_CLASSIFICATION_QUERY_TEMPLATE,
                 "alias_generation": _ALIAS_GENERATION_QUERY_TEMPLATE,
                 "search_query_generation": _SEARCH_QUERY_GENERATION_QUERY_TEMPLATE,
-                "time_interval_generation": _TIME_INTERVAL_GENERATION_QUERY_TEMPLATE
+                "time_interval_generation": _TIME_INTERVAL_GENERATION_QUERY_TEMPLATE,
+                "hierarchical_classification": _HIERARCHICAL_CLASSIFICATION_QUERY_TEMPLATE,
                 }
 
 USER_EMBEDDING_TEMPLATES = {
@@ -283,7 +332,8 @@ USER_EMBEDDING_TEMPLATES = {
         "search_query_classification": _SEARCH_QUERY_CLASSIFICATION_EMBEDDING_TEMPLATE,
         "alias_generation": _ALIAS_GENERATION_EMBEDDING_TEMPLATE,
         "search_query_generation": _SEARCH_QUERY_GENERATION_EMBEDDING_TEMPLATE,
-        "time_interval_generation": _TIME_INTERVAL_GENERATION_EMBEDDING_TEMPLATE
+        "time_interval_generation": _TIME_INTERVAL_GENERATION_EMBEDDING_TEMPLATE,
+        "hierarchical_classification": _HIERARCHICAL_CLASSIFICATION_EMBEDDING_TEMPLATE,
 }
 CLASSES_TO_JSON_FIELDS = {}
 for cls, properties in CLASS_PROPERTY_MAPPINGS.items():
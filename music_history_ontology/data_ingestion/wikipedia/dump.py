@@ -0,0 +1,380 @@
+import os
+import re
+import bz2
+import dbm
+import json
+import mmap
+import threading
+import xml.etree.ElementTree as ET
+
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Union, Iterator
+
+# Namespaces of links that do not point to articles, e.g., [[File:Mozart.jpg]] or [[Category:Operas]]
+NON_ARTICLE_NAMESPACES = {
+                        "file", "image", "category", "template", "wikipedia", "wp", "help", "portal",
+                        "draft", "module", "mediawiki", "user", "talk", "special", "media", "wikt", "wiktionary"
+                        }
+LINK_PATTERN = re.compile(r"\[\[([^\[\]|]+)(?:\|([^\[\]]*))?\]\]")
+EXTERNAL_LINK_PATTERN = re.compile(r"\[(?:https?:)?//[^\s\]]+(?:\s+([^\]]*))?\]")
+REF_PATTERN = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", flags=re.DOTALL | re.IGNORECASE)
+COMMENT_PATTERN = re.compile(r"<!--.*?-->", flags=re.DOTALL)
+TAG_PATTERN = re.compile(r"</?[a-zA-Z][^>]*>")
+HEADING_PATTERN = re.compile(r"^(={2,})\s*(.+?)\s*\1\s*$", flags=re.MULTILINE)
+MAX_REDIRECTS = 2
+INDEX_COMPLETE_KEY = "__complete__" # Written last, so an interrupted build is detected and redone (holds the signature of the shards)
+
+def normalize_title(title:str) -> str:
+    """
+    Normalizes a page title the way Wikipedia does, e.g., "wolfgang_amadeus_Mozart" -> "Wolfgang amadeus Mozart".
+
+    Args:
+        title (str): The page title (or search term).
+    """
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+def remove_nested(text:str, start:str, end:str) -> str:
+    """
+    Removes (possibly nested) blocks delimited by start and end, e.g., templates ("{{", "}}") or tables ("{|", "|}").
+    """
+    parts = []
+    depth = 0
+    i = 0
+    previous_end = 0
+    while i < len(text):
+        if text.startswith(start, i):
+            if depth == 0:
+                parts.append(text[previous_end:i])
+            depth += 1
+            i += len(start)
+        elif depth > 0 and text.startswith(end, i):
+            depth -= 1
+            i += len(end)
+            if depth == 0:
+                previous_end = i
+        else:
+            i += 1
+    if depth == 0:
+        parts.append(text[previous_end:])
+    return "".join(parts)
+
+def get_link_target(target:str) -> Union[str, None]:
+    """
+    Returns the title of the article a wikilink points to, None if it does not point to an article.
+    """
+    target = target.split("#")[0].strip()
+    if not target or target.startswith(":"):
+        return None
+    if ":" in target and target.split(":")[0].strip().lower() in NON_ARTICLE_NAMESPACES:
+        return None
+    return normalize_title(target)
+
+def extract_links(wikitext:str) -> List[str]:
+    """
+    Extracts the titles of the articles linked from the wikitext of a page (sorted, like the Wikipedia API).
+
+    Args:
+        wikitext (str): The wikitext of the page.
+    """
+    links = set()
+    for match in LINK_PATTERN.finditer(wikitext):
+        target = get_link_target(match.group(1))
+        if target is not None:
+            links.add(target)
+    return sorted(links)
+
+def convert_wikitext_to_text(wikitext:str) -> str:
+    """
+    Converts wikitext to plain text in the format of page.content from the Wikipedia API, keeping
+    the section headings (e.g., "== Early life ==") and dropping templates, tables, references and files.
+
+    Args:
+        wikitext (str): The wikitext of the page.
+    """
+    text = COMMENT_PATTERN.sub("", wikitext)
+    text = REF_PATTERN.sub("", text)
+    text = remove_nested(text, "{{", "}}")
+    text = remove_nested(text, "{|", "|}")
+
+    def replace_link(match:re.Match) -> str:
+        if get_link_target(match.group(1)) is None:
+            return ""
+        return match.group(2) if match.group(2) else match.group(1).split("#")[0]
+
+    text = LINK_PATTERN.sub(replace_link, text)
+    text = remove_nested(text, "[[", "]]") # Files with links in their captions
+    text = EXTERNAL_LINK_PATTERN.sub(lambda match: match.group(1) or "", text)
+    text = TAG_PATTERN.sub("", text)
+    text = text.replace("'''", "").replace("''", "")
+    lines = [line.strip() for line in text.split("\n")]
+    text = "\n".join(line for line in lines if not line.startswith(("__", "|", "!")))
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+class DumpPage:
+    # Mirrors the attributes of wikipedia.WikipediaPage used by the crawl
+    __slots__ = ("title", "summary", "content", "links")
+
+    def __init__(self, title:str, content:str, links:List[str], summary:str=None):
+        """
+        A page read from a local Wikipedia dump.
+
+        Args:
+            title (str): The title of the page.
+            content (str): The plain text of the page, including the section headings.
+            links (List[str]): The titles of the pages linked from the page.
+            summary (str): The lead section of the page, defaults to the text before the first heading.
+        """
+        if summary is None:
+            match = HEADING_PATTERN.search(content)
+            summary = (content[:match.start()] if match else content).strip()
+        self.title = title
+        self.summary = summary
+        self.content = content
+        self.links = links
+
+def create_dump_page(title:str, wikitext:str, links:List[str]=None, summary:str=None) -> DumpPage:
+    """
+    Creates a page from its wikitext, extracting the links from the wikitext if they are not given.
+    """
+    return DumpPage(
+                    title=title,
+                    content=convert_wikitext_to_text(wikitext),
+                    links=extract_links(wikitext) if links is None else links,
+                    summary=summary
+                    )
+
+def get_shard_format(path:str) -> str:
+    if path.endswith(".jsonl"):
+        return "jsonl"
+    if path.endswith(".xml.bz2"):
+        return "xml.bz2"
+    raise ValueError(f"Unsupported dump format: {path} (expected a .jsonl or multistream .xml.bz2 file)")
+
+def get_multistream_index_path(path:str) -> str:
+    # E.g., enwiki-latest-pages-articles-multistream.xml.bz2 -> enwiki-latest-pages-articles-multistream-index.txt.bz2
+    return f"{path[:-len('.xml.bz2')]}-index.txt.bz2"
+
+def get_shard_signature(path:str) -> List[Union[str, int]]:
+    """
+    Returns the path, size and modification time of a shard (and of its multistream index file), which
+    change when the shard is replaced, e.g., by a newer dump with the same name.
+
+    Args:
+        path (str): The path to the shard.
+    """
+    file_paths = [path]
+    if get_shard_format(path) == "xml.bz2":
+        file_paths.append(get_multistream_index_path(path))
+    signature = []
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        signature.extend([os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns])
+    return signature
+
+def index_shard(path:str) -> List[Tuple[str, int, int]]:
+    """
+    Returns the (title, offset, length) of the pages in a dump shard, where the offset and length are
+    of the line (JSONL) or of the bz2 stream containing the page (multistream XML).
+
+    Args:
+        path (str): The path to the shard.
+    """
+    entries = []
+    if get_shard_format(path) == "jsonl":
+        offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    entries.append((json.loads(line)["title"], offset, len(line)))
+                offset += len(line)
+        return entries
+
+    # Multistream dumps come with an index of "stream offset:page ID:title" lines
+    titles_for_each_offset = {}
+    with bz2.open(get_multistream_index_path(path), "rt", encoding="utf-8") as f:
+        for line in f:
+            stream_offset, _, title = line.rstrip("\n").split(":", 2)
+            titles_for_each_offset.setdefault(int(stream_offset), []).append(title)
+    offsets = sorted(titles_for_each_offset.keys()) + [os.path.getsize(path)]
+    for stream_offset, next_offset in zip(offsets, offsets[1:]):
+        for title in titles_for_each_offset[stream_offset]:
+            entries.append((title, stream_offset, next_offset - stream_offset))
+    return entries
+
+def parse_xml_pages(xml_text:str) -> Iterator[Tuple[str, str, Union[str, None]]]:
+    """
+    Parses the <page> elements of a multistream dump stream, yielding the (title, wikitext, redirect title) of each page.
+    """
+    xml_text = xml_text.replace("</mediawiki>", "") # The closing tag of the dump follows the last stream
+    root = ET.fromstring(f"<pages>{xml_text}</pages>")
+    for page in root.iter():
+        if not page.tag.endswith("page"):
+            continue
+        title, wikitext, redirect = None, "", None
+        for element in page.iter():
+            tag = element.tag.rsplit("}", 1)[-1] # Drop the namespace (if any)
+            if tag == "title":
+                title = element.text
+            elif tag == "text":
+                wikitext = element.text or ""
+            elif tag == "redirect":
+                redirect = element.get("title")
+        yield title, wikitext, redirect
+
+class WikipediaDump:
+
+    def __init__(self, paths:Union[str, List[str]], index_path:str=None, num_index_workers:int=None):
+        """
+        Page source reading a local Wikipedia dump, for large backfills without the Wikipedia API.
+        - The dump is one or more shards, each either a JSONL file (one {"title", "text", "links", "summary"}
+          object per line, where "text" is wikitext or plain text, and "links" and "summary" are optional,
+          with redirects as {"title", "redirect"}) or a multistream XML dump (.xml.bz2, with its index file).
+        - Titles are looked up in O(1) through an on-disk (dbm) index mapping each title to its shard and
+          offset, built once (in parallel over the shards) and reused across runs, unless a shard has been
+          replaced since (its size or modification time changed).
+        - The shards are memory-mapped, so lookups only read (and decompress) the line or bz2 stream
+          containing the page, and can be made from several threads.
+
+        Args:
+            paths (Union[str, List[str]]): The paths to the shards of the dump.
+            index_path (str): The path to the index, defaults to the path of the first shard with ".index" appended.
+            num_index_workers (int): The number of processes used to build the index (None for the number of CPUs).
+        """
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.index_path = index_path or f"{self.paths[0]}.index"
+        self.num_index_workers = num_index_workers
+        self.lock = threading.Lock() # dbm handles are not thread-safe
+        self.shards = []
+        for path in self.paths:
+            get_shard_format(path)
+            f = open(path, "rb")
+            self.shards.append((f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)))
+
+        if not self.is_index_complete():
+            self.build_index()
+        self.index = dbm.open(self.index_path, "r")
+        self.read_stream = lru_cache(maxsize=64)(self.read_stream) # Consecutive lookups often hit the same stream
+
+    def get_signature(self) -> str:
+        return json.dumps([get_shard_signature(path) for path in self.paths])
+
+    def is_index_complete(self) -> bool:
+        if dbm.whichdb(self.index_path) is None:
+            return False
+        with dbm.open(self.index_path, "r") as index:
+            return index.get(INDEX_COMPLETE_KEY) == self.get_signature().encode()
+
+    def build_index(self) -> None:
+        """
+        Builds the on-disk index, reading the shards in parallel.
+        """
+        print(f"Building the index for {len(self.paths)} dump shard(s): {self.index_path}")
+        signature = self.get_signature() # Before reading the shards, so a shard replaced during the build is detected
+        with ProcessPoolExecutor(max_workers=self.num_index_workers) as executor:
+            shard_entries = executor.map(index_shard, self.paths)
+            with dbm.open(self.index_path, "n") as index:
+                for shard_id, entries in enumerate(shard_entries):
+                    for title, offset, length in entries:
+                        value = f"{shard_id}:{offset}:{length}"
+                        index[title] = value
+                        lower_key = f"lower:{title.lower()}" # For case-insensitive lookups
+                        if lower_key not in index:
+                            index[lower_key] = value
+                index[INDEX_COMPLETE_KEY] = signature
+
+    def lookup(self, title:str) -> Union[Tuple[int, int, int], None]:
+        with self.lock:
+            value = self.index.get(normalize_title(title))
+            if value is None:
+                value = self.index.get(f"lower:{title.replace('_', ' ').strip().lower()}")
+        if value is None:
+            return None
+        shard_id, offset, length = value.decode().split(":")
+        return int(shard_id), int(offset), int(length)
+
+    def read_stream(self, shard_id:int, offset:int, length:int) -> Dict[str, Tuple[str, Union[str, None]]]:
+        """
+        Decompresses a bz2 stream of a multistream dump, returning the (wikitext, redirect title) for each page title.
+        """
+        xml_text = bz2.decompress(self.shards[shard_id][1][offset:offset + length]).decode("utf-8")
+        return {title: (wikitext, redirect) for title, wikitext, redirect in parse_xml_pages(xml_text)}
+
+    def read_page(self, title:str) -> Union[DumpPage, None]:
+        """
+        Reads a page (following redirects), returning None if it is not in the dump.
+
+        Args:
+            title (str): The title of the page.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            location = self.lookup(title)
+            if location is None:
+                return None
+            shard_id, offset, length = location
+            if get_shard_format(self.paths[shard_id]) == "jsonl":
+                record = json.loads(self.shards[shard_id][1][offset:offset + length])
+                page_title, redirect = record["title"], record.get("redirect")
+                wikitext, links, summary = record.get("text", ""), record.get("links"), record.get("summary")
+            else:
+                pages = self.read_stream(shard_id, offset, length)
+                page_title = normalize_title(title)
+                if page_title not in pages: # Matched by the case-insensitive lookup
+                    page_title = next((t for t in pages if t.lower() == page_title.lower()), None)
+                if page_title is None:
+                    return None
+                wikitext, redirect = pages[page_title]
+                links, summary = None, None
+            if redirect is not None:
+                title = redirect
+                continue
+            return create_dump_page(title=page_title, wikitext=wikitext, links=links, summary=summary)
+        return None
+
+    def retrieve_first_page(self, search_term:str) -> Union[Tuple[str, DumpPage], Tuple[None, None]]:
+        """
+        Equivalent of retrieve_first_wikipedia_page, matching the search term to a page title (instead of searching).
+
+        Args:
+            search_term (str): The search term, e.g., Mozart.
+        """
+        page = self.read_page(search_term)
+        if page is None:
+            return None, None
+        return page.title, page
+
+    def iter_pages(self, shard_id:int) -> Iterator[DumpPage]:
+        """
+        Streams the (non-redirect) pages of a shard in order, e.g., for a reader per shard.
+
+        Args:
+            shard_id (int): The index of the shard in paths.
+        """
+        data = self.shards[shard_id][1]
+        if get_shard_format(self.paths[shard_id]) == "jsonl":
+            offset = 0
+            while offset < len(data):
+                end = data.find(b"\n", offset)
+                end = len(data) if end == -1 else end + 1
+                line = data[offset:end] # Slicing does not move the position of the shared memory map
+                offset = end
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("redirect") is None:
+                    yield create_dump_page(title=record["title"], wikitext=record.get("text", ""), links=record.get("links"), summary=record.get("summary"))
+            return
+
+        offsets = sorted({offset for _, offset, _ in index_shard(self.paths[shard_id])})
+        for offset, next_offset in zip(offsets, offsets[1:] + [len(data)]):
+            xml_text = bz2.decompress(data[offset:next_offset]).decode("utf-8")
+            for title, wikitext, redirect in parse_xml_pages(xml_text):
+                if redirect is None:
+                    yield create_dump_page(title=title, wikitext=wikitext)
+
+    def close(self) -> None:
+        self.index.close()
+        for f, data in self.shards:
+            data.close()
+            f.close()
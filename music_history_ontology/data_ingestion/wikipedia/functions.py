@@ -1,9 +1,66 @@
 import wikipedia
 import random
+import requests
 
 from typing import Tuple, List, Dict, Any, Union
+from music_history_ontology.data_ingestion.resilience import ResilientEndpoint, get_endpoint
 from music_history_ontology.data_ingestion.wikipedia.llm import LLMTextGenerator
 from music_history_ontology.data_ingestion.wikipedia.instance import DataInstance
+from music_history_ontology.data_ingestion.wikipedia.dump import WikipediaDump, DumpPage
+
+# Timeouts and non-JSON responses (returned by the API when it is too busy) are retried
+WIKIPEDIA_RETRY_ON = (wikipedia.exceptions.HTTPTimeoutError, requests.exceptions.JSONDecodeError)
+
+_WIKIPEDIA_DUMP = None # Pages are read from this dump instead of the Wikipedia API, if set
+
+def set_wikipedia_dump(dump:Union[WikipediaDump, None]) -> None:
+    """
+    Sets a local Wikipedia dump to read pages from instead of the Wikipedia API (None to use the API).
+
+    Args:
+        dump (Union[WikipediaDump, None]): The dump.
+    """
+    global _WIKIPEDIA_DUMP
+    _WIKIPEDIA_DUMP = dump
+
+def get_wikipedia_endpoint() -> ResilientEndpoint:
+    """
+    Returns the shared endpoint used for all requests to Wikipedia.
+    """
+    return get_endpoint("wikipedia", requests_per_second=10.0, burst=5.0, retry_on=WIKIPEDIA_RETRY_ON)
+
+def load_wikipedia_page(title:str) -> wikipedia.WikipediaPage:
+    """
+    Loads a Wikipedia page, including its summary (which is otherwise fetched lazily).
+
+    Args:
+        title (str): The title of the Wikipedia page.
+    """
+    page = wikipedia.page(title)
+    page.summary
+    return page
+
+def retrieve_page_links(page:wikipedia.WikipediaPage) -> List[str]:
+    """
+    Retrieves the titles of the pages linked from a Wikipedia page.
+
+    Args:
+        page (wikipedia.WikipediaPage): The Wikipedia page.
+    """
+    if isinstance(page, DumpPage):
+        return page.links
+    return get_wikipedia_endpoint().call(lambda: page.links)
+
+def retrieve_page_content(page:wikipedia.WikipediaPage) -> str:
+    """
+    Retrieves the full plain text of a Wikipedia page (including section headings).
+
+    Args:
+        page (wikipedia.WikipediaPage): The Wikipedia page.
+    """
+    if isinstance(page, DumpPage):
+        return page.content
+    return get_wikipedia_endpoint().call(lambda: page.content)
 
 def retrieve_first_wikipedia_page(search_term:str="Mozart") -> Union[
                                                                     Tuple[str, wikipedia.WikipediaPage],
@@ -11,14 +68,22 @@ def retrieve_first_wikipedia_page(search_term:str="Mozart") -> Union[
                                                                     ]:
     """
     Retrieves the first wikipedia page related to a search term.
+    - Transient errors (e.g., rate limits, timeouts) are retried with backoff, only returning
+      None for both if no page was found or the retries were exhausted.
+    - If a dump is set (see set_wikipedia_dump), the page with the search term as its title is read from the dump.
 
     Args:
         search_term (str): The search term to find a wikipedia page for, e.g., Mozart.
     """
+    if _WIKIPEDIA_DUMP is not None:
+        return _WIKIPEDIA_DUMP.retrieve_first_page(search_term)
+
+    endpoint = get_wikipedia_endpoint()
+
     # Search for possible IDs related to a search term
     try: 
-        possible_ids = wikipedia.search(search_term)
-    except Exception as e: # Most likely a case with being too busy
+        possible_ids = endpoint.call(wikipedia.search, search_term)
+    except Exception as e:
         print("Error searching for Wikipedia page:", e)
         return None, None
 
@@ -30,7 +95,7 @@ def retrieve_first_wikipedia_page(search_term:str="Mozart") -> Union[
     # Fetch the data for the first possible ID
     for i in range(len(possible_ids)):
         try:
-            first_page = wikipedia.page(possible_ids[i])
+            first_page = endpoint.call(load_wikipedia_page, possible_ids[i])
             possible_id = possible_ids[i]
             break
         except wikipedia.DisambiguationError as e:
@@ -39,6 +104,9 @@ def retrieve_first_wikipedia_page(search_term:str="Mozart") -> Union[
         except wikipedia.PageError as e:
             print("PageError:", e)
             continue
+        except Exception as e: # Retries exhausted
+            print("Error retrieving Wikipedia page:", e)
+            return None, None
     return possible_id, first_page
 
 def filter_search_queries(
@@ -124,7 +192,9 @@ def retrieve_related_pages(
                             num_to_search_for:int,
                             class_hierarchy_tree:str,
                             known_classes:set[str],
-                            max_retrieval_per_query:int
+                            max_retrieval_per_query:int,
+                            batch_size:int=1,
+                            link_filter:Any=None
                             ) -> List[DataInstance]:
     """
     Retrieves related pages from a list of search queries.
@@ -136,39 +206,65 @@ def retrieve_related_pages(
         class_hierarchy_tree (str): The string equivalent of the class hierarchy tree JSON for the ontology.
         known_classes (set[str]): A set containing the classes that exist in the ontology.
         max_retrieval_per_query (int): The maximum number of data to retrieve for the related pages from the base search query.
+        batch_size (int): The number of related pages to classify together. Values above 1 require a classifier 
+                          that supports batches (e.g., HierarchicalClassifier).
+        link_filter (LinkRelevanceFilter): Ranks the related pages by relevance (dropping stop-listed ones), so only the
+                                           most relevant pages are fetched and classified. None to use a random order.
     """
 
     additional_search_queries = []
     num_added = 0
 
-    # Shuffle related pages (as they are ordered by alphabetical order)
-    random.shuffle(related_pages)
+    if link_filter is not None:
+        related_pages = link_filter.select(related_pages)
+    else:
+        # Shuffle related pages (as they are ordered by alphabetical order)
+        random.shuffle(related_pages)
 
-    for other_search_query in related_pages:
+    for start in range(0, len(related_pages), batch_size):
         if num_added >= num_to_search_for or num_added >= max_retrieval_per_query:
             break
-        _, page = retrieve_first_wikipedia_page(search_term=other_search_query)
-        if page is None:
-            print(f"Page not found for search query: {other_search_query}")
-            continue
-        predicted_class = search_query_classifier.execute(
-                                                            text=page.summary, 
-                                                            search_query=other_search_query, 
-                                                            class_hierarchy_tree=class_hierarchy_tree,
-                                                            )
-        if predicted_class is None:
-            continue
-        predicted_class = predicted_class["class"]
-        if predicted_class not in known_classes:
-            continue
-        if predicted_class == "Other":
-            continue
 
-        print(f"Other search query {other_search_query} | Predicted class: {predicted_class}")
-        data_instance = DataInstance(
-                                    search_query=other_search_query, 
-                                    predicted_class=predicted_class
-                                    )
-        additional_search_queries.append(data_instance)
-        num_added += 1
+        retrieved_pages = []
+        for other_search_query in related_pages[start:start + batch_size]:
+            _, page = retrieve_first_wikipedia_page(search_term=other_search_query)
+            if page is None:
+                print(f"Page not found for search query: {other_search_query}")
+                continue
+            retrieved_pages.append((other_search_query, page))
+
+        if batch_size > 1:
+            predicted_classes = search_query_classifier.execute_batch(
+                                                                    items=[(other_search_query, page.summary) for other_search_query, page in retrieved_pages]
+                                                                    )
+        else:
+            predicted_classes = [
+                                search_query_classifier.execute(
+                                                                text=page.summary, 
+                                                                search_query=other_search_query, 
+                                                                class_hierarchy_tree=class_hierarchy_tree,
+                                                                )
+                                for other_search_query, page in retrieved_pages
+                                ]
+
+        for (other_search_query, page), predicted_class in zip(retrieved_pages, predicted_classes):
+            if num_added >= num_to_search_for or num_added >= max_retrieval_per_query:
+                break
+            if predicted_class is None:
+                continue
+            predicted_class = predicted_class["class"]
+            if predicted_class not in known_classes:
+                predicted_class = "Other"
+            if link_filter is not None:
+                link_filter.record(other_search_query, predicted_class)
+            if predicted_class == "Other":
+                continue
+
+            print(f"Other search query {other_search_query} | Predicted class: {predicted_class}")
+            data_instance = DataInstance(
+                                        search_query=other_search_query, 
+                                        predicted_class=predicted_class
+                                        )
+            additional_search_queries.append(data_instance)
+            num_added += 1
     return additional_search_queries
\ No newline at end of file
@@ -0,0 +1,180 @@
+import hashlib
+from collections import defaultdict
+from typing import Dict, Any, List, Tuple, Union
+from music_history_ontology.data_ingestion.wikipedia.llm import LLMTextGenerator
+
+NO_MATCHING_SUBCLASS = "None" # Decision for an item that does not belong to any subclass of the current class
+
+class HierarchicalClassifier:
+
+    def __init__(
+                self,
+                class_hierarchy_tree:Dict[str, Any],
+                known_classes:set[str],
+                llm:LLMTextGenerator=None,
+                batch_size:int=10,
+                ):
+        """
+        Initialises the top-down classifier, which classifies instances by descending the class
+        hierarchy tree one level at a time.
+        - At each level, the prompt only lists the children of the current class, so sibling subtrees
+          are pruned as soon as a child is chosen.
+        - Decisions are cached per class node, so pages that are classified again (e.g., the same related
+          page linked from several base pages) reuse the upper-level decisions.
+
+        Args:
+            class_hierarchy_tree (Dict[str, Any]): The class hierarchy tree JSON for the ontology (without the "Thing" root).
+            known_classes (set[str]): A set containing the classes that exist in the ontology.
+            llm (LLMTextGenerator): The LLMTextGenerator instance for hierarchical classification.
+            batch_size (int): The maximum number of items classified within a single prompt at a class node.
+        """
+        self.known_classes = known_classes
+        self.batch_size = batch_size
+        self.llm = llm if llm is not None else LLMTextGenerator(role="hierarchical_classification")
+        self.children = self.build_children_map(class_hierarchy_tree=class_hierarchy_tree)
+
+        self.node_cache = {} # Maps (class node, item key) -> decision
+        self.num_cache_hits = 0
+        self.num_cache_misses = 0
+
+    def build_children_map(self, class_hierarchy_tree:Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        Creates a mapping from each class (as a full "." separated path) to the full paths
+        of its direct subclasses.
+
+        Args:
+            class_hierarchy_tree (Dict[str, Any]): The class hierarchy tree JSON for the ontology.
+        """
+        children = defaultdict(list)
+
+        def insert_recursive(node_path:str, subtree:Dict[str, Any]):
+            for child_name, child_subtree in subtree.items():
+                if child_name == "Thing": # Self-reference to the root, skip
+                    continue
+                child_path = f"{node_path}.{child_name}"
+                if child_path not in self.known_classes:
+                    continue
+                children[node_path].append(child_path)
+                insert_recursive(child_path, child_subtree)
+
+        insert_recursive("Thing", class_hierarchy_tree)
+        return dict(children)
+
+    def get_item_key(self, search_query:str, text:str) -> str:
+        """
+        Creates the cache key for an item from its search query and context text.
+
+        Args:
+            search_query (str): The search query for the item.
+            text (str): The context text for the item (e.g., the Wikipedia summary).
+        """
+        return hashlib.sha1(f"{search_query}\n{text}".encode("utf-8")).hexdigest()
+
+    def classify_at_node(self, node_path:str, items:List[Tuple[str, str]]) -> List[Union[str, None]]:
+        """
+        Decides which child of a class node each item belongs to.
+        - Returns a list aligned with the items, containing the chosen child class, NO_MATCHING_SUBCLASS
+          if no child matches or None if the LLM failed to produce a decision for the item.
+
+        Args:
+            node_path (str): The class node that the items have been classified as so far.
+            items (List[Tuple[str, str]]): The (search query, context text) pairs to classify.
+        """
+        candidate_classes = self.children[node_path]
+        item_keys = [self.get_item_key(search_query=search_query, text=text) for search_query, text in items]
+
+        # Find the unique items that have not already been decided at this node
+        uncached = {}
+        for item_key, (search_query, text) in zip(item_keys, items):
+            if (node_path, item_key) in self.node_cache:
+                self.num_cache_hits += 1
+                continue
+            self.num_cache_misses += 1
+            uncached[item_key] = (search_query, text)
+
+        uncached_keys = list(uncached.keys())
+        for start in range(0, len(uncached_keys), self.batch_size):
+            batch_keys = uncached_keys[start:start + self.batch_size]
+            batch_items = [
+                        {
+                        "id": str(i),
+                        "search_query": uncached[item_key][0],
+                        "context_text": uncached[item_key][1]
+                        }
+                        for i, item_key in enumerate(batch_keys)
+                        ]
+            json_output = self.llm.execute(
+                                        current_class=node_path,
+                                        candidate_classes=candidate_classes,
+                                        items=batch_items
+                                        )
+            if json_output is None:
+                continue
+
+            for i, item_key in enumerate(batch_keys):
+                if str(i) not in json_output["classes"]: # Invalid or missing decision, do not cache
+                    continue
+                decision = json_output["classes"][str(i)]
+                self.node_cache[(node_path, item_key)] = decision if decision is not None else NO_MATCHING_SUBCLASS
+
+        return [self.node_cache.get((node_path, item_key), None) for item_key in item_keys]
+
+    def execute_batch(self, items:List[Tuple[str, str]]) -> List[Union[Dict[str, str], None]]:
+        """
+        Classifies a batch of items by descending the class hierarchy tree level by level.
+        - Items that are at the same class node are classified together, so that they
+          share a single prompt at each level.
+
+        Args:
+            items (List[Tuple[str, str]]): The (search query, context text) pairs to classify.
+        """
+        results = [None for _ in range(len(items))]
+        current_nodes = {i: "Thing" for i in range(len(items))}
+        pending = list(range(len(items)))
+
+        while len(pending) > 0:
+            # Group the pending items by the class node they are currently at
+            items_at_node = defaultdict(list)
+            for i in pending:
+                items_at_node[current_nodes[i]].append(i)
+
+            next_pending = []
+            for node_path, item_indices in items_at_node.items():
+                # Leaf class, nothing more specific to choose
+                if node_path not in self.children:
+                    for i in item_indices:
+                        results[i] = {"class": node_path}
+                    continue
+
+                decisions = self.classify_at_node(
+                                                node_path=node_path,
+                                                items=[items[i] for i in item_indices]
+                                                )
+                for i, decision in zip(item_indices, decisions):
+                    if decision is None: # Failed to classify
+                        results[i] = None
+                    elif decision == NO_MATCHING_SUBCLASS:
+                        # Not an instance of any class in the ontology if no top-level class matches
+                        results[i] = {"class": "Other" if node_path == "Thing" else node_path}
+                    else:
+                        current_nodes[i] = decision
+                        next_pending.append(i)
+            pending = next_pending
+        return results
+
+    def execute(
+            self,
+            text:str=None,
+            search_query:str=None,
+            class_hierarchy_tree:str=None,
+            ) -> Union[Dict[str, str], None]:
+        """
+        Classifies a single item, with the same interface as the LLMTextGenerator for
+        search query classification.
+
+        Args:
+            text (str): The context text for the search query (e.g., the Wikipedia summary).
+            search_query (str): The search query to classify.
+            class_hierarchy_tree (str): Unused, the hierarchy tree provided at initialisation is used instead.
+        """
+        return self.execute_batch(items=[(search_query, text)])[0]
@@ -1,15 +1,54 @@
+import os
+import json
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, List, TextIO
+from music_history_ontology.data_ingestion.object_properties import ObjectPropertyLinks
+
+# Namespace for the deterministic instance IDs, so that reruns over the same pages produce the same IDs
+INSTANCE_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/LyleW473/MusicHistoryOntology")
+
+_encode = json.JSONEncoder().encode
+
+def create_instance_id(source:str, source_key:str, predicted_class:str) -> str:
+    """
+    Creates a deterministic ID for an instance from its source, canonical key and class.
+
+    Args:
+        source (str): The source of the instance, e.g., "wikipedia".
+        source_key (str): The canonical key of the instance within the source, e.g., the canonical page title.
+        predicted_class (str): The predicted class of the instance.
+    """
+    return str(uuid.uuid5(INSTANCE_ID_NAMESPACE, f"{source}|{source_key}|{predicted_class}"))
 
 class DataInstance:
+    # No per-instance __dict__, as hundreds of thousands of instances can be held in memory during a crawl
+    __slots__ = ("id", "predicted_class", "search_query", "alias", "json_data")
+
     def __init__(
-                self, 
-                predicted_class:str=None, 
-                search_query:str=None, 
-                alias:str=None, 
-                json_data:Dict[str, Any]=None
+                self,
+                predicted_class:str=None,
+                search_query:str=None,
+                alias:str=None,
+                json_data:Dict[str, Any]=None,
+                source:str="wikipedia",
+                source_key:str=None
                 ):
-        self.id = str(uuid.uuid4()) # Unique identifier for the instance
+        """
+        Args:
+            predicted_class (str): The predicted class of the instance.
+            search_query (str): The search query for the instance.
+            alias (str): The alias of the instance.
+            json_data (Dict[str, Any]): The object properties (ObjectPropertyLinks) and data properties of the instance.
+            source (str): The source of the instance.
+            source_key (str): The canonical key of the instance within the source (e.g., the canonical page title),
+                              defaults to the search query. A random ID is used if neither is set.
+        """
+        if source_key is None:
+            source_key = search_query
+        if source_key is None:
+            self.id = str(uuid.uuid4())
+        else:
+            self.id = create_instance_id(source=source, source_key=source_key, predicted_class=predicted_class) # Unique identifier for the instance
         self.predicted_class = predicted_class
         self.search_query = search_query
         self.alias = alias
@@ -17,10 +56,10 @@ class DataInstance:
 
     def set_alias(self, alias:str):
         self.alias = alias
-    
+
     def set_search_query(self, search_query:str):
         self.search_query = search_query
-    
+
     def set_predicted_class(self, predicted_class:str):
         self.predicted_class = predicted_class
 
@@ -40,8 +79,11 @@ class DataInstance:
                 if value is None:
                     continue
                 new_data_props[data_prop] = value
+            object_properties = self.json_data["object_properties"]
+            if isinstance(object_properties, ObjectPropertyLinks):
+                object_properties = object_properties.materialize()
             json_data = {
-                        "object_properties": self.json_data["object_properties"], 
+                        "object_properties": object_properties,
                         "data_properties": new_data_props
                         }
         return {
@@ -51,4 +93,159 @@ class DataInstance:
             "alias": self.alias,
             "json_data": json_data
             }
-    
\ No newline at end of file
+
+    def write_json(self, stream:TextIO) -> None:
+        """
+        Writes the JSON equivalent of convert_to_json directly to a text stream, without building
+        the intermediate dictionaries.
+
+        Args:
+            stream (TextIO): The stream to write to.
+        """
+        write = stream.write
+        write('{"id": ')
+        write(_encode(self.id))
+        write(', "predicted_class": ')
+        write(_encode(self.predicted_class))
+        write(', "search_query": ')
+        write(_encode(self.search_query))
+        write(', "alias": ')
+        write(_encode(self.alias))
+        write(', "json_data": ')
+        if self.json_data is None:
+            write("null}")
+            return
+        write('{"object_properties": ')
+        object_properties = self.json_data["object_properties"]
+        if isinstance(object_properties, ObjectPropertyLinks):
+            object_properties.write_json(stream)
+        else:
+            write(_encode(object_properties))
+        write(', "data_properties": {')
+        is_first = True
+        for data_prop, value in self.json_data["data_properties"].items():
+            if value is None:
+                continue
+            if not is_first:
+                write(", ")
+            write(_encode(data_prop))
+            write(": ")
+            write(_encode(value))
+            is_first = False
+        write("}}}")
+
+def write_class_data(class_name:str, data_instances:List[DataInstance], stream:TextIO) -> None:
+    """
+    Writes the data instances for a class to a text stream in the {"class_name": ..., "data": [...]}
+    format, one instance per line.
+
+    Args:
+        class_name (str): The name of the class.
+        data_instances (List[DataInstance]): The data instances of the class.
+        stream (TextIO): The stream to write to.
+    """
+    stream.write('{"class_name": ')
+    stream.write(_encode(class_name))
+    stream.write(', "data": [')
+    for i, data_instance in enumerate(data_instances):
+        stream.write("\n" if i == 0 else ",\n")
+        data_instance.write_json(stream)
+    stream.write("\n]}\n")
+
+class ClassDataWriter:
+
+    def __init__(self, data_dir:str, class_names:List[str]):
+        """
+        Writes data instances to disk as they are completed, appending each instance as a JSON line
+        to a part file for its class. The class files (in the write_class_data format) are assembled
+        from the part files when the writer is closed. Not thread-safe, intended for a single writer.
+
+        Args:
+            data_dir (str): The directory the class files are saved to.
+            class_names (List[str]): The names of the classes (a file is created for each class, even without data).
+        """
+        self.data_dir = data_dir
+        self.class_names = class_names
+        self.part_files = {}
+        self.num_written = {class_name: 0 for class_name in class_names}
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    def get_file_path(self, class_name:str) -> str:
+        clean_class_name = class_name.replace(".", "_") # E.g., Thing.Composers -> Thing_Composers
+        return os.path.join(self.data_dir, f"{clean_class_name}.json")
+
+    def write(self, data_instance:DataInstance) -> None:
+        """
+        Appends a data instance to the part file for its class.
+
+        Args:
+            data_instance (DataInstance): The data instance (with all of its links added).
+        """
+        class_name = data_instance.predicted_class
+        if class_name not in self.part_files:
+            self.part_files[class_name] = open(f"{self.get_file_path(class_name)}.part", "w")
+        data_instance.write_json(self.part_files[class_name])
+        self.part_files[class_name].write("\n")
+        self.num_written[class_name] = self.num_written.get(class_name, 0) + 1
+
+    def close(self) -> None:
+        """
+        Assembles the class files from the part files.
+        """
+        for class_name in self.num_written.keys():
+            part_file = self.part_files.pop(class_name, None)
+            with open(self.get_file_path(class_name), "w") as f:
+                f.write('{"class_name": ')
+                f.write(_encode(class_name))
+                f.write(', "data": [')
+                if part_file is not None:
+                    part_file.close()
+                    with open(part_file.name, "r") as part:
+                        for i, line in enumerate(part):
+                            f.write("\n" if i == 0 else ",\n")
+                            f.write(line.rstrip("\n"))
+                    os.remove(part_file.name)
+                f.write("\n]}\n")
+            print(f"Class: {class_name} | Num data for class: {self.num_written[class_name]}")
+
+def merge_class_files(input_dirs:List[str], output_dir:str) -> Dict[str, int]:
+    """
+    Merges the class files written by several workers into a single file per class, skipping
+    instances with duplicate IDs. Returns the number of instances for each class.
+    - The merged files are written to temporary files first, so that a concurrent merge never
+      leaves a half-written class file.
+
+    Args:
+        input_dirs (List[str]): The directories containing the class files of each worker.
+        output_dir (str): The directory the merged class files are saved to.
+    """
+    instances_for_each_class = {}
+    seen_ids = set()
+    for input_dir in sorted(input_dirs):
+        for file_name in sorted(os.listdir(input_dir)):
+            if not file_name.endswith(".json"):
+                continue
+            with open(os.path.join(input_dir, file_name), "r") as f:
+                class_data = json.load(f)
+            data_for_class = instances_for_each_class.setdefault(class_data["class_name"], [])
+            for instance in class_data["data"]:
+                if instance["id"] in seen_ids:
+                    continue
+                seen_ids.add(instance["id"])
+                data_for_class.append(instance)
+
+    os.makedirs(output_dir, exist_ok=True)
+    for class_name, data_for_class in instances_for_each_class.items():
+        clean_class_name = class_name.replace(".", "_")
+        file_path = os.path.join(output_dir, f"{clean_class_name}.json")
+        temp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_file_path, "w") as f:
+            f.write('{"class_name": ')
+            f.write(_encode(class_name))
+            f.write(', "data": [')
+            for i, instance in enumerate(data_for_class):
+                f.write("\n" if i == 0 else ",\n")
+                f.write(_encode(instance))
+            f.write("\n]}\n")
+        os.replace(temp_file_path, file_path)
+    return {class_name: len(data_for_class) for class_name, data_for_class in instances_for_each_class.items()}
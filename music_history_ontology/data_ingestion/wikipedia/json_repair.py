@@ -0,0 +1,149 @@
+import re
+import json
+
+from typing import Dict, Any, List, Tuple, Union
+
+_CODE_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)\s*(?:```|$)", flags=re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+
+def strip_code_fence(text:str) -> str:
+    """
+    Removes a Markdown code fence wrapping the JSON object (if any), e.g., ```json {...} ```.
+
+    Args:
+        text (str): The generated text.
+    """
+    match = _CODE_FENCE_PATTERN.search(text)
+    if match is None:
+        return text
+    return match.group(1)
+
+def remove_trailing_commas(text:str) -> str:
+    """
+    Removes commas directly before a closing brace or bracket (outside of strings).
+
+    Args:
+        text (str): The JSON text.
+    """
+    parts = re.split(r'("(?:\\.|[^"\\])*")', text) # Odd indices are strings
+    for i in range(0, len(parts), 2):
+        parts[i] = _TRAILING_COMMA_PATTERN.sub(r"\1", parts[i])
+    return "".join(parts)
+
+def _scan_brackets(text:str) -> Tuple[List[str], bool, int, Union[int, None]]:
+    """
+    Scans JSON text, returning:
+    - The closing characters for the brackets that are still open.
+    - Whether the text ends inside a string.
+    - The index after the last complete value (i.e., the last comma or closing bracket outside of a string).
+    - The index after the first top-level value is closed (None if it is never closed).
+
+    Args:
+        text (str): The JSON text.
+    """
+    stack = []
+    in_string = False
+    is_escaped = False
+    last_safe_index = 0
+    end_index = None
+    for i, char in enumerate(text):
+        if in_string:
+            if is_escaped:
+                is_escaped = False
+            elif char == "\\":
+                is_escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            last_safe_index = i + 1
+            if not stack and end_index is None:
+                end_index = i + 1
+        elif char == ",":
+            last_safe_index = i
+    return stack, in_string, last_safe_index, end_index
+
+def remove_commentary(text:str) -> str:
+    """
+    Removes any text before the JSON object and after its closing brace,
+    e.g., "Sure! Here is the JSON object: {...}" -> "{...}".
+
+    Args:
+        text (str): The generated text.
+    """
+    start = text.find("{")
+    if start == -1:
+        return text
+    text = text[start:]
+    _, _, _, end_index = _scan_brackets(text)
+    if end_index is None:
+        return text # Possibly truncated, closed by close_truncated_json
+    return text[:end_index]
+
+def close_truncated_json(text:str) -> str:
+    """
+    Closes a JSON object that was cut off part-way through (e.g., when the model reached
+    its token limit). If the text ends after a complete value, the open brackets are closed;
+    otherwise (e.g., the text ends inside a string, a number or after a key), the incomplete
+    key or value is dropped, so that a cut off value (e.g., "17" from "1756") is never kept.
+    Completed fields are kept.
+
+    Args:
+        text (str): The truncated JSON text.
+    """
+    stack, in_string, last_safe_index, _ = _scan_brackets(text)
+    if not stack and not in_string:
+        return text
+
+    tail = text.rstrip()
+    if not in_string and (tail.endswith(('"', "}", "]", "true", "false", "null"))):
+        closed = tail + "".join(reversed(stack))
+        try:
+            json.loads(closed)
+            return closed
+        except json.JSONDecodeError:
+            pass
+
+    # Keep everything up to the last complete value and close the remaining brackets
+    repaired = text[:last_safe_index] if last_safe_index > 0 else text[:1]
+    stack, in_string, _, _ = _scan_brackets(repaired)
+    repaired = repaired.rstrip().rstrip(",") + ('"' if in_string else "")
+    return remove_trailing_commas(repaired + "".join(reversed(stack)))
+
+def repair_json(generated_text:str) -> Union[Dict[str, Any], None]:
+    """
+    Parses a JSON object from generated text, repairing the common ways that models
+    produce slightly malformed output:
+    - Code fences around the JSON object.
+    - Commentary before or after the JSON object.
+    - Trailing commas.
+    - Truncated output (completed fields are kept).
+
+    Returns None if the text cannot be repaired into a JSON object.
+
+    Args:
+        generated_text (str): The text generated by the LLM.
+    """
+    if generated_text is None:
+        return None
+    try:
+        json_output = json.loads(generated_text)
+        return json_output if isinstance(json_output, dict) else None
+    except json.JSONDecodeError:
+        pass
+
+    text = remove_commentary(strip_code_fence(generated_text.strip()))
+    for repair in (remove_trailing_commas, close_truncated_json):
+        text = repair(text)
+        try:
+            json_output = json.loads(text)
+            return json_output if isinstance(json_output, dict) else None
+        except json.JSONDecodeError:
+            continue
+    return None
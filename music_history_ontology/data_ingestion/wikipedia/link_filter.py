@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import faiss
+import threading
+import numpy as np
+
+from typing import List, Union
+from sentence_transformers import SentenceTransformer
+
+# Link titles that are never instances of the ontology's classes (dates, years, lists, etc.)
+STOP_PATTERNS = [
+                re.compile(r"^\d{1,4}s?( (BC|AD|BCE|CE))?$"), # E.g., 1756, 1750s
+                re.compile(r"^\d{1,2}(st|nd|rd|th) century", flags=re.IGNORECASE),
+                re.compile(r"^(January|February|March|April|May|June|July|August|September|October|November|December)( \d{1,2})?$"),
+                re.compile(r"^\d{1,4} in "), # E.g., 1791 in music
+                re.compile(r"^(List|Lists|Index|Outline|Timeline|Glossary) of ", flags=re.IGNORECASE),
+                re.compile(r"^(ISBN|ISSN|OCLC|Doi|Digital object identifier|Wayback Machine)( .*)?$", flags=re.IGNORECASE)
+                ]
+
+def get_class_description(class_name:str) -> str:
+    """
+    Returns a short text description of an ontology class for embedding, e.g.,
+    "Thing.MusicArtist.Musician" -> "Musician (a kind of Music Artist)".
+
+    Args:
+        class_name (str): The name of the class.
+    """
+    names = [re.sub(r"(?<=[a-z])(?=[A-Z])", " ", name) for name in class_name.split(".") if name != "Thing"]
+    if len(names) == 0:
+        return class_name
+    if len(names) == 1:
+        return names[0]
+    return f"{names[-1]} (a kind of {names[-2]})"
+
+class LinkRelevanceFilter:
+
+    def __init__(
+                self,
+                class_names:List[str],
+                st_model:SentenceTransformer=None,
+                max_links:int=50,
+                stop_list_path:str=None,
+                seed_titles:List[str]=None,
+                min_rejections:int=3
+                ):
+        """
+        Local pre-filter for the links of a page, ranking them by their relevance to the ontology so that
+        only the top links are fetched and classified (instead of a random sample of all links).
+        - Link titles are embedded with the SentenceTransformer and scored by their maximum cosine
+          similarity to the descriptions of the classes and to the titles already accepted as instances.
+        - Titles matching the STOP_PATTERNS (e.g., dates) or in the learned stop-list are dropped without
+          embedding. A title is added to the stop-list once it has been classified as "Other" (or an unknown
+          class) min_rejections times, so the same generic links (e.g., countries) are not classified again
+          on every page, while a single misclassification does not block a page. A title classified as an
+          instance of a class has its rejections cleared (and is removed from the stop-list).
+
+        Args:
+            class_names (List[str]): The classes of the ontology (excluding "Other").
+            st_model (SentenceTransformer): The SentenceTransformer model used to embed the titles.
+            max_links (int): The maximum number of links of a page passed on to fetching and classification.
+            stop_list_path (str): The path the rejection counts of the titles (from which the learned stop-list is built) are
+                                  persisted to (None to keep them in memory only).
+            seed_titles (List[str]): Titles known to be relevant, e.g., the initial search queries.
+            min_rejections (int): The number of times a title must be classified as "Other" before it is stop-listed.
+        """
+        self.st_model = st_model if st_model is not None else SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        self.max_links = max_links
+        self.stop_list_path = stop_list_path
+        self.min_rejections = min_rejections
+        self.lock = threading.Lock()
+
+        class_descriptions = [get_class_description(class_name) for class_name in class_names if class_name not in ("Thing", "Other")]
+        self.class_embeddings = self.embed(class_descriptions)
+        self.relevant_index = faiss.IndexFlatIP(self.st_model.get_sentence_embedding_dimension())
+        self.relevant_titles = set()
+        self.rejections = {} # Title -> number of times it was classified as "Other" (since it was last accepted)
+        if self.stop_list_path is not None and os.path.exists(self.stop_list_path):
+            with open(self.stop_list_path, "r") as f:
+                self.rejections = json.load(f)
+        self.stop_list = {title for title, num_rejections in self.rejections.items() if num_rejections >= self.min_rejections}
+        if seed_titles:
+            self.add_relevant_titles(seed_titles)
+
+        self.num_links = 0
+        self.num_stop_listed = 0
+        self.num_selected = 0
+        self.num_accepted = 0
+        self.num_rejected = 0
+
+    def embed(self, titles:List[str]) -> np.ndarray:
+        return self.st_model.encode(titles, normalize_embeddings=True).astype(np.float32)
+
+    def is_stop_listed(self, title:str) -> bool:
+        return title in self.stop_list or any(pattern.search(title) for pattern in STOP_PATTERNS)
+
+    def add_relevant_titles(self, titles:List[str]) -> None:
+        """
+        Adds titles known to be relevant (i.e., instances of the ontology's classes), which similar links are ranked higher for.
+
+        Args:
+            titles (List[str]): The titles.
+        """
+        with self.lock:
+            titles = [title for title in titles if title not in self.relevant_titles]
+            if len(titles) == 0:
+                return
+            self.relevant_titles.update(titles)
+        embeddings = self.embed(titles)
+        with self.lock:
+            self.relevant_index.add(embeddings)
+
+    def score(self, titles:List[str]) -> np.ndarray:
+        """
+        Scores link titles by their maximum cosine similarity to the class descriptions and the relevant titles.
+
+        Args:
+            titles (List[str]): The link titles.
+        """
+        embeddings = self.embed(titles)
+        scores = (embeddings @ self.class_embeddings.T).max(axis=1)
+        with self.lock:
+            if self.relevant_index.ntotal > 0:
+                similarities, _ = self.relevant_index.search(embeddings, 1)
+                scores = np.maximum(scores, similarities[:, 0])
+        return scores
+
+    def select(self, links:List[str], max_links:Union[int, None]=None) -> List[str]:
+        """
+        Returns the most relevant links (highest score first), excluding stop-listed links.
+
+        Args:
+            links (List[str]): The titles of the links of a page.
+            max_links (Union[int, None]): The maximum number of links to return, defaults to max_links.
+        """
+        max_links = self.max_links if max_links is None else max_links
+        with self.lock:
+            candidates = [link for link in dict.fromkeys(links) if not self.is_stop_listed(link)]
+            self.num_links += len(links)
+            self.num_stop_listed += len(links) - len(candidates)
+        if len(candidates) == 0:
+            return []
+        scores = self.score(candidates)
+        selected = [candidates[i] for i in np.argsort(-scores, kind="stable")[:max_links]]
+        with self.lock:
+            self.num_selected += len(selected)
+        return selected
+
+    def record(self, title:str, predicted_class:str) -> None:
+        """
+        Records the classification of a selected link, learning from it (relevant titles and the stop-list).
+
+        Args:
+            title (str): The title of the link.
+            predicted_class (str): The predicted class ("Other" if it is not an instance of the ontology).
+        """
+        if predicted_class == "Other":
+            with self.lock:
+                self.num_rejected += 1
+                self.rejections[title] = self.rejections.get(title, 0) + 1
+                if self.rejections[title] >= self.min_rejections:
+                    self.stop_list.add(title)
+            return
+        with self.lock:
+            self.num_accepted += 1
+            self.rejections.pop(title, None)
+            self.stop_list.discard(title)
+        self.add_relevant_titles([title])
+
+    def save(self) -> None:
+        if self.stop_list_path is None:
+            return
+        with self.lock:
+            rejections = dict(sorted(self.rejections.items()))
+        os.makedirs(os.path.dirname(self.stop_list_path) or ".", exist_ok=True)
+        temp_file_path = f"{self.stop_list_path}.{os.getpid()}.tmp"
+        with open(temp_file_path, "w") as f:
+            json.dump(rejections, f, indent=4)
+        os.replace(temp_file_path, self.stop_list_path)
+
+    def report(self) -> None:
+        with self.lock:
+            num_classified = self.num_accepted + self.num_rejected
+            calls_per_accepted = num_classified / self.num_accepted if self.num_accepted > 0 else float("nan")
+            print(
+                f"Link filter | Links: {self.num_links} | Stop-listed: {self.num_stop_listed} | Selected: {self.num_selected} | "
+                f"Classified: {num_classified} | Accepted: {self.num_accepted} | Classifications per accepted link: {calls_per_accepted:.2f} | "
+                f"Stop-list size: {len(self.stop_list)}"
+                )
@@ -1,9 +1,12 @@
-import os
 import json
+import threading
 
-from typing import Dict, Any, Tuple, List
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from typing import Dict, Any, Tuple, List, Union
+from music_history_ontology.data_ingestion.resilience import get_endpoint
+from music_history_ontology.data_ingestion.wikipedia.backends import LLMBackend
+from music_history_ontology.data_ingestion.wikipedia.client_pool import get_client_pool
+from music_history_ontology.data_ingestion.wikipedia.json_repair import repair_json
+from music_history_ontology.data_ingestion.wikipedia.structured_output import build_response_format
 from music_history_ontology.data_ingestion.wikipedia.constants import (
                                                                     QUERY_TEMPLATES,
                                                                     USER_EMBEDDING_TEMPLATES,
@@ -27,11 +30,23 @@ def is_none_or_empty_str(value:Any) -> bool:
     # E.g., not a string, is not the string "none" or is not the empty string
     return False
 
+GENERATORS = [] # Every LLMTextGenerator created, for report_generator_stats
+_GENERATORS_LOCK = threading.Lock()
+
 class LLMTextGenerator:
 
-    def __init__(self, role:str="information_extraction"):
+    def __init__(
+                self, 
+                role:str="information_extraction", 
+                backend:Union[str, LLMBackend, None]=None,
+                structured_output:bool=False,
+                retry_invalid_fields:bool=True
+                ):
         """
         Initialises the LLMTextGenerator with the specified role.
+        - The backend is obtained from the process-wide client pool, so all roles share the same
+          backend, HTTP connections and concurrency limit.
+        - execute is safe to call from several threads.
 
         Args:
             role (str): The role of the LLM. Supported roles are:
@@ -39,26 +54,47 @@ class LLMTextGenerator:
                         - "information_extraction"
                         - "alias_generation"
                         - "search_query_generation"
+                        - "time_interval_generation"
+                        - "hierarchical_classification"
+            backend (Union[str, LLMBackend, None]): The backend used to generate completions, either the name of a 
+                                                    registered backend (e.g., "openai", "standin", "replay"), a backend
+                                                    instance or None to use the LLM_BACKEND environment variable.
+                                                    Backends given by name are shared through the client pool.
+            structured_output (bool): Whether to request JSON schema responses from the backend (see structured_output.py).
+            retry_invalid_fields (bool): Whether to make a single retry that only asks for the fields that were missing 
+                                         or invalid in the first answer.
         """
-        OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-        if OPENAI_API_KEY is None:
-            raise ValueError("OPENAI_API_KEY environment variable is not set.")
         if role not in QUERY_TEMPLATES:
             raise ValueError(f"Role '{role}' is not supported. Supported roles are: {list(QUERY_TEMPLATES.keys())}.")
         
-        query_template = QUERY_TEMPLATES[role]
-        query_template = ChatPromptTemplate([
-                                            ("system", query_template),
-                                            ("user", "{question}"),
-                                            ])
-        print("OPENAI_API_KEY", OPENAI_API_KEY)
+        self.system_prompt = QUERY_TEMPLATES[role]
         self.user_embedding_template = USER_EMBEDDING_TEMPLATES[role]
 
         self.role = role
+        self.backend = get_client_pool().get_backend(backend)
+        self.endpoint = get_endpoint(f"llm.{self.backend.name}") # Shared by all generators using the same backend
+        self.structured_output = structured_output
+        self.retry_invalid_fields = retry_invalid_fields
 
-        model = ChatOpenAI(api_key=OPENAI_API_KEY, model="gpt-4o-mini")
-        self.chain = query_template | model
+        # Counters for the answers that required repairing or a retry
+        self.counter_lock = threading.Lock()
+        self.num_repaired = 0
+        self.num_field_retries = 0
+        self.num_unparseable = 0
+        with _GENERATORS_LOCK:
+            GENERATORS.append(self)
         
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the counters for the answers that required repairing or a retry.
+        """
+        with self.counter_lock:
+            return {
+                    "repaired": self.num_repaired,
+                    "field_retries": self.num_field_retries,
+                    "unparseable": self.num_unparseable
+                    }
+
     def embed_text(self, **kwargs) -> str:
 
         """
@@ -73,20 +109,33 @@ class LLMTextGenerator:
             raise ValueError(f"Missing required keyword argument: {e}")
         return input_text
     
-    def generate_answer(self, input_text:str) -> str:
+    def generate_answer(self, input_text:str, response_format:Dict[str, Any]=None) -> str:
         """
         Generates an answer using the LLM model.
+        - Transient errors (e.g., rate limits, 5xx, connection errors) are retried with backoff.
+        - Returns None if the request failed, so that the instance can be skipped.
 
         Args:
             input_text (str): The input text to generate an answer for.
+            response_format (Dict[str, Any]): The JSON schema response format to request (if any).
         """
-        generated_answer = self.chain.invoke({"question": input_text})
-        generated_text = generated_answer.content
+        try:
+            generated_text = self.endpoint.call(
+                                                self.backend.generate,
+                                                system_prompt=self.system_prompt,
+                                                user_prompt=input_text,
+                                                role=self.role,
+                                                response_format=response_format
+                                                )
+        except Exception as e:
+            print(f"Error generating answer for role '{self.role}': {e}")
+            return None
         return generated_text
     
     def extract_answer(self, generated_text:str) -> Tuple[Dict[str, str], None]:
         """
-        Attempts to extract the JSON object from the generated text.
+        Attempts to extract the JSON object from the generated text, repairing slightly
+        malformed output (e.g., code fences, trailing commas, truncation) if needed.
         
         Args:
             generated_text (str): The text generated by the LLM model to extract the JSON object from.
@@ -94,10 +143,82 @@ class LLMTextGenerator:
         try:
             # print("Generated text:", generated_text)
             json_output = json.loads(generated_text)
-            return json_output
+            if isinstance(json_output, dict):
+                return json_output
         except Exception as e:
             print("Error parsing JSON object:", e)
+
+        json_output = repair_json(generated_text)
+        with self.counter_lock:
+            if json_output is None:
+                self.num_unparseable += 1
+            else:
+                self.num_repaired += 1
+        if json_output is None:
+            print("Unable to repair JSON object.")
+        return json_output
+    
+    def find_invalid_fields(
+                            self, 
+                            json_output:Union[Dict[str, Any], None], 
+                            json_structure:Dict[str, Any]=None, 
+                            candidate_classes:List[str]=None,
+                            items:List[Dict[str, str]]=None
+                            ) -> Union[List[str], None]:
+        """
+        Finds the fields (or, for hierarchical classification, the item IDs) that are missing or 
+        invalid in the JSON output. Returns None if the whole output is invalid.
+
+        Args:
+            json_output (Union[Dict[str, Any], None]): The extracted JSON output.
+            json_structure (Dict[str, Any]): A structure describing the JSON fields to extract. (Information extraction)
+            candidate_classes (List[str]): The direct subclasses of the current class. (Hierarchical classification)
+            items (List[Dict[str, str]]): The items that were classified. (Hierarchical classification)
+        """
+        if json_output is None:
+            return None
+        
+        if self.role == "information_extraction":
+            return [field for field in json_structure.keys() if field not in json_output]
+        
+        elif self.role == "hierarchical_classification":
+            if not isinstance(json_output.get("classes", None), dict):
+                return None
+            valid_classes = set(candidate_classes) | {"None"}
+            return [
+                    item["id"] for item in items 
+                    if not isinstance(json_output["classes"].get(item["id"], None), str)
+                    or (json_output["classes"][item["id"]] not in valid_classes and not is_none_or_empty_str(json_output["classes"][item["id"]]))
+                    ]
+        
+        # Roles with a single expected field
+        expected_field = {
+                        "search_query_classification": "class",
+                        "alias_generation": "alias",
+                        "search_query_generation": "search_query",
+                        "time_interval_generation": "time_intervals",
+                        }[self.role]
+        if expected_field not in json_output:
+            return None
+        if self.role == "time_interval_generation" and not isinstance(json_output[expected_field], dict):
+            return None
+        return []
+    
+    def request_json(self, input_text:str, **kwargs) -> Union[Dict[str, Any], None]:
+        """
+        Generates an answer for the input text and extracts the JSON object from it.
+
+        Args:
+            input_text (str): The input text to generate an answer for.
+            kwargs: Keyword arguments for building the response format (structured output only).
+        """
+        response_format = None
+        if self.structured_output:
+            response_format = build_response_format(role=self.role, **kwargs)
+        generated_text = self.generate_answer(input_text, response_format=response_format)
+        if generated_text is None:
             return None
+        return self.extract_answer(generated_text)
         
     def postprocess_json(self, json_output:Dict[str, Any], **kwargs) -> Dict[str, Any]:
         """
@@ -174,32 +295,41 @@ class LLMTextGenerator:
                         print(f"Removing invalid time interval: {key}")
                         print(json_output["time_intervals"][key])
                         del json_output["time_intervals"][key]
+
+        elif self.role == "hierarchical_classification":
+            if json_output is not None:
+                candidate_classes = kwargs.get("candidate_classes", None)
+                assert candidate_classes is not None, "candidate_classes must be provided for hierarchical classification."
+                if "classes" not in json_output or not isinstance(json_output["classes"], dict):
+                    json_output = None
+                else:
+                    # Keep only the decisions that are valid candidates (or "None", i.e., no candidate matches)
+                    valid_classes = {}
+                    for item_id, predicted_class in json_output["classes"].items():
+                        if predicted_class is None or is_none_or_empty_str(predicted_class):
+                            valid_classes[str(item_id)] = None
+                        elif predicted_class in candidate_classes:
+                            valid_classes[str(item_id)] = predicted_class
+                    json_output["classes"] = valid_classes
                     
         return json_output
     
-    def execute(
-            self,
-            text:str=None,
-            search_query:str=None, 
-            json_structure:Dict[str, Any]=None, 
-            class_hierarchy_tree:str=None,
-            predicted_class:str=None,
-            desired_class:str=None,
-            property_mappings_for_class:Dict[str, Any]=None,
-            all_generated_queries:List[str]=None,
-            ) -> Tuple[Dict[str, str], None]:
+    def render_prompt(
+                    self,
+                    text:str=None,
+                    search_query:str=None, 
+                    json_structure:Dict[str, Any]=None, 
+                    class_hierarchy_tree:str=None,
+                    predicted_class:str=None,
+                    desired_class:str=None,
+                    property_mappings_for_class:Dict[str, Any]=None,
+                    all_generated_queries:List[str]=None,
+                    current_class:str=None,
+                    candidate_classes:List[str]=None,
+                    items:List[Dict[str, str]]=None,
+                    ) -> str:
         """
-        Executes the text generation process.
-
-        Args:
-            text (str): The text to embed in the prompt. (All)
-            search_query (str): The search query to classify. (Search query classification)
-            json_structure (Dict[str, Any]): A structure describing the JSON fields to extract. (Information extraction)
-            class_hierarchy_tree (str): The string equivalent of the class hierarchy tree JSON for the ontology. (Search query classification + Alias generation)
-            predicted_class (str): The predicted class for the instance. (Alias generation)
-            desired_class (str): The class that the generated search query should relate to (Search query generation)
-            property_mappings_for_class (Dict[str, Any]): A mapping of properties and the datatype of those properties for a given class. (Search query generation)
-            all_generated_queries (List[str]): A list of all previously generated search queries to avoid duplicate search queries. (Search query generation)
+        Renders the user prompt for the role (see execute for the arguments).
         """
         if self.role == "search_query_classification":
             input_text = self.embed_text(
@@ -230,7 +360,118 @@ class LLMTextGenerator:
                                         property_mappings_for_class=property_mappings_for_class,
                                         all_generated_queries=all_generated_queries
                                         )
-        generated_text = self.generate_answer(input_text)
-        json_output = self.extract_answer(generated_text)
-        json_output = self.postprocess_json(json_output, json_structure=json_structure)
-        return json_output
\ No newline at end of file
+        elif self.role == "hierarchical_classification":
+            input_text = self.embed_text(
+                                        current_class=current_class,
+                                        candidate_classes="\n".join([f"- {c_class}" for c_class in candidate_classes]),
+                                        items=json.dumps(items, indent=4, ensure_ascii=False)
+                                        )
+        return input_text
+
+    def execute(
+            self,
+            text:str=None,
+            search_query:str=None, 
+            json_structure:Dict[str, Any]=None, 
+            class_hierarchy_tree:str=None,
+            predicted_class:str=None,
+            desired_class:str=None,
+            property_mappings_for_class:Dict[str, Any]=None,
+            all_generated_queries:List[str]=None,
+            current_class:str=None,
+            candidate_classes:List[str]=None,
+            items:List[Dict[str, str]]=None,
+            ) -> Tuple[Dict[str, str], None]:
+        """
+        Executes the text generation process.
+
+        Args:
+            text (str): The text to embed in the prompt. (All)
+            search_query (str): The search query to classify. (Search query classification)
+            json_structure (Dict[str, Any]): A structure describing the JSON fields to extract. (Information extraction)
+            class_hierarchy_tree (str): The string equivalent of the class hierarchy tree JSON for the ontology. (Search query classification + Alias generation)
+            predicted_class (str): The predicted class for the instance. (Alias generation)
+            desired_class (str): The class that the generated search query should relate to (Search query generation)
+            property_mappings_for_class (Dict[str, Any]): A mapping of properties and the datatype of those properties for a given class. (Search query generation)
+            all_generated_queries (List[str]): A list of all previously generated search queries to avoid duplicate search queries. (Search query generation)
+            current_class (str): The class in the hierarchy that the items have been classified as so far. (Hierarchical classification)
+            candidate_classes (List[str]): The direct subclasses of the current class to choose between. (Hierarchical classification)
+            items (List[Dict[str, str]]): The items to classify, each with an "id", "search_query" and "context_text". (Hierarchical classification)
+        """
+        input_text = self.render_prompt(
+                                        text=text,
+                                        search_query=search_query,
+                                        json_structure=json_structure,
+                                        class_hierarchy_tree=class_hierarchy_tree,
+                                        predicted_class=predicted_class,
+                                        desired_class=desired_class,
+                                        property_mappings_for_class=property_mappings_for_class,
+                                        all_generated_queries=all_generated_queries,
+                                        current_class=current_class,
+                                        candidate_classes=candidate_classes,
+                                        items=items
+                                        )
+        json_output = self.request_json(input_text, json_structure=json_structure, candidate_classes=candidate_classes)
+
+        # Single targeted retry, only asking for the invalid fields (or items)
+        invalid_fields = self.find_invalid_fields(
+                                                json_output, 
+                                                json_structure=json_structure, 
+                                                candidate_classes=candidate_classes, 
+                                                items=items
+                                                )
+        if self.retry_invalid_fields and (invalid_fields is None or len(invalid_fields) > 0):
+            with self.counter_lock:
+                self.num_field_retries += 1
+            if invalid_fields is None:
+                print(f"Retrying invalid answer for role '{self.role}'")
+                json_output = self.request_json(input_text, json_structure=json_structure, candidate_classes=candidate_classes)
+            elif self.role == "information_extraction":
+                print(f"Retrying invalid fields: {invalid_fields}")
+                retry_json_structure = {field: json_structure[field] for field in invalid_fields}
+                retry_input_text = self.render_prompt(text=text, json_structure=retry_json_structure)
+                retry_json_output = self.request_json(retry_input_text, json_structure=retry_json_structure)
+                if retry_json_output is not None:
+                    for field in invalid_fields:
+                        if field in retry_json_output:
+                            json_output[field] = retry_json_output[field]
+            elif self.role == "hierarchical_classification":
+                print(f"Retrying invalid items: {invalid_fields}")
+                retry_items = [item for item in items if item["id"] in invalid_fields]
+                retry_input_text = self.render_prompt(
+                                                    current_class=current_class, 
+                                                    candidate_classes=candidate_classes, 
+                                                    items=retry_items
+                                                    )
+                retry_json_output = self.request_json(retry_input_text, candidate_classes=candidate_classes)
+                if retry_json_output is not None and isinstance(retry_json_output.get("classes", None), dict):
+                    for item_id in invalid_fields:
+                        if item_id in retry_json_output["classes"]:
+                            json_output["classes"][item_id] = retry_json_output["classes"][item_id]
+
+        if json_output is None:
+            return None
+        json_output = self.postprocess_json(
+                                            json_output, 
+                                            json_structure=json_structure, 
+                                            candidate_classes=candidate_classes
+                                            )
+        return json_output
+
+def report_generator_stats() -> None:
+    """
+    Prints the counters for the answers that required repairing or a retry, summed over the
+    generators of each role.
+    """
+    stats_by_role = {}
+    with _GENERATORS_LOCK:
+        generators = list(GENERATORS)
+    for generator in generators:
+        role_stats = stats_by_role.setdefault(generator.role, {"repaired": 0, "field_retries": 0, "unparseable": 0})
+        for name, value in generator.get_stats().items():
+            role_stats[name] += value
+    for role, stats in stats_by_role.items():
+        print(
+            f"LLM role: {role} | Repaired answers: {stats['repaired']} | Field retries: {stats['field_retries']} | "
+            f"Unparseable answers: {stats['unparseable']}"
+            )
@@ -0,0 +1,187 @@
+import faiss
+import random
+import threading
+import numpy as np
+
+from typing import Dict, List, Tuple, Union, Any
+from sentence_transformers import SentenceTransformer
+
+class SemanticClassificationCache:
+
+    def __init__(
+                self,
+                classifier:Any,
+                st_model:SentenceTransformer=None,
+                similarity_threshold:float=0.95,
+                audit_rate:float=0.05,
+                max_context_chars:int=1000,
+                seed:int=42
+                ):
+        """
+        Semantic cache for search query classification, reusing the class of a previous decision when
+        the search query and page summary are near-duplicates of it (e.g., album reissues, "(song)" and
+        "(single)" variants or disambiguated duplicates), which exact-match caching misses.
+        - The search query and summary are embedded with the SentenceTransformer and looked up in a
+          FAISS inner product index of past decisions (cosine similarity, as the embeddings are normalised).
+        - The cached class is reused only when the similarity is at least the (strict) threshold.
+        - A sample of the reused decisions is audited by also calling the classifier, measuring how
+          often a reuse is wrong.
+
+        Args:
+            classifier (Any): The classifier to cache, i.e., an LLMTextGenerator with the role "search_query_classification"
+                              or a HierarchicalClassifier.
+            st_model (SentenceTransformer): The SentenceTransformer model used to embed the requests.
+            similarity_threshold (float): The minimum cosine similarity for a cached decision to be reused.
+            audit_rate (float): The fraction of reused decisions that are audited.
+            max_context_chars (int): The number of characters of the summary included in the embedded text.
+            seed (int): The seed for sampling the audited decisions.
+        """
+        self.classifier = classifier
+        self.st_model = st_model if st_model is not None else SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        self.similarity_threshold = similarity_threshold
+        self.audit_rate = audit_rate
+        self.max_context_chars = max_context_chars
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+        self.index = faiss.IndexFlatIP(self.st_model.get_sentence_embedding_dimension())
+        self.cached_classes = [] # The class of the decision at each position in the index
+
+        self.num_cache_hits = 0
+        self.num_cache_misses = 0
+        self.num_audits = 0
+        self.num_audit_mismatches = 0
+
+    def embed(self, items:List[Tuple[str, str]]) -> np.ndarray:
+        """
+        Embeds (search query, context text) pairs.
+
+        Args:
+            items (List[Tuple[str, str]]): The (search query, context text) pairs to embed.
+        """
+        texts = [f"{search_query}\n{text[:self.max_context_chars]}" for search_query, text in items]
+        return self.st_model.encode(texts, normalize_embeddings=True).astype(np.float32)
+
+    def lookup(self, embeddings:np.ndarray) -> List[Union[str, None]]:
+        """
+        Returns the cached class for each embedding, or None if there is no decision similar enough.
+
+        Args:
+            embeddings (np.ndarray): The normalised embeddings of the requests.
+        """
+        with self.lock:
+            if self.index.ntotal == 0:
+                return [None] * len(embeddings)
+            similarities, indices = self.index.search(embeddings, 1)
+            return [
+                    self.cached_classes[indices[i][0]] if similarities[i][0] >= self.similarity_threshold else None
+                    for i in range(len(embeddings))
+                    ]
+
+    def add(self, embedding:np.ndarray, predicted_class:str) -> None:
+        with self.lock:
+            self.index.add(embedding.reshape(1, -1))
+            self.cached_classes.append(predicted_class)
+
+    def audit(self, cached_class:str, json_output:Union[Dict[str, str], None]) -> None:
+        """
+        Records whether a fresh decision for an audited request matches the reused decision.
+
+        Args:
+            cached_class (str): The class that would have been reused.
+            json_output (Union[Dict[str, str], None]): The fresh decision from the classifier.
+        """
+        if json_output is None:
+            return
+        with self.lock:
+            self.num_audits += 1
+            if json_output["class"] != cached_class:
+                self.num_audit_mismatches += 1
+                print(f"Semantic cache audit mismatch | Cached: {cached_class} | Fresh: {json_output['class']}")
+
+    def should_audit(self) -> bool:
+        with self.lock:
+            return self.rng.random() < self.audit_rate
+
+    def execute(self, text:str, search_query:str, class_hierarchy_tree:str=None) -> Union[Dict[str, str], None]:
+        """
+        Classifies a search query, reusing the class of a near-duplicate previous decision if there is one.
+
+        Args:
+            text (str): The context text (i.e., the page summary).
+            search_query (str): The search query to classify.
+            class_hierarchy_tree (str): The string equivalent of the class hierarchy tree JSON for the ontology.
+        """
+        embedding = self.embed([(search_query, text)])
+        cached_class = self.lookup(embedding)[0]
+        if cached_class is not None:
+            with self.lock:
+                self.num_cache_hits += 1
+            if self.should_audit():
+                json_output = self.classifier.execute(text=text, search_query=search_query, class_hierarchy_tree=class_hierarchy_tree)
+                self.audit(cached_class=cached_class, json_output=json_output)
+                if json_output is not None:
+                    return json_output # Use the fresh decision, as it has been paid for
+            return {"class": cached_class}
+
+        with self.lock:
+            self.num_cache_misses += 1
+        json_output = self.classifier.execute(text=text, search_query=search_query, class_hierarchy_tree=class_hierarchy_tree)
+        if json_output is not None:
+            self.add(embedding[0], json_output["class"])
+        return json_output
+
+    def execute_batch(self, items:List[Tuple[str, str]]) -> List[Union[Dict[str, str], None]]:
+        """
+        Classifies a batch of (search query, context text) pairs, only sending the requests without a
+        near-duplicate previous decision (and the audited ones) to the classifier's execute_batch.
+
+        Args:
+            items (List[Tuple[str, str]]): The (search query, context text) pairs to classify.
+        """
+        if len(items) == 0:
+            return []
+        embeddings = self.embed(items)
+        cached_classes = self.lookup(embeddings)
+
+        results = [None] * len(items)
+        to_classify = []
+        for i, cached_class in enumerate(cached_classes):
+            if cached_class is None:
+                with self.lock:
+                    self.num_cache_misses += 1
+                to_classify.append(i)
+                continue
+            with self.lock:
+                self.num_cache_hits += 1
+            results[i] = {"class": cached_class}
+            if self.should_audit():
+                to_classify.append(i)
+
+        if len(to_classify) > 0:
+            json_outputs = self.classifier.execute_batch(items=[items[i] for i in to_classify])
+            for i, json_output in zip(to_classify, json_outputs):
+                if results[i] is not None: # Audited
+                    self.audit(cached_class=results[i]["class"], json_output=json_output)
+                    if json_output is not None:
+                        results[i] = json_output
+                elif json_output is not None:
+                    self.add(embeddings[i], json_output["class"])
+                    results[i] = json_output
+        return results
+
+    def get_audit_mismatch_rate(self) -> Union[float, None]:
+        """
+        Returns the fraction of audited reuses where the fresh decision differed (None if nothing was audited).
+        """
+        with self.lock:
+            if self.num_audits == 0:
+                return None
+            return self.num_audit_mismatches / self.num_audits
+
+    def report(self) -> None:
+        mismatch_rate = self.get_audit_mismatch_rate()
+        print(
+            f"Semantic cache | Hits: {self.num_cache_hits} | Misses: {self.num_cache_misses} | "
+            f"Audits: {self.num_audits} | Audit mismatch rate: {'N/A' if mismatch_rate is None else f'{mismatch_rate:.3f}'}"
+            )
@@ -0,0 +1,265 @@
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List
+
+def _stable_index(key:str, num_options:int) -> int:
+    """
+    Deterministically maps a key to an index in the range [0, num_options).
+
+    Args:
+        key (str): The key to map.
+        num_options (int): The number of options to choose between.
+    """
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return int(digest, 16) % num_options
+
+def _find_block(label:str, prompt:str) -> str:
+    """
+    Finds the text within the triple quotes following a label in a user prompt,
+    e.g., 'Search query: \"\"\"Mozart\"\"\"' -> 'Mozart'.
+
+    Args:
+        label (str): The label preceding the quoted block, e.g., "Search query".
+        prompt (str): The user prompt to search.
+    """
+    match = re.search(rf'{label}:\s*"""(.*?)"""', prompt, flags=re.DOTALL)
+    if match is None:
+        return ""
+    return match.group(1).strip()
+
+def _find_bullet_fields(prompt:str) -> List[str]:
+    """
+    Finds the field names listed as bullet points (e.g., "- hasName") in a user prompt.
+
+    Args:
+        prompt (str): The user prompt to search.
+    """
+    return re.findall(r"^\s*- (\w+)\s*$", prompt, flags=re.MULTILINE)
+
+def _find_class_paths(subtree:Dict[str, Any], node_path:str="Thing") -> List[str]:
+    """
+    Collects all class paths from a class hierarchy tree.
+
+    Args:
+        subtree (Dict[str, Any]): The (sub)tree to collect the class paths from.
+        node_path (str): The path of the root of the subtree.
+    """
+    paths = []
+    for child_name, child_subtree in subtree.items():
+        if child_name == "Thing":
+            continue
+        child_path = f"{node_path}.{child_name}"
+        paths.append(child_path)
+        paths.extend(_find_class_paths(child_subtree, child_path))
+    return paths
+
+def synthesise_response(role:str, user_prompt:str) -> str:
+    """
+    Deterministically creates a well-formed completion for a user prompt of the given role,
+    without calling a model. The same prompt always produces the same completion, which makes
+    offline runs of the ingestion pipeline reproducible.
+
+    Args:
+        role (str): The role of the LLMTextGenerator that rendered the prompt.
+        user_prompt (str): The rendered user prompt.
+    """
+    text = _find_block("Sample text", user_prompt) or _find_block("Context text", user_prompt)
+    first_sentence = text.split(". ")[0].strip() if text else "None"
+
+    if role == "search_query_classification":
+        search_query = _find_block("Search query", user_prompt)
+        try:
+            class_hierarchy_tree = json.loads(_find_block("Class hierarchy", user_prompt))
+            options = _find_class_paths(class_hierarchy_tree) + ["Other"]
+        except json.JSONDecodeError:
+            options = ["Other"]
+        json_output = {"class": options[_stable_index(search_query, len(options))]}
+
+    elif role == "hierarchical_classification":
+        current_class = _find_block("Current class", user_prompt)
+        candidate_classes = re.findall(r"^\s*- (\S+)\s*$", _find_block("Candidate subclasses", user_prompt), flags=re.MULTILINE)
+        options = candidate_classes + ["None"]
+        try:
+            items = json.loads(_find_block("Items", user_prompt))
+        except json.JSONDecodeError:
+            items = []
+        json_output = {
+                    "classes": {
+                                item["id"]: options[_stable_index(f"{current_class}|{item['search_query']}", len(options))]
+                                for item in items
+                                }
+                    }
+
+    elif role == "information_extraction":
+        json_output = {field: "None" for field in _find_bullet_fields(user_prompt)}
+        if "hasName" in json_output:
+            json_output["hasName"] = " ".join(first_sentence.split()[:5])
+        if "hasDescription" in json_output:
+            json_output["hasDescription"] = first_sentence
+
+    elif role == "alias_generation":
+        json_output = {"alias": _find_block("Search query", user_prompt)}
+
+    elif role == "search_query_generation":
+        desired_class = _find_block("Desired class", user_prompt)
+        all_generated_queries = _find_block("All generated queries", user_prompt)
+        num_generated = len(re.findall(r"'[^']*'|\"[^\"]*\"", all_generated_queries))
+        json_output = {"search_query": f"{desired_class.split('.')[-1]} {num_generated}"}
+
+    elif role == "time_interval_generation":
+        years = re.findall(r"\b(1[0-9]{3}|20[0-9]{2})\b", text)
+        time_intervals = {}
+        if years:
+            interval = {field: "None" for field in _find_bullet_fields(user_prompt)}
+            interval["hasStartTime"] = years[0]
+            interval["hasEndTime"] = years[-1]
+            interval["hasIntervalDate"] = f"{years[0]}-{years[-1]}"
+            interval["hasDescription"] = first_sentence
+            time_intervals[f"{' '.join(first_sentence.split()[:3])} time interval"] = interval
+        json_output = {"time_intervals": time_intervals}
+
+    else:
+        json_output = {}
+    return json.dumps(json_output, ensure_ascii=False)
+
+def make_malformed(generated_text:str, rng:random.Random) -> str:
+    """
+    Corrupts a JSON completion in one of the ways that models commonly do, e.g.,
+    wrapping it in a code fence, adding a trailing comma or truncating it.
+
+    Args:
+        generated_text (str): The well-formed JSON completion.
+        rng (random.Random): The random number generator used to choose the corruption.
+    """
+    corruption = rng.choice(["code_fence", "trailing_comma", "truncated", "commentary"])
+    if corruption == "code_fence":
+        return f"```json\n{generated_text}\n```"
+    elif corruption == "trailing_comma":
+        return re.sub(r"\}\s*$", ",}", generated_text)
+    elif corruption == "truncated":
+        return generated_text[:max(1, len(generated_text) // 2)]
+    return f"Sure! Here is the JSON object:\n{generated_text}"
+
+class StandInServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(
+                self,
+                server_address:tuple,
+                latency_mean:float=0.5,
+                latency_jitter:float=0.2,
+                requests_per_second:float=None,
+                malformed_rate:float=0.0,
+                seed:int=42,
+                ):
+        """
+        Local HTTP server that stands in for the LLM provider, used to load test and benchmark
+        the ingestion pipeline without network access.
+        - Responds to POST /v1/generate with {"content": <completion>} using deterministic completions.
+        - Simulates latency, rate limits (429 with a Retry-After header) and malformed JSON.
+        - GET /v1/stats returns the counters for the requests served so far.
+
+        Args:
+            server_address (tuple): The (host, port) to listen on.
+            latency_mean (float): The mean simulated latency of a completion in seconds.
+            latency_jitter (float): The maximum deviation from the mean latency in seconds.
+            requests_per_second (float): The simulated rate limit, None for no rate limit.
+            malformed_rate (float): The fraction of completions that are returned as malformed JSON.
+            seed (int): The seed for the simulated latency and malformed completions.
+        """
+        super().__init__(server_address, StandInRequestHandler)
+        self.latency_mean = latency_mean
+        self.latency_jitter = latency_jitter
+        self.requests_per_second = requests_per_second
+        self.malformed_rate = malformed_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+        self.tokens = requests_per_second if requests_per_second is not None else 0.0
+        self.last_refill = time.monotonic()
+        self.stats = {"requests": 0, "completions": 0, "throttled": 0, "malformed": 0}
+
+    def try_acquire(self) -> float:
+        """
+        Attempts to take a request slot from the simulated rate limit.
+        Returns 0 if the request may proceed, otherwise the number of seconds until a slot is free.
+        """
+        if self.requests_per_second is None:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                            self.requests_per_second,
+                            self.tokens + (now - self.last_refill) * self.requests_per_second
+                            )
+            self.last_refill = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.requests_per_second
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format:str, *args):
+        pass # Avoid printing a line per request
+
+    def send_json(self, status:int, body:Dict[str, Any], headers:Dict[str, str]=None):
+        encoded = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self):
+        if self.path != "/v1/stats":
+            self.send_json(404, {"error": "Not found"})
+            return
+        with self.server.lock:
+            stats = dict(self.server.stats)
+        self.send_json(200, stats)
+
+    def do_POST(self):
+        if self.path != "/v1/generate":
+            self.send_json(404, {"error": "Not found"})
+            return
+        content_length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(content_length))
+        except json.JSONDecodeError:
+            self.send_json(400, {"error": "Request body must be valid JSON"})
+            return
+
+        with self.server.lock:
+            self.server.stats["requests"] += 1
+
+        retry_after = self.server.try_acquire()
+        if retry_after > 0:
+            with self.server.lock:
+                self.server.stats["throttled"] += 1
+            self.send_json(429, {"error": "Rate limit exceeded"}, headers={"Retry-After": f"{retry_after:.3f}"})
+            return
+
+        with self.server.lock:
+            latency = self.server.latency_mean + self.server.rng.uniform(-self.server.latency_jitter, self.server.latency_jitter)
+            # Structured output (a JSON schema response format) is always well-formed
+            is_malformed = request.get("response_format") is None and self.server.rng.random() < self.server.malformed_rate
+        time.sleep(max(0.0, latency))
+
+        generated_text = synthesise_response(role=request.get("role", ""), user_prompt=request.get("user", ""))
+        if is_malformed:
+            with self.server.lock:
+                generated_text = make_malformed(generated_text, rng=self.server.rng)
+
+        with self.server.lock:
+            self.server.stats["completions"] += 1
+            self.server.stats["malformed"] += int(is_malformed)
+        self.send_json(200, {"content": generated_text})
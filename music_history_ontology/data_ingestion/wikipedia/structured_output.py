@@ -0,0 +1,89 @@
+from typing import Dict, Any, List
+from music_history_ontology.data_ingestion.wikipedia.constants import CLASSES
+
+def build_object_schema(fields:List[str]) -> Dict[str, Any]:
+    """
+    Builds the JSON schema for an object with the given string fields (missing values are "None").
+
+    Args:
+        fields (List[str]): The names of the fields.
+    """
+    return {
+            "type": "object",
+            "properties": {field: {"type": "string"} for field in fields},
+            "required": list(fields),
+            "additionalProperties": False,
+            }
+
+def build_json_schema(
+                    role:str,
+                    json_structure:Dict[str, Any]=None,
+                    candidate_classes:List[str]=None,
+                    ) -> Dict[str, Any]:
+    """
+    Builds the JSON schema that the output of the given role must follow, mirroring the
+    expectations checked in LLMTextGenerator.postprocess_json.
+
+    Args:
+        role (str): The role of the LLMTextGenerator.
+        json_structure (Dict[str, Any]): The JSON fields to extract, i.e., the fields in CLASSES_TO_JSON_FIELDS for the class. (Information extraction + Time interval generation)
+        candidate_classes (List[str]): The candidate subclasses. (Hierarchical classification)
+    """
+    if role == "search_query_classification":
+        return {
+                "type": "object",
+                "properties": {"class": {"type": "string", "enum": CLASSES}}, # Includes "Other"
+                "required": ["class"],
+                "additionalProperties": False,
+                }
+    elif role == "information_extraction":
+        return build_object_schema(list(json_structure.keys()))
+    elif role == "alias_generation":
+        return build_object_schema(["alias"])
+    elif role == "search_query_generation":
+        return build_object_schema(["search_query"])
+    elif role == "time_interval_generation":
+        # Keyed by the alias of each time interval
+        return {
+                "type": "object",
+                "properties": {
+                            "time_intervals": {
+                                                "type": "object",
+                                                "additionalProperties": build_object_schema(list(json_structure.keys()))
+                                                }
+                            },
+                "required": ["time_intervals"],
+                }
+    elif role == "hierarchical_classification":
+        # Keyed by the item number
+        return {
+                "type": "object",
+                "properties": {
+                            "classes": {
+                                        "type": "object",
+                                        "additionalProperties": {"type": "string", "enum": candidate_classes + ["None"]}
+                                        }
+                            },
+                "required": ["classes"],
+                }
+    raise ValueError(f"Role '{role}' is not supported.")
+
+def build_response_format(role:str, **kwargs:Any) -> Dict[str, Any]:
+    """
+    Builds the response format requesting a JSON schema response from the backend.
+    - Strict mode is only used for schemas without dynamic keys, as strict mode requires
+      every property to be listed.
+
+    Args:
+        role (str): The role of the LLMTextGenerator.
+        kwargs: Keyword arguments for build_json_schema.
+    """
+    schema = build_json_schema(role=role, **kwargs)
+    return {
+            "type": "json_schema",
+            "json_schema": {
+                            "name": f"{role}_output",
+                            "schema": schema,
+                            "strict": role not in ("time_interval_generation", "hierarchical_classification"),
+                            }
+            }
@@ -1,18 +1,29 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 from slugify import slugify
-from copy import deepcopy
 
+from music_history_ontology.data_ingestion.object_properties import ObjectPropertyLinks
 from music_history_ontology.data_ingestion.wikipedia.instance import DataInstance
 from music_history_ontology.data_ingestion.wikipedia.llm import LLMTextGenerator
+from music_history_ontology.data_ingestion.wikipedia.chunked_extraction import ChunkedExtractor
 from music_history_ontology.data_ingestion.wikipedia.constants import CLASSES_TO_JSON_FIELDS, CLASS_PROPERTY_MAPPINGS
 
 class TimeIntervalInstanceGenerator:
 
-    def __init__(self, class_property_mappings):
+    def __init__(self, class_property_mappings, use_full_article:bool=False, page_token_budget:int=6000):
+        """
+        Args:
+            class_property_mappings (Dict[str, Any]): A mapping of classes to their properties and data types.
+            use_full_article (bool): Whether to generate the time intervals from the full article text (in chunks)
+                                     rather than only the page summary.
+            page_token_budget (int): The maximum number of tokens used per page when using the full article.
+        """
         self.ti_obj_props = self.find_time_interval_object_properties(
                                                         class_property_mappings=class_property_mappings
                                                         )
         self.llm = LLMTextGenerator(role="time_interval_generation")
+        self.chunked_extractor = None
+        if use_full_article:
+            self.chunked_extractor = ChunkedExtractor(llm=self.llm, page_token_budget=page_token_budget)
 
     def find_time_interval_object_properties(self, class_property_mappings:Dict[str, Any]) -> set[str]:
         """
@@ -38,7 +49,7 @@ class TimeIntervalInstanceGenerator:
         # print(time_interval_obj_props)
         return time_interval_obj_props
     
-    def execute(self, data_instance:DataInstance, page_summary:str) -> List[DataInstance]:
+    def execute(self, data_instance:DataInstance, page_summary:str, page_content:Union[str, None]=None) -> List[DataInstance]:
         """
         Generates instances of the class "Thing.TimeInterval" for the given data instance
         when the data instance has an object property that maps to the class "Thing.TimeInterval".
@@ -48,6 +59,7 @@ class TimeIntervalInstanceGenerator:
         Args:
             data_instance (DataInstance): The data instance for which to generate time interval instances.
             page_summary (str): The summary of the Wikipedia page for the data instance.
+            page_content (Union[str, None]): The full text of the Wikipedia page (only used when using the full article).
         """
         data_instance_information = data_instance.json_data
         data_instance_obj_props = data_instance_information["object_properties"]
@@ -56,8 +68,7 @@ class TimeIntervalInstanceGenerator:
         ti_class_json_structure = CLASSES_TO_JSON_FIELDS["Thing.TimeInterval"]
 
         all_generated_ti_instances = [] # List of all generated time interval instances
-        for obj_prop, obj_prop_info_dict in data_instance_obj_props.items():
-            # print(obj_prop, obj_prop_info_dict.keys())
+        for obj_prop in list(data_instance_obj_props.keys()):
 
             # Not a time interval object property
             if obj_prop not in self.ti_obj_props:
@@ -65,10 +76,17 @@ class TimeIntervalInstanceGenerator:
 
             print(f"Creating instance of the class 'Thing.TimeInterval' for property: {obj_prop}")
 
-            extracted_info_json = self.llm.execute(
-                                                    text=page_summary,
-                                                    json_structure=ti_class_json_structure,
-                                                    )
+            if self.chunked_extractor is not None:
+                extracted_info_json = self.chunked_extractor.execute(
+                                                                    summary=page_summary,
+                                                                    content=page_content,
+                                                                    json_structure=ti_class_json_structure
+                                                                    )
+            else:
+                extracted_info_json = self.llm.execute(
+                                                        text=page_summary,
+                                                        json_structure=ti_class_json_structure,
+                                                        )
             print("JSON Answer", extracted_info_json)
             if extracted_info_json is None:
                 print("Failed to extract time interval information.")
@@ -84,8 +102,8 @@ class TimeIntervalInstanceGenerator:
                 # print(generated_alias, slugify_alias)
 
                 # Add the subject data instance's ID to the inverse object property
-                ti_obj_props = deepcopy(CLASS_PROPERTY_MAPPINGS["Thing.TimeInterval"]["object_properties"])
-                ti_obj_props["isTimeIntervalOf"]["ids"].append(data_instance.id)
+                ti_obj_props = ObjectPropertyLinks(schema=CLASS_PROPERTY_MAPPINGS["Thing.TimeInterval"]["object_properties"])
+                ti_obj_props.add("isTimeIntervalOf", data_instance.id)
                 # print(ti_obj_props)
 
                 ti_json_data = {
@@ -97,14 +115,13 @@ class TimeIntervalInstanceGenerator:
                                             predicted_class="Thing.TimeInterval",
                                             search_query=slugify_alias,
                                             alias=slugify_alias,
-                                            json_data=ti_json_data
+                                            json_data=ti_json_data,
+                                            source_key=f"{data_instance.id}/{slugify_alias}" # Deterministic, unique per subject instance
                                             )
                 all_generated_ti_instances.append(ti_data_instance)
 
                 # Link this time interval instance to the subject data instance
-                # print(data_instance.json_data["object_properties"][obj_prop]["ids"])
-                data_instance.json_data["object_properties"][obj_prop]["ids"].append(ti_data_instance.id)
-                # print(data_instance.json_data["object_properties"][obj_prop]["ids"])
+                data_instance.json_data["object_properties"].add(obj_prop, ti_data_instance.id)
                 # print()
 
         print(f"Num time interval instances created: {len(all_generated_ti_instances)}")
@@ -0,0 +1,347 @@
+import os
+import time
+import sqlite3
+import threading
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple, Union
+from music_history_ontology.data_ingestion.wikipedia.instance import DataInstance
+
+class WorkQueue:
+    """
+    The frontier of search queries for the Wikipedia crawl, shared by the workers of a crawl.
+    - Workers lease search queries and complete them once extraction has finished, so that the
+      search queries leased by a worker that crashed are given to another worker when the lease expires.
+    - Claims on keys (e.g., a page being processed) expire like leases, so that the keys claimed by a worker that
+      crashed can be claimed by another worker.
+    - The seen-set records the keys that are done for good (e.g., the pages whose search query was completed).
+    - Aliases are assigned to their sources for good, so that every worker (and later run) assigns the same alias
+      to a source.
+    """
+    name = None
+
+    def add(self, data_instances:List[DataInstance]) -> int:
+        """
+        Adds search queries to the frontier, ignoring (search query, class) pairs that were already added.
+        Returns the number of search queries added.
+
+        Args:
+            data_instances (List[DataInstance]): The data instances with the search query and predicted class set.
+        """
+        raise NotImplementedError
+
+    def lease(self, worker_id:str) -> Union[Tuple[int, DataInstance], Tuple[None, None]]:
+        """
+        Leases the next search query in the frontier, returning its ID and data instance (None for both if there are none).
+
+        Args:
+            worker_id (str): The ID of the worker leasing the search query.
+        """
+        raise NotImplementedError
+
+    def complete(self, item_id:int, worker_id:str, is_retrieved:bool, seen_keys:Iterable[str]=()) -> bool:
+        """
+        Marks a search query leased by a worker as completed, adding keys to the seen-set at the same time.
+        Returns False if the worker no longer holds the lease (e.g., it expired and the search query was leased again).
+
+        Args:
+            item_id (int): The ID of the search query returned by lease.
+            worker_id (str): The ID of the worker that leased the search query.
+            is_retrieved (bool): Whether a data instance was retrieved for the search query.
+            seen_keys (Iterable[str]): The keys to add to the seen-set, e.g., the page of the search query.
+        """
+        raise NotImplementedError
+
+    def claim(self, key:str, owner:str) -> bool:
+        """
+        Claims a key for an owner, returning True if the key was not claimed or its claim by another owner
+        has expired (or the owner already holds it).
+
+        Args:
+            key (str): The key, e.g., the ID of the data instance for a page.
+            owner (str): The owner of the claim, e.g., the worker and the search query processing the page.
+        """
+        raise NotImplementedError
+
+    def mark_seen(self, key:str) -> bool:
+        """
+        Adds a key to the seen-set, returning True if it was not seen before (i.e., the caller claimed it).
+
+        Args:
+            key (str): The key, e.g., the ID of the data instance for a page.
+        """
+        raise NotImplementedError
+
+    def is_seen(self, key:str) -> bool:
+        raise NotImplementedError
+
+    def claim_alias(self, alias:str, source_key:str) -> bool:
+        """
+        Assigns an alias to a source, returning True if the alias was not assigned or is already assigned to the source.
+
+        Args:
+            alias (str): The alias.
+            source_key (str): The key identifying the source of the alias (see AliasRegistry).
+        """
+        raise NotImplementedError
+
+    def get_alias(self, source_key:str) -> Union[str, None]:
+        """
+        Returns the alias assigned to a source (None if there is none).
+
+        Args:
+            source_key (str): The key identifying the source of the alias.
+        """
+        raise NotImplementedError
+
+    def release_expired(self) -> None:
+        """
+        Returns the search queries with expired leases to the frontier, so that waiting workers
+        can take over the search queries of a worker that crashed.
+        """
+        pass
+
+    def get_counts(self) -> Dict[str, int]:
+        """
+        Returns the number of search queries that are pending, leased and done, and the number of data instances retrieved.
+        """
+        raise NotImplementedError
+
+class MemoryWorkQueue(WorkQueue):
+    name = "memory"
+
+    def __init__(self):
+        """
+        Work queue for a single process, kept in memory.
+        """
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.added = set()
+        self.leased = {}
+        self.seen = set()
+        self.claims = {}
+        self.alias_to_source = {}
+        self.source_to_alias = {}
+        self.next_id = 0
+        self.num_done = 0
+        self.num_retrieved = 0
+
+    def add(self, data_instances:List[DataInstance]) -> int:
+        num_added = 0
+        with self.lock:
+            for data_instance in data_instances:
+                key = (data_instance.search_query, data_instance.predicted_class)
+                if key in self.added:
+                    continue
+                self.added.add(key)
+                self.pending.append((self.next_id, data_instance))
+                self.next_id += 1
+                num_added += 1
+        return num_added
+
+    def lease(self, worker_id:str) -> Union[Tuple[int, DataInstance], Tuple[None, None]]:
+        with self.lock:
+            if len(self.pending) == 0:
+                return None, None
+            item_id, data_instance = self.pending.popleft()
+            self.leased[item_id] = worker_id
+            return item_id, data_instance
+
+    def complete(self, item_id:int, worker_id:str, is_retrieved:bool, seen_keys:Iterable[str]=()) -> bool:
+        with self.lock:
+            self.seen.update(seen_keys)
+            if self.leased.get(item_id) != worker_id:
+                return False
+            del self.leased[item_id]
+            self.num_done += 1
+            self.num_retrieved += int(is_retrieved)
+            return True
+
+    def claim(self, key:str, owner:str) -> bool:
+        with self.lock: # Claims do not expire, as all of the workers are in this process
+            return self.claims.setdefault(key, owner) == owner
+
+    def mark_seen(self, key:str) -> bool:
+        with self.lock:
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+            return True
+
+    def is_seen(self, key:str) -> bool:
+        with self.lock:
+            return key in self.seen
+
+    def claim_alias(self, alias:str, source_key:str) -> bool:
+        with self.lock:
+            if self.alias_to_source.setdefault(alias, source_key) != source_key:
+                return False
+            self.source_to_alias.setdefault(source_key, alias)
+            return True
+
+    def get_alias(self, source_key:str) -> Union[str, None]:
+        with self.lock:
+            return self.source_to_alias.get(source_key, None)
+
+    def get_counts(self) -> Dict[str, int]:
+        with self.lock:
+            return {"pending": len(self.pending), "leased": len(self.leased), "done": self.num_done, "retrieved": self.num_retrieved}
+
+class SQLiteWorkQueue(WorkQueue):
+    name = "sqlite"
+
+    def __init__(self, db_path:str="generated_data/wikipedia/work_queue.db", lease_seconds:float=600.0, max_attempts:int=3):
+        """
+        Work queue shared by the worker processes on a node, stored in SQLite in WAL mode (so that
+        reads do not block the writer).
+        - Leasing is a single IMMEDIATE transaction, so a search query is only leased by one worker.
+        - Expired leases (e.g., from a worker that crashed) are returned to the frontier when leasing,
+          up to max_attempts times.
+        - Claims on keys expire after the same number of seconds as leases.
+
+        Args:
+            db_path (str): The path to the SQLite database.
+            lease_seconds (float): The number of seconds after which a lease (or a claim) expires.
+            max_attempts (int): The maximum number of times a search query is leased.
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.thread_local = threading.local() # SQLite connections cannot be shared by threads
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+
+        connection = self.get_connection()
+        with connection:
+            connection.execute(
+                            """
+                            CREATE TABLE IF NOT EXISTS frontier (
+                                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                search_query TEXT NOT NULL,
+                                predicted_class TEXT NOT NULL,
+                                status TEXT NOT NULL DEFAULT 'pending',
+                                worker_id TEXT,
+                                lease_expires REAL,
+                                attempts INTEGER NOT NULL DEFAULT 0,
+                                retrieved INTEGER NOT NULL DEFAULT 0,
+                                UNIQUE (search_query, predicted_class)
+                            )
+                            """
+                            )
+            connection.execute("CREATE INDEX IF NOT EXISTS frontier_status ON frontier (status, id)")
+            connection.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY)")
+            connection.execute("CREATE TABLE IF NOT EXISTS claims (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, source_key TEXT NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS aliases_source_key ON aliases (source_key)")
+
+    def get_connection(self) -> sqlite3.Connection:
+        connection = getattr(self.thread_local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=60.0, isolation_level=None) # Transactions are managed explicitly
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.thread_local.connection = connection
+        return connection
+
+    def add(self, data_instances:List[DataInstance]) -> int:
+        connection = self.get_connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.executemany(
+                                            "INSERT OR IGNORE INTO frontier (search_query, predicted_class) VALUES (?, ?)",
+                                            [(data_instance.search_query, data_instance.predicted_class) for data_instance in data_instances]
+                                            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def lease(self, worker_id:str) -> Union[Tuple[int, DataInstance], Tuple[None, None]]:
+        connection = self.get_connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE") # Takes the write lock, so no other worker can lease the same row
+        try:
+            self.release_expired(connection=connection, now=now)
+            row = connection.execute(
+                                    "SELECT id, search_query, predicted_class FROM frontier WHERE status = 'pending' ORDER BY id LIMIT 1"
+                                    ).fetchone()
+            if row is not None:
+                connection.execute(
+                                "UPDATE frontier SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                                (worker_id, now + self.lease_seconds, row[0])
+                                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None, None
+        item_id, search_query, predicted_class = row
+        return item_id, DataInstance(predicted_class=predicted_class, search_query=search_query)
+
+    def complete(self, item_id:int, worker_id:str, is_retrieved:bool, seen_keys:Iterable[str]=()) -> bool:
+        connection = self.get_connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.execute(
+                                        "UPDATE frontier SET status = 'done', retrieved = ?, lease_expires = NULL "
+                                        "WHERE id = ? AND status = 'leased' AND worker_id = ?",
+                                        (int(is_retrieved), item_id, worker_id)
+                                        )
+            connection.executemany("INSERT OR IGNORE INTO seen (key) VALUES (?)", [(key,) for key in seen_keys])
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def claim(self, key:str, owner:str) -> bool:
+        now = time.time()
+        cursor = self.get_connection().execute(
+                                            "INSERT INTO claims (key, owner, expires) VALUES (?, ?, ?) "
+                                            "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+                                            "WHERE claims.owner = excluded.owner OR claims.expires < ?",
+                                            (key, owner, now + self.lease_seconds, now)
+                                            )
+        return cursor.rowcount == 1
+
+    def release_expired(self, connection:sqlite3.Connection=None, now:float=None) -> None:
+        # Return expired leases to the frontier (or give up on them after max_attempts)
+        connection = connection or self.get_connection()
+        connection.execute(
+                        "UPDATE frontier SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, worker_id = NULL "
+                        "WHERE status = 'leased' AND lease_expires < ?",
+                        (self.max_attempts, time.time() if now is None else now)
+                        )
+
+    def mark_seen(self, key:str) -> bool:
+        cursor = self.get_connection().execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (key,))
+        return cursor.rowcount == 1
+
+    def is_seen(self, key:str) -> bool:
+        return self.get_connection().execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone() is not None
+
+    def claim_alias(self, alias:str, source_key:str) -> bool:
+        connection = self.get_connection()
+        connection.execute("INSERT OR IGNORE INTO aliases (alias, source_key) VALUES (?, ?)", (alias, source_key))
+        row = connection.execute("SELECT source_key FROM aliases WHERE alias = ?", (alias,)).fetchone()
+        return row[0] == source_key
+
+    def get_alias(self, source_key:str) -> Union[str, None]:
+        row = self.get_connection().execute(
+                                            "SELECT alias FROM aliases WHERE source_key = ? ORDER BY rowid LIMIT 1", (source_key,)
+                                            ).fetchone()
+        return None if row is None else row[0]
+
+    def get_counts(self) -> Dict[str, int]:
+        connection = self.get_connection()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for status, count in connection.execute("SELECT status, COUNT(*) FROM frontier GROUP BY status"):
+            counts[status] = count
+        counts["retrieved"] = connection.execute("SELECT COALESCE(SUM(retrieved), 0) FROM frontier").fetchone()[0]
+        return counts
+
+WORK_QUEUES = {
+                MemoryWorkQueue.name: MemoryWorkQueue,
+                SQLiteWorkQueue.name: SQLiteWorkQueue,
+                }
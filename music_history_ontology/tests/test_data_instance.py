@@ -0,0 +1,68 @@
+import io
+import json
+from music_history_ontology.data_ingestion.object_properties import ObjectPropertyLinks
+from music_history_ontology.data_ingestion.wikipedia.instance import DataInstance, create_instance_id, write_class_data
+
+def create_musician(name:str="Wolfgang Amadeus Mozart") -> DataInstance:
+    return DataInstance(
+                        predicted_class="Thing.MusicArtist.Musician",
+                        search_query="mozart",
+                        alias="wolfgang-amadeus-mozart-musician",
+                        json_data={
+                                "object_properties": {"associatedWith": {"ids": ["a"]}},
+                                "data_properties": {"hasName": name, "hasBirthDate": "1756", "hasNote": None}
+                                },
+                        source_key=name
+                        )
+
+def test_deterministic_ids():
+    assert create_musician().id == create_musician().id
+    assert create_musician().id == create_instance_id("wikipedia", "Wolfgang Amadeus Mozart", "Thing.MusicArtist.Musician")
+    assert create_musician().id != create_musician("Joseph Haydn").id
+    assert DataInstance(predicted_class="Thing.Release.Album", search_query="thriller").id == DataInstance(predicted_class="Thing.Release.Album", search_query="thriller").id
+    assert DataInstance().id != DataInstance().id # No key, so a random ID is used
+
+def test_slots():
+    assert not hasattr(create_musician(), "__dict__")
+
+def test_write_json_matches_convert_to_json():
+    data_instances = [create_musician(), create_musician("Clara \"Schumann\" ü"), DataInstance(predicted_class="Thing.Release.Album", search_query="thriller")]
+    for data_instance in data_instances:
+        stream = io.StringIO()
+        data_instance.write_json(stream)
+        assert json.loads(stream.getvalue()) == data_instance.convert_to_json()
+
+    stream = io.StringIO()
+    write_class_data(class_name="Thing.MusicArtist.Musician", data_instances=data_instances, stream=stream)
+    assert json.loads(stream.getvalue()) == {
+                                            "class_name": "Thing.MusicArtist.Musician",
+                                            "data": [data_instance.convert_to_json() for data_instance in data_instances]
+                                            }
+
+    stream = io.StringIO()
+    write_class_data(class_name="Thing.Release.Album", data_instances=[], stream=stream)
+    assert json.loads(stream.getvalue()) == {"class_name": "Thing.Release.Album", "data": []}
+
+def test_object_property_links():
+    schema = {
+            "associatedWith": {"range_names": ["Thing.Agent.Person"], "property_uri": "http://example.org/associatedWith", "ids": []},
+            "hasGenre": {"range_names": ["Thing.MusicGenre"], "ids": []}
+            }
+    links = ObjectPropertyLinks(schema=schema)
+    links.add("hasGenre", "a")
+    links.add("hasGenre", "b")
+    assert links.get_ids("hasGenre") == ["a", "b"]
+    assert links.materialize() == {
+                                "associatedWith": {"range_names": ["Thing.Agent.Person"], "property_uri": "http://example.org/associatedWith", "ids": []},
+                                "hasGenre": {"range_names": ["Thing.MusicGenre"], "ids": ["a", "b"]}
+                                }
+    assert schema["hasGenre"]["ids"] == [] # The shared schema is not modified
+
+    stream = io.StringIO()
+    links.write_json(stream)
+    assert json.loads(stream.getvalue()) == links.materialize()
+
+    data_instance = DataInstance(predicted_class="Thing.MusicArtist.Musician", search_query="mozart", json_data={"object_properties": links, "data_properties": {}})
+    stream = io.StringIO()
+    data_instance.write_json(stream)
+    assert json.loads(stream.getvalue()) == data_instance.convert_to_json()
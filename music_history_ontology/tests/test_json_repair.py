@@ -0,0 +1,33 @@
+from music_history_ontology.data_ingestion.wikipedia.json_repair import repair_json
+
+def test_repair_valid_json():
+    assert repair_json('{"alias": "mozart"}') == {"alias": "mozart"}
+
+def test_repair_code_fence():
+    assert repair_json('```json\n{"alias": "mozart"}\n```') == {"alias": "mozart"}
+
+def test_repair_commentary_and_trailing_comma():
+    generated_text = 'Sure! Here is the JSON object:\n{"hasName": "Mozart", "hasNote": ["a", "b",],}\nHope this helps {:)}'
+    assert repair_json(generated_text) == {"hasName": "Mozart", "hasNote": ["a", "b"]}
+
+def test_repair_truncated_keeps_complete_fields():
+    assert repair_json('{"hasName": "Mozart", "hasBirthDate": "1756", "hasDeathDate":') == {"hasName": "Mozart", "hasBirthDate": "1756"}
+    assert repair_json('{"hasName": "Mozart", "hasBirthDate": "1756"') == {"hasName": "Mozart", "hasBirthDate": "1756"}
+
+def test_repair_truncated_drops_incomplete_values():
+    # Values cut off part-way through are dropped, rather than kept as (wrong) data
+    assert repair_json('{"time_intervals": {"a": {"hasStartTime": "1756"}, "b": {"hasStartTime": "17') == {
+                                                                                                        "time_intervals": {
+                                                                                                                        "a": {"hasStartTime": "1756"}
+                                                                                                                        }
+                                                                                                        }
+    assert repair_json('{"hasName": "Mozart", "hasBirthYear": 17') == {"hasName": "Mozart"}
+    assert repair_json('{"hasName": "Moz') == {}
+    assert repair_json('{"hasGenre": ["Classical", "Ope') == {"hasGenre": ["Classical"]}
+
+def test_repair_braces_inside_strings():
+    assert repair_json('{"hasDescription": "uses } and {", "hasName') == {"hasDescription": "uses } and {"}
+
+def test_repair_unrecoverable():
+    assert repair_json("I could not find any information.") is None
+    assert repair_json("[1, 2]") is None
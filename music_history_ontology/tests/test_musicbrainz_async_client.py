@@ -0,0 +1,38 @@
+import time
+import asyncio
+from music_history_ontology.data_ingestion.musicbrainz.async_client import AsyncMusicBrainzClient
+from music_history_ontology.data_ingestion.musicbrainz.stub_server import MusicBrainzStubServer
+from music_history_ontology.data_ingestion.resilience import AsyncTokenBucket
+
+def test_coalescing_and_rate_limit():
+    server = MusicBrainzStubServer(latency=0.05)
+    server.start()
+
+    async def run():
+        async with AsyncMusicBrainzClient(base_url=server.base_url, rate_limiter=AsyncTokenBucket(rate=10.0)) as client:
+            responses = await asyncio.gather(*[client.search_artist("Queen") for _ in range(5)])
+            assert all(response == responses[0] for response in responses)
+            assert client.num_coalesced == 4
+
+            async def search_and_modify():
+                response = await client.search_artist("Queen")
+                response["artists"].clear()
+                return response
+            _, response = await asyncio.gather(search_and_modify(), client.search_artist("Queen"))
+            assert response == responses[0] # Each caller gets its own copy
+
+            start_time = time.perf_counter()
+            await asyncio.gather(client.search_artist("Nirvana"), client.search_artist("Björk"), client.lookup_artist("a"))
+            assert time.perf_counter() - start_time >= 0.2 # 3 requests at 10 per second
+            assert client.num_network_requests == 5
+
+            rg_mbid = (await client.search_release_group("Abbey Road"))["release-groups"][0]["id"]
+            releases = [release async for release in client.iter_browse("release", "release-group", rg_mbid, limit=2)]
+            assert len(releases) == 3
+
+    try:
+        asyncio.run(run())
+        assert server.stats["requests"] == 8
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,42 @@
+from music_history_ontology.data_ingestion.musicbrainz.cache import ResponseCache, create_cache_key
+from music_history_ontology.data_ingestion.musicbrainz.musicbrainz import MusicBrainzClient
+from music_history_ontology.data_ingestion.musicbrainz.stub_server import MusicBrainzStubServer
+
+def test_cache_key_normalization():
+    assert create_cache_key("artist", {"query": " Queen ", "limit": 1, "fmt": "json"}) == create_cache_key("artist", {"limit": "1", "query": "Queen"})
+    assert create_cache_key("artist/a", {"inc": "tags+artist-rels"}) == create_cache_key("artist/a", {"inc": "artist-rels+tags"})
+    assert create_cache_key("artist", {"query": "Queen"}) != create_cache_key("artist", {"query": "Queen", "limit": 5})
+
+def test_ttl_and_offline(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ResponseCache(db_path=db_path, ttls={"artist": -1.0}, default_ttl=3600.0)
+    cache.set("artist", {"query": "Queen"}, {"artists": []})
+    cache.set("instrument", {"query": "Piano"}, {"instruments": []})
+    assert cache.get("artist", {"query": "Queen"}) is None # Expired
+    assert cache.get("instrument", {"query": "Piano"}) == {"instruments": []}
+    assert cache.get_stats() == {"hits": 1, "misses": 1, "expired": 1, "hit_rate": 0.5}
+    cache.close()
+
+    offline_cache = ResponseCache(db_path=db_path, ttls={"artist": -1.0}, offline=True)
+    assert offline_cache.get("artist", {"query": "Queen"}) == {"artists": []} # Expired responses are replayed offline
+    offline_cache.close()
+
+def test_client_replays_cached_responses(tmp_path):
+    server = MusicBrainzStubServer()
+    server.start()
+    try:
+        db_path = str(tmp_path / "cache.db")
+        with MusicBrainzClient(base_url=server.base_url, cache=ResponseCache(db_path=db_path)) as client:
+            response = client.search_artist("Queen")
+            assert client.search_artist("Queen") == response
+            assert client.num_network_requests == 1
+
+        # A rerun over the same requests makes no network calls
+        with MusicBrainzClient(base_url=server.base_url, cache=ResponseCache(db_path=db_path, offline=True)) as client:
+            assert client.search_artist("Queen") == response
+            assert client.search_artist("Nirvana") is None # Not cached
+            assert client.num_network_requests == 0
+        assert server.stats["requests"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
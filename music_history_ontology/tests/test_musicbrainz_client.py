@@ -0,0 +1,20 @@
+from music_history_ontology.data_ingestion.musicbrainz.musicbrainz import MusicBrainzClient
+from music_history_ontology.data_ingestion.musicbrainz.stub_server import MusicBrainzStubServer
+
+def test_browse_pages():
+    server = MusicBrainzStubServer()
+    server.start()
+    try:
+        with MusicBrainzClient(base_url=server.base_url) as client:
+            rg_mbid = client.search_release_group("Abbey Road")["release-groups"][0]["id"]
+            release_ids = [release["id"] for release in client.lookup_release_group(rg_mbid, inc=["releases"])["releases"]]
+            releases = list(client.iter_browse("release", "release-group", rg_mbid, inc=["recordings"], limit=2))
+            assert [release["id"] for release in releases] == release_ids
+            assert all(release["media"][0]["tracks"] for release in releases)
+            assert client.num_network_requests == 4 # 1 search, 1 lookup and 2 pages
+            releases = list(client.iter_browse("release", "release-group", rg_mbid, inc=["recordings"], limit=2, max_pages=1))
+            assert [release["id"] for release in releases] == release_ids[:2]
+            assert client.num_network_requests == 5
+    finally:
+        server.shutdown()
+        server.server_close()
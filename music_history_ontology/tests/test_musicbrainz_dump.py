@@ -0,0 +1,57 @@
+import os
+import json
+import lzma
+from music_history_ontology.data_ingestion.musicbrainz.dump import MusicBrainzDump, MusicBrainzDumpClient
+
+CREDIT = [{"name": "Queen", "artist": {"id": "q-1", "name": "Queen", "type": "Group"}}]
+ARTISTS = [
+    {"id": "q-2", "name": "Queen", "type": "Person", "tags": []},
+    {"id": "q-1", "name": "Queen", "type": "Group", "tags": [{"name": "rock", "count": 9}], "genres": [{"id": "g-rock", "name": "Rock"}], "aliases": [{"name": "Queen (band)"}]},
+]
+RELEASE_GROUPS = [{"id": "rg-1", "title": "A Night at the Opera", "primary-type": "Album", "artist-credit": CREDIT}]
+RELEASES = [{"id": f"r-{i}", "title": "A Night at the Opera", "release-group": {"id": "rg-1"}, "artist-credit": CREDIT, "media": []} for i in range(3)]
+
+def write_dump(path, entities):
+    with lzma.open(path, "wt") as file:
+        file.write("".join(json.dumps(entity) + "\n" for entity in entities))
+
+def test_dump_client(tmp_path):
+    paths = [str(tmp_path / name) for name in ("artist.jsonl.xz", "release-group.jsonl.xz", "release.jsonl.xz")]
+    for path, entities in zip(paths, (ARTISTS, RELEASE_GROUPS, RELEASES)):
+        write_dump(path, entities)
+    dump = MusicBrainzDump(paths, index_dir=str(tmp_path / "index"), num_index_workers=2)
+    with MusicBrainzDumpClient(dump) as client:
+        assert client.search_artist("queen (band)")["artists"][0]["id"] == "q-1" # Most prominent, by alias
+        assert client.search_ensemble("Queen")["artists"][0]["id"] == "q-1"
+        assert client.search_release_group("A Night at the Opera", artist_name="Queen", type="album")["release-groups"][0]["id"] == "rg-1"
+        assert client.search_release_group("A Night at the Opera", artist_name="Nirvana")["release-groups"] == []
+        assert client.search_genre("rock")["tags"] == [{"id": "g-rock", "name": "Rock"}]
+        assert [release["id"] for release in client.lookup_release_group("rg-1", inc=["releases"])["releases"]] == ["r-0", "r-1", "r-2"]
+        assert [release["id"] for release in client.iter_browse("release", "release-group", "rg-1", limit=2)] == ["r-0", "r-1", "r-2"]
+        assert [artist["id"] for artist in dump.iter_entities("artist", tags=["ROCK"])] == ["q-1"]
+        assert len(list(dump.iter_entities("release", artists=["queen"]))) == 3
+        assert client.num_network_requests == 0
+
+    # The index is reused
+    dump = MusicBrainzDump(paths, index_dir=str(tmp_path / "index"))
+    assert dump.get("artist", "q-2")["type"] == "Person"
+    dump.close()
+
+def test_index_is_rebuilt_for_replaced_dumps(tmp_path):
+    index_dir = str(tmp_path / "index")
+    paths = [str(tmp_path / name / "artist.jsonl.xz") for name in ("old", "new")]
+    for path, artists in zip(paths, (ARTISTS[:1], ARTISTS[1:])):
+        os.makedirs(os.path.dirname(path))
+        write_dump(path, artists)
+    dump = MusicBrainzDump(paths[:1], index_dir=index_dir)
+    assert dump.get("artist", "q-2") is not None
+    dump.close()
+    dump = MusicBrainzDump(paths[1:], index_dir=index_dir) # Same name in another directory
+    assert dump.get("artist", "q-2") is None and dump.get("artist", "q-1") is not None
+    dump.close()
+
+    write_dump(paths[0], ARTISTS) # A newer dump published under the same name
+    os.utime(paths[0], ns=(0, 0))
+    dump = MusicBrainzDump(paths[:1], index_dir=index_dir)
+    assert dump.get("artist", "q-1") is not None
+    dump.close()
@@ -0,0 +1,47 @@
+import pytest
+from music_history_ontology.data_ingestion.musicbrainz.entity_sink import ENTITY_SINKS, EntityReader, create_sink
+
+def entity(identifier, name):
+    return {"identifier": identifier, "entity_type": identifier.split("_")[0], "hasName": name}
+
+@pytest.mark.parametrize("sink_name", list(ENTITY_SINKS))
+def test_sinks_round_trip(tmp_path, sink_name):
+    for run in range(2): # The second run rewrites Queen, and the reader keeps the last version
+        sink = create_sink(sink_name, str(tmp_path))
+        sink.write("MusicEnsemble", "MusicEnsemble_Queen", entity("MusicEnsemble_Queen", f"Queen {run}"))
+        sink.write("Musician", "Musician_Björk", entity("Musician_Björk", "Björk"))
+        sink.close()
+        assert sink.num_written == 2
+
+    reader = EntityReader(str(tmp_path))
+    assert reader.get_entity_types() == ["MusicEnsemble", "Musician"]
+    assert list(reader.iter_entities("MusicEnsemble")) == [entity("MusicEnsemble_Queen", "Queen 1")]
+    assert list(reader.iter_entities("Musician")) == [entity("Musician_Björk", "Björk")]
+
+def test_reader_merges_layouts(tmp_path):
+    for sink_name, name in [("directory", "Queen (directory)"), ("jsonl", "Queen (jsonl)")]:
+        sink = create_sink(sink_name, str(tmp_path))
+        sink.write("MusicEnsemble", "MusicEnsemble_Queen", entity("MusicEnsemble_Queen", name))
+        sink.close()
+    sink = create_sink("directory", str(tmp_path))
+    sink.write("MusicEnsemble", "MusicEnsemble_ABBA", entity("MusicEnsemble_ABBA", "ABBA"))
+    sink.close()
+    (tmp_path / "dump_index").mkdir() # Not an entity type
+
+    reader = EntityReader(str(tmp_path))
+    assert reader.get_entity_types() == ["MusicEnsemble"]
+    assert [e["hasName"] for e in reader.iter_entities("MusicEnsemble")] == ["ABBA", "Queen (jsonl)"]
+    with pytest.raises(ValueError):
+        create_sink("csv", str(tmp_path))
+
+def test_partial_lines(tmp_path):
+    jsonl_path = tmp_path / "Musician.jsonl"
+    jsonl_path.write_text('{"identifier": "Musician_Björk", "hasName": "Björk"}\n{"identifier": "Musician_Pri', encoding="utf-8") # Killed mid-write
+    sink = create_sink("jsonl", str(tmp_path))
+    sink.write("Musician", "Musician_Prince", entity("Musician_Prince", "Prince"))
+    sink.close()
+    assert [e["hasName"] for e in EntityReader(str(tmp_path)).iter_entities("Musician")] == ["Björk", "Prince"]
+
+    with open(jsonl_path, "a", encoding="utf-8") as f:
+        f.write('{"identifier": "Musician_Q\n') # Undecodable lines are skipped
+    assert [e["hasName"] for e in EntityReader(str(tmp_path)).iter_entities("Musician")] == ["Björk", "Prince"]
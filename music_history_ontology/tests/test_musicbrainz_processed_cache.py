@@ -0,0 +1,34 @@
+from music_history_ontology.data_ingestion.musicbrainz.processed_cache import ProcessedCache, hash_entity
+
+def test_resume_skips_saved_entities(tmp_path):
+    db_path = str(tmp_path / "processed.db")
+    queen = {"identifier": "MusicEnsemble_Queen", "hasName": "Queen"}
+    cache = ProcessedCache(db_path=db_path)
+    assert "MusicEnsemble_Queen" not in cache
+    assert not cache.add("MusicEnsemble_Queen", "MusicEnsemble", hash_entity(queen))
+    assert "MusicEnsemble_Queen" in cache
+    cache.close() # Interrupted
+
+    cache = ProcessedCache(db_path=db_path, resume=True)
+    assert cache.run_id == 1 and len(cache) == 1
+    assert "MusicEnsemble_Queen" in cache
+    cache.close()
+
+    cache = ProcessedCache(db_path=db_path) # A new run processes every entity again
+    assert cache.run_id == 2 and len(cache) == 0
+    assert "MusicEnsemble_Queen" not in cache
+    assert cache.is_saved("MusicEnsemble_Queen", hash_entity(dict(reversed(queen.items())))) # Same content
+    assert not cache.is_saved("MusicEnsemble_Queen", hash_entity({**queen, "hasName": "Queen II"}))
+    assert cache.add("MusicEnsemble_Queen", "MusicEnsemble", hash_entity(queen))
+    assert cache.num_unchanged == 1
+    cache.close()
+
+def test_memory_is_bounded(tmp_path):
+    committed = []
+    cache = ProcessedCache(db_path=str(tmp_path / "processed.db"), max_memory_entries=10, commit_every=100, before_commit=lambda: committed.append(True))
+    for i in range(250):
+        cache.add(f"Recording_{i}", "Recording", hash_entity({"i": i}))
+    assert len(cache.entries) == 10
+    assert len(committed) == 2
+    assert "Recording_0" in cache and len(cache) == 250 # Read back from the database
+    cache.close()
@@ -0,0 +1,20 @@
+from music_history_ontology.data_ingestion.musicbrainz.resolution import ResolutionTable, normalize_name
+
+def test_normalize_name():
+    assert normalize_name(" The  Beatles ") == normalize_name("the beatles")
+    assert normalize_name("Björk") == normalize_name("BJÖRK")
+
+def test_resolutions_persist_across_runs(tmp_path):
+    db_path = str(tmp_path / "resolution.db")
+    table = ResolutionTable(db_path=db_path)
+    assert table.get("Musician", "Queen") is None
+    table.set("Musician", "Queen", "Musician_Queen_abc", mbid="abc", mb_name="Queen", search_result={"id": "abc", "name": "Queen"})
+    table.set("Genre", "Rock", "Genre_Rock") # Resolved, but not on MusicBrainz
+    table.close()
+
+    table = ResolutionTable(db_path=db_path)
+    assert table.get("Musician", " queen ") == {"mbid": "abc", "identifier": "Musician_Queen_abc", "mb_name": "Queen", "search_result": {"id": "abc", "name": "Queen"}}
+    assert table.get("Genre", "rock")["mbid"] is None
+    assert table.get("MusicEnsemble", "Queen") is None # Resolutions are per entity type
+    assert (table.num_hits, table.num_misses) == (2, 1)
+    table.close()
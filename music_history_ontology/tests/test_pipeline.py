@@ -0,0 +1,41 @@
+import time
+import threading
+from music_history_ontology.data_ingestion.pipeline import Pipeline
+
+def test_join_waits_for_downstream_items():
+    written = []
+    pipeline = Pipeline()
+    pipeline.add_stage("fetch", lambda page, emit: [emit("extract", f"{page} #{i}") for i in range(2)], num_workers=2)
+    pipeline.add_stage("extract", lambda section, emit: (time.sleep(0.05), emit("write", section.upper())), num_workers=2)
+    pipeline.add_stage("write", lambda section, emit: written.append(section))
+    pipeline.add_stage("fail", lambda item, emit: 1 / 0)
+    pipeline.start()
+    for page in ["Mozart", "Bach", "Haydn"]:
+        pipeline.submit("fetch", page)
+    pipeline.submit("fail", None)
+    pipeline.join() # Only returns once the items emitted from the submitted ones are processed
+    assert sorted(written) == sorted(f"{page.upper()} #{i}" for page in ["Mozart", "Bach", "Haydn"] for i in range(2))
+    assert pipeline.num_pending == 0
+
+    stats = pipeline.get_stats()
+    assert [stats[name]["processed"] for name in ["fetch", "extract", "write", "fail"]] == [3, 6, 6, 1]
+    assert stats["fail"]["failed"] == 1
+    pipeline.stop()
+
+def test_full_queue_blocks_upstream_stage():
+    released = threading.Event()
+    pipeline = Pipeline()
+    pipeline.add_stage("produce", lambda item, emit: [emit("consume", i) for i in range(3)])
+    pipeline.add_stage("consume", lambda item, emit: released.wait(), max_queue_size=1)
+    pipeline.start()
+    pipeline.submit("produce", None)
+    time.sleep(0.2)
+
+    # The consumer holds one item and its queue holds another, so the producer is blocked on the third
+    assert pipeline.stages["consume"].input_queue.qsize() == 1
+    assert pipeline.get_stats()["produce"]["processed"] == 0
+    released.set()
+    pipeline.stop()
+    stats = pipeline.get_stats()
+    assert stats["produce"]["processed"] == 1 and stats["consume"]["processed"] == 3
+    assert stats["produce"]["blocked_time"] >= 0.1 # Attributed to the blocked stage rather than its busy time
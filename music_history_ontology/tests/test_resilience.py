@@ -0,0 +1,65 @@
+import time
+import pytest
+import requests
+from music_history_ontology.data_ingestion.resilience import AIMDLimiter, ResilientEndpoint, TransientError, classify_exception
+
+class FlakyService:
+    def __init__(self, errors):
+        self.errors = list(errors) # Raised by the first calls, in order
+        self.num_calls = 0
+
+    def get(self, query):
+        self.num_calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"result for {query}"
+
+def test_retries_transient_errors_after_retry_after():
+    endpoint = ResilientEndpoint(name="test", max_retries=3, base_delay=0.01, initial_concurrency=4)
+    service = FlakyService([TransientError("Too many requests", status_code=429, retry_after=0.2), ConnectionError("Reset")])
+    start_time = time.monotonic()
+    assert endpoint.call(service.get, "Mozart") == "result for Mozart"
+    assert time.monotonic() - start_time >= 0.2 # Waited for the Retry-After period
+    assert service.num_calls == 3
+
+    stats = endpoint.get_stats()
+    assert (stats["calls"], stats["successes"], stats["failures"], stats["retries"], stats["throttled"]) == (1, 1, 0, 2, 1)
+    assert stats["throttle_time"] >= 0.2
+    assert endpoint.limiter.limit < 4 # Throttling decreased the concurrency limit
+
+def test_gives_up_on_permanent_and_persistent_errors():
+    endpoint = ResilientEndpoint(name="test", max_retries=2, base_delay=0.01)
+    service = FlakyService([ValueError("Bad request")])
+    with pytest.raises(ValueError):
+        endpoint.call(service.get, "Mozart")
+    assert service.num_calls == 1 # Not retried
+
+    service = FlakyService([TimeoutError("Timed out")] * 3)
+    with pytest.raises(TimeoutError):
+        endpoint.call(service.get, "Mozart")
+    assert service.num_calls == 3 # The first attempt and both retries
+    stats = endpoint.get_stats()
+    assert (stats["calls"], stats["failures"], stats["retries"]) == (2, 2, 2)
+
+def test_classifies_http_errors():
+    response = requests.Response()
+    response.status_code = 503
+    response.headers["Retry-After"] = "7"
+    assert classify_exception(requests.exceptions.HTTPError(response=response)) == (True, True, 7.0)
+    response.status_code = 404
+    assert classify_exception(requests.exceptions.HTTPError(response=response))[:2] == (False, False)
+
+def test_aimd_decrease_and_recovery():
+    limiter = AIMDLimiter(initial_limit=8, min_limit=1, max_limit=10)
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.limit == 1 # Not below the minimum
+
+    for _ in range(1 + 2 + 3): # About a window of successes at each limit
+        limiter.on_success()
+    assert 3 < limiter.limit < 4 # Additive increase, by about one per window
+    for _ in range(1000):
+        limiter.on_success()
+    assert limiter.limit == 10 # Not above the maximum
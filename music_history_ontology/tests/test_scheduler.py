@@ -0,0 +1,34 @@
+import time
+import pytest
+from music_history_ontology.data_ingestion.scheduler import TaskGraph
+
+def test_dependencies_finish_first():
+    finished = []
+    def run(key, duration):
+        time.sleep(duration)
+        finished.append(key)
+        return key
+
+    graph = TaskGraph(num_workers=4)
+    graph.add_task("release", run, "release", 0.0, dependencies=["artist", "unknown"]) # Unknown dependencies are ignored
+    graph.add_task("artist", run, "artist", 0.2)
+    graph.add_task("genre", run, "genre", 0.0)
+    results = graph.run()
+    assert finished == ["genre", "artist", "release"]
+    assert results == {"release": "release", "artist": "artist", "genre": "genre"}
+
+def test_failed_tasks_and_cycles():
+    def fail():
+        raise RuntimeError("Request failed")
+
+    graph = TaskGraph(num_workers=2)
+    graph.add_task("a", fail)
+    graph.add_task("b", lambda: "b", dependencies=["a"]) # Still runs
+    assert graph.run() == {"b": "b"}
+    assert list(graph.errors) == ["a"]
+
+    graph = TaskGraph(num_workers=2)
+    graph.add_task("a", lambda: "a", dependencies=["b"])
+    graph.add_task("b", lambda: "b", dependencies=["a"])
+    with pytest.raises(ValueError):
+        graph.run()
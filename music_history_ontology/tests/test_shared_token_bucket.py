@@ -0,0 +1,26 @@
+import time
+import multiprocessing
+from music_history_ontology.data_ingestion.resilience import SharedTokenBucket
+
+def acquire_tokens(path, num_tokens):
+    bucket = SharedTokenBucket(path, rate=20.0, capacity=1.0)
+    for _ in range(num_tokens):
+        bucket.acquire()
+
+def test_rate_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "rate_limit.json")
+    start_time = time.time()
+    processes = [multiprocessing.Process(target=acquire_tokens, args=(path, 10)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    assert time.time() - start_time >= 19 / 20 # 20 tokens at 20 per second, 1 available at the start
+
+def test_burst_and_pause(tmp_path):
+    bucket = SharedTokenBucket(str(tmp_path / "rate_limit.json"), rate=10.0, capacity=3.0)
+    assert sum(bucket.acquire() for _ in range(3)) == 0.0 # Burst
+    assert bucket.acquire() > 0.0
+    SharedTokenBucket(str(tmp_path / "rate_limit.json"), rate=10.0, capacity=3.0).pause(0.3)
+    assert bucket.acquire() >= 0.2 # Paused by another instance
@@ -0,0 +1,74 @@
+import os
+import bz2
+import json
+from music_history_ontology.data_ingestion.wikipedia.dump import WikipediaDump
+
+MOZART_WIKITEXT = "'''Wolfgang Amadeus Mozart''' was a [[Composer|composer]].{{Infobox}}<ref>Source</ref>\n\n== Works ==\nHe wrote [[The Magic Flute]] and [[Requiem (Mozart)|a requiem]].\n[[Category:Composers]]"
+
+def write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(record) + "\n" for record in records))
+
+def write_multistream(path, streams):
+    """Writes a multistream dump with one bz2 stream per list of (title, wikitext, redirect) pages, and its index."""
+    data, index_lines = b"", []
+    for pages in streams:
+        xml = "".join(
+                    f"<page><title>{title}</title>" + (f'<redirect title="{redirect}" />' if redirect else "") + f"<revision><text>{wikitext}</text></revision></page>"
+                    for title, wikitext, redirect in pages
+                    )
+        index_lines.extend(f"{len(data)}:{i}:{title}\n" for i, (title, _, _) in enumerate(pages))
+        data += bz2.compress(xml.encode("utf-8"))
+    with open(path, "wb") as f:
+        f.write(data)
+    with bz2.open(f"{path[:-len('.xml.bz2')]}-index.txt.bz2", "wt", encoding="utf-8") as f:
+        f.write("".join(index_lines))
+
+def test_jsonl_and_multistream_shards(tmp_path):
+    jsonl_path = str(tmp_path / "pages.jsonl")
+    write_jsonl(jsonl_path, [
+                            {"title": "Wolfgang Amadeus Mozart", "text": MOZART_WIKITEXT},
+                            {"title": "Mozart", "redirect": "Wolfgang Amadeus Mozart"},
+                            {"title": "Queen (band)", "text": "Queen are a band.", "links": ["Freddie Mercury"], "summary": "Queen."}
+                            ])
+    xml_path = str(tmp_path / "pages-multistream.xml.bz2")
+    write_multistream(xml_path, [
+                                [("Johann Sebastian Bach", "Bach was a [[Composer]].\n\n== Life ==\nBorn in [[Eisenach]].", None)],
+                                [("Bach", "", "Johann Sebastian Bach"), ("The Magic Flute", "An opera by [[Mozart]].", None)]
+                                ])
+
+    dump = WikipediaDump(paths=[jsonl_path, xml_path], num_index_workers=1)
+    title, page = dump.retrieve_first_page("mozart") # Case-insensitive, following the redirect
+    assert title == "Wolfgang Amadeus Mozart"
+    assert page.summary == "Wolfgang Amadeus Mozart was a composer."
+    assert page.links == ["Composer", "Requiem (Mozart)", "The Magic Flute"]
+    assert "== Works ==\nHe wrote The Magic Flute and a requiem." in page.content
+    assert dump.read_page("Queen_(band)").links == ["Freddie Mercury"]
+
+    page = dump.read_page("BACH")
+    assert (page.title, page.summary, page.links) == ("Johann Sebastian Bach", "Bach was a Composer.", ["Composer", "Eisenach"])
+    assert dump.read_page("the Magic Flute").title == "The Magic Flute"
+    assert dump.retrieve_first_page("Haydn") == (None, None)
+
+    assert [page.title for page in dump.iter_pages(0)] == ["Wolfgang Amadeus Mozart", "Queen (band)"] # Without redirects
+    assert [page.title for page in dump.iter_pages(1)] == ["Johann Sebastian Bach", "The Magic Flute"]
+    dump.close()
+
+def test_index_is_rebuilt_for_replaced_shards(tmp_path):
+    jsonl_path = str(tmp_path / "pages.jsonl")
+    write_jsonl(jsonl_path, [{"title": "Mozart", "text": "A composer."}, {"title": "Bach", "text": "Another composer."}])
+    dump = WikipediaDump(paths=jsonl_path, num_index_workers=1)
+    assert dump.read_page("Bach").content == "Another composer."
+    dump.close()
+
+    dump = WikipediaDump(paths=jsonl_path, num_index_workers=1) # Reused
+    assert dump.is_index_complete()
+    dump.close()
+
+    # A newer dump with the same name moves the pages
+    write_jsonl(jsonl_path, [{"title": "Haydn", "text": "The father of the symphony."}, {"title": "Bach", "text": "A Baroque composer."}])
+    os.utime(jsonl_path, ns=(0, 0))
+    dump = WikipediaDump(paths=jsonl_path, num_index_workers=1)
+    assert dump.read_page("Bach").content == "A Baroque composer."
+    assert dump.read_page("Haydn") is not None and dump.read_page("Mozart") is None
+    dump.close()
@@ -0,0 +1,44 @@
+import time
+from music_history_ontology.data_ingestion.wikipedia.instance import DataInstance
+from music_history_ontology.data_ingestion.wikipedia.alias_generation import AliasRegistry
+from music_history_ontology.data_ingestion.wikipedia.work_queue import MemoryWorkQueue, SQLiteWorkQueue
+
+def test_expired_lease_frees_claims(tmp_path):
+    work_queue = SQLiteWorkQueue(db_path=str(tmp_path / "work_queue.db"), lease_seconds=0.1)
+    work_queue.add([DataInstance(predicted_class="Thing.MusicArtist.Musician", search_query="Mozart")])
+
+    # A worker claims the page of its search query, then crashes
+    item_id, _ = work_queue.lease(worker_id="a")
+    assert work_queue.claim("page:mozart", owner=f"a:{item_id}")
+    assert not work_queue.claim("page:mozart", owner="b:0")
+    time.sleep(0.2)
+
+    # Its lease and claim expire, so another worker processes the page (and the first worker can no longer complete it)
+    item_id, _ = work_queue.lease(worker_id="b")
+    assert work_queue.claim("page:mozart", owner=f"b:{item_id}")
+    assert not work_queue.complete(item_id, worker_id="a", is_retrieved=True)
+    assert work_queue.complete(item_id, worker_id="b", is_retrieved=True, seen_keys=["page:mozart"])
+    assert work_queue.is_seen("page:mozart")
+    assert work_queue.get_counts() == {"pending": 0, "leased": 0, "done": 1, "failed": 0, "retrieved": 1}
+
+def test_memory_work_queue():
+    work_queue = MemoryWorkQueue()
+    work_queue.add([DataInstance(predicted_class="Thing.MusicArtist.Musician", search_query="Mozart")] * 2) # Duplicates are ignored
+    item_id, data_instance = work_queue.lease(worker_id="a")
+    assert data_instance.search_query == "Mozart" and work_queue.lease(worker_id="a") == (None, None)
+    assert work_queue.claim("seed", owner="a") and work_queue.claim("seed", owner="a") and not work_queue.claim("seed", owner="b")
+    assert not work_queue.complete(item_id, worker_id="b", is_retrieved=True)
+    assert work_queue.complete(item_id, worker_id="a", is_retrieved=True, seen_keys=["page:mozart"])
+    assert work_queue.is_seen("page:mozart")
+    assert work_queue.get_counts() == {"pending": 0, "leased": 0, "done": 1, "retrieved": 1}
+
+def test_aliases_are_stable_across_workers(tmp_path):
+    db_path = str(tmp_path / "work_queue.db")
+    registry = AliasRegistry(shared_store=SQLiteWorkQueue(db_path=db_path))
+    assert registry.register("Wolfgang Amadeus Mozart|Thing.MusicArtist.Musician", ["mozart-musician"]) == "mozart-musician"
+
+    # After a crash, another worker processes the same page again (and another page with the same alias)
+    registry = AliasRegistry(shared_store=SQLiteWorkQueue(db_path=db_path))
+    assert registry.register("Leopold Mozart|Thing.MusicArtist.Musician", ["mozart-musician"]) == "mozart-musician-2"
+    assert registry.register("Wolfgang Amadeus Mozart|Thing.MusicArtist.Musician", ["mozart-musician"]) == "mozart-musician"
+    assert AliasRegistry(shared_store=MemoryWorkQueue()).register("Leopold Mozart|Thing.MusicArtist.Musician", ["mozart-musician"]) == "mozart-musician"
@@ -0,0 +1,84 @@
+import set_path
+import os
+import io
+import json
+import time
+import tracemalloc
+from copy import deepcopy
+from music_history_ontology.data_ingestion.object_properties import ObjectPropertyLinks
+from music_history_ontology.data_ingestion.wikipedia.instance import DataInstance, write_class_data
+from music_history_ontology.data_ingestion.wikipedia.constants import CLASS_PROPERTY_MAPPINGS
+
+def create_data_instances(num_instances:int, object_properties_schema:dict, copy_schema:bool=False) -> list:
+    data_instances = []
+    for i in range(num_instances):
+        if copy_schema: # Deep copy of the schema per instance (previous approach)
+            object_properties = deepcopy(object_properties_schema)
+            object_properties["associatedWith"]["ids"].append(f"musician-{i - 1}")
+        else:
+            object_properties = ObjectPropertyLinks(schema=object_properties_schema)
+            object_properties.add("associatedWith", f"musician-{i - 1}")
+        data_instances.append(DataInstance(
+                                        predicted_class="Thing.MusicArtist.Musician",
+                                        search_query=f"Musician {i}",
+                                        alias=f"musician-{i}-musician",
+                                        json_data={
+                                                "object_properties": object_properties,
+                                                "data_properties": {"hasName": f"Musician {i}", "hasBirthDate": "1756-01-27", "hasNote": None}
+                                                },
+                                        source_key=f"Musician {i}"
+                                        ))
+    return data_instances
+
+if __name__ == "__main__":
+    NUM_INSTANCES = [10_000, 100_000, 1_000_000]
+    NUM_INSTANCES_DEEPCOPY = 10_000 # The number of instances for the comparison with deep copying the schema per instance
+    MAX_INSTANCES_CONVERT_TO_JSON = 100_000 # The maximum number of instances for the comparison with convert_to_json + json.dump (slow)
+    OBJECT_PROPERTIES_SCHEMA = CLASS_PROPERTY_MAPPINGS["Thing.MusicArtist.Musician"]["object_properties"]
+
+    for copy_schema in (True, False):
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        data_instances = create_data_instances(NUM_INSTANCES_DEEPCOPY, object_properties_schema=OBJECT_PROPERTIES_SCHEMA, copy_schema=copy_schema)
+        creation_time = time.perf_counter() - start_time
+        current_memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"{'Deep copied schema' if copy_schema else 'Object property links'} | Num instances: {NUM_INSTANCES_DEEPCOPY} | "
+            f"Memory: {current_memory / NUM_INSTANCES_DEEPCOPY:.1f} bytes per instance | Creation: {NUM_INSTANCES_DEEPCOPY / creation_time:.0f} instances/s"
+            )
+        del data_instances
+    print()
+
+    for num_instances in NUM_INSTANCES:
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        data_instances = create_data_instances(num_instances, object_properties_schema=OBJECT_PROPERTIES_SCHEMA)
+        creation_time = time.perf_counter() - start_time
+        current_memory, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        with open(os.devnull, "w") as f:
+            convert_to_json_time = None
+            if num_instances <= MAX_INSTANCES_CONVERT_TO_JSON:
+                start_time = time.perf_counter()
+                json.dump({"class_name": "Thing.MusicArtist.Musician", "data": [data_instance.convert_to_json() for data_instance in data_instances]}, f)
+                convert_to_json_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            write_class_data(class_name="Thing.MusicArtist.Musician", data_instances=data_instances, stream=f)
+            write_json_time = time.perf_counter() - start_time
+
+        # Check that both serializers produce the same JSON
+        stream = io.StringIO()
+        write_class_data(class_name="Thing.MusicArtist.Musician", data_instances=data_instances[:100], stream=stream)
+        assert json.loads(stream.getvalue())["data"] == [data_instance.convert_to_json() for data_instance in data_instances[:100]]
+
+        print(f"Num instances: {num_instances}")
+        print(f"Memory: {current_memory / 1024 ** 2:.2f} MiB ({current_memory / num_instances:.1f} bytes per instance) | Peak: {peak_memory / 1024 ** 2:.2f} MiB")
+        print(f"Creation: {num_instances / creation_time:.0f} instances/s")
+        if convert_to_json_time is not None:
+            print(f"Serialization (convert_to_json + json.dump): {num_instances / convert_to_json_time:.0f} instances/s")
+        print(f"Serialization (write_class_data): {num_instances / write_json_time:.0f} instances/s")
+        print()
+        del data_instances
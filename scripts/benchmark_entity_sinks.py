@@ -0,0 +1,41 @@
+import set_path
+import time
+import tempfile
+from music_history_ontology.data_ingestion.musicbrainz.entity_sink import ENTITY_SINKS, EntityReader
+
+def create_entity(i):
+    entity_type = ["Musician", "Recording", "Album"][i % 3]
+    return entity_type, {
+        "identifier": f"{entity_type}_{i:08d}",
+        "entity_type": entity_type,
+        "hasName": f"{entity_type} {i}",
+        "mbid": f"00000000-0000-0000-0000-{i:012d}",
+        "hasGenre": ["MusicGenre_rock", "MusicGenre_pop"],
+        "performedBy": [f"Musician_{i - 1:08d}"],
+        "hasReleaseDate": "1975-10-31",
+    }
+
+if __name__ == "__main__":
+    NUM_ENTITIES = 30000  # The number of entities written and read back by each sink
+
+    entities = [create_entity(i) for i in range(NUM_ENTITIES)]
+    for name, sink_class in ENTITY_SINKS.items():
+        with tempfile.TemporaryDirectory() as data_dir:
+            sink = sink_class(data_dir)
+            start_time = time.perf_counter()
+            for entity_type, entity in entities:
+                sink.write(entity_type, entity["identifier"], entity)
+            sink.close()
+            write_time = time.perf_counter() - start_time
+
+            reader = EntityReader(data_dir)
+            start_time = time.perf_counter()
+            num_read = sum(1 for entity_type in reader.get_entity_types() for _ in reader.iter_entities(entity_type))
+            read_time = time.perf_counter() - start_time
+            assert num_read == NUM_ENTITIES
+
+        print(
+            f"{name:<10} | Entities: {NUM_ENTITIES} | "
+            f"Write: {NUM_ENTITIES / write_time:,.0f} entities/s ({write_time:.2f}s) | "
+            f"Read: {NUM_ENTITIES / read_time:,.0f} entities/s ({read_time:.2f}s)"
+        )
@@ -0,0 +1,44 @@
+import set_path
+import time
+import requests
+from music_history_ontology.data_ingestion.musicbrainz.musicbrainz import MusicBrainzClient
+from music_history_ontology.data_ingestion.musicbrainz.stub_server import MusicBrainzStubServer
+
+if __name__ == "__main__":
+    NUM_REQUESTS = 10  # The number of requests for each client (rate limited to 1 per second)
+    SETUP_DELAY = 0.15  # The simulated TCP + TLS setup time of a new connection to the API (seconds)
+    LATENCY = 0.05  # The simulated server time of each request (seconds)
+    SEARCH_QUERIES = ["Queen", "The Beatles", "Mozart", "Miles Davis", "Björk"]
+
+    server = MusicBrainzStubServer(latency=LATENCY, setup_delay=SETUP_DELAY)
+    server.start()
+    print(f"Stub server listening on {server.base_url}")
+
+    # Previous approach: a new connection for every request
+    headers = MusicBrainzClient().headers
+    times = []
+    for i in range(NUM_REQUESTS):
+        start_time = time.perf_counter()
+        response = requests.get(
+            f"{server.base_url}artist",
+            headers=headers,
+            params={"query": SEARCH_QUERIES[i % len(SEARCH_QUERIES)], "limit": 1, "fmt": "json"},
+        )
+        response.json()
+        times.append(time.perf_counter() - start_time)
+    connections_before = server.stats["connections"]
+    print(
+        f"requests.get | Requests: {NUM_REQUESTS} | Connections: {connections_before} | "
+        f"Mean time per request: {sum(times) / len(times) * 1000:.1f}ms"
+    )
+
+    # Pooled keep-alive session
+    with MusicBrainzClient(base_url=server.base_url) as client:
+        for i in range(NUM_REQUESTS):
+            client.search_artist(SEARCH_QUERIES[i % len(SEARCH_QUERIES)])
+        print(
+            f"MusicBrainzClient | Requests: {NUM_REQUESTS} | "
+            f"Connections: {server.stats['connections'] - connections_before}"
+        )
+        client.report_timings()
+    server.shutdown()
@@ -3,23 +3,56 @@ import random
 import os
 import json
 import time
-from copy import deepcopy
-from music_history_ontology.data_ingestion.wikipedia.functions import retrieve_first_wikipedia_page, get_initial_search_queries, retrieve_related_pages
-from music_history_ontology.data_ingestion.wikipedia.llm import LLMTextGenerator
+import socket
+import threading
+from music_history_ontology.data_ingestion.wikipedia.functions import retrieve_first_wikipedia_page, get_initial_search_queries, retrieve_related_pages, retrieve_page_links, retrieve_page_content, set_wikipedia_dump, WIKIPEDIA_RETRY_ON
+from music_history_ontology.data_ingestion.wikipedia.dump import WikipediaDump
+from music_history_ontology.data_ingestion.resilience import configure_endpoint, report_endpoint_stats
+from music_history_ontology.data_ingestion.object_properties import ObjectPropertyLinks
+from music_history_ontology.data_ingestion.pipeline import Pipeline
+from music_history_ontology.data_ingestion.wikipedia.llm import LLMTextGenerator, report_generator_stats
+from music_history_ontology.data_ingestion.wikipedia.client_pool import configure_client_pool
+from music_history_ontology.data_ingestion.wikipedia.batch import BatchExtractor, BATCH_BACKENDS
+from music_history_ontology.data_ingestion.wikipedia.chunked_extraction import ChunkedExtractor
+from music_history_ontology.data_ingestion.wikipedia.semantic_cache import SemanticClassificationCache
+from music_history_ontology.data_ingestion.wikipedia.link_filter import LinkRelevanceFilter
+from music_history_ontology.data_ingestion.wikipedia.alias_generation import AliasRegistry, RuleBasedAliasGenerator
 from music_history_ontology.data_ingestion.wikipedia.constants import CLASSES_TO_JSON_FIELDS, CLASSES, CLASS_PROPERTY_MAPPINGS
 from music_history_ontology.data_ingestion.wikipedia.initial_queries import INITIAL_QUERIES_DICT
-from music_history_ontology.data_ingestion.wikipedia.instance import DataInstance
+from music_history_ontology.data_ingestion.wikipedia.instance import DataInstance, ClassDataWriter, create_instance_id, merge_class_files
+from music_history_ontology.data_ingestion.wikipedia.work_queue import WORK_QUEUES
 from music_history_ontology.rdf_reading.class_property_mappings import create_trimmed_class_property_mappings
 from music_history_ontology.data_ingestion.wikipedia.query_generation import get_generated_search_queries
 from music_history_ontology.data_ingestion.wikipedia.time_interval_generator import TimeIntervalInstanceGenerator
+from music_history_ontology.data_ingestion.wikipedia.hierarchical_classification import HierarchicalClassifier
 
 if __name__ == "__main__":
     random.seed(42)
 
+    LLM_REQUESTS_PER_SECOND = None # The rate limit for the LLM provider (None = rely on Retry-After and AIMD concurrency control only)
+    WIKIPEDIA_REQUESTS_PER_SECOND = 10.0 # The rate limit for Wikipedia requests
+    MAX_RETRIES = 5 # The maximum number of retries for a request that failed with a transient error (e.g., 429, 5xx, timeouts)
+    configure_endpoint(f"llm.{os.getenv('LLM_BACKEND', 'openai')}", requests_per_second=LLM_REQUESTS_PER_SECOND, max_retries=MAX_RETRIES)
+    configure_endpoint(
+                    "wikipedia",
+                    requests_per_second=WIKIPEDIA_REQUESTS_PER_SECOND,
+                    burst=5.0,
+                    max_retries=MAX_RETRIES,
+                    retry_on=WIKIPEDIA_RETRY_ON
+                    )
     
-    search_query_classifier = LLMTextGenerator(role="search_query_classification")
-    information_extractor = LLMTextGenerator(role="information_extraction")
-    alias_generator = LLMTextGenerator(role="alias_generation")
+    # Local Wikipedia dump shards (.jsonl or multistream .xml.bz2) to read pages from instead of the API (None to use the API)
+    WIKIPEDIA_DUMP_PATHS = None
+    if WIKIPEDIA_DUMP_PATHS is not None:
+        set_wikipedia_dump(WikipediaDump(paths=WIKIPEDIA_DUMP_PATHS))
+
+    MAX_LLM_CONNECTIONS = 32 # The maximum number of connections (and concurrent requests) to the LLM provider, shared by all roles
+    configure_client_pool(max_connections=MAX_LLM_CONNECTIONS)
+    STRUCTURED_OUTPUT = False # Request JSON schema responses from the LLM (supported by the "openai" backend)
+    
+    search_query_classifier = LLMTextGenerator(role="search_query_classification", structured_output=STRUCTURED_OUTPUT)
+    information_extractor = LLMTextGenerator(role="information_extraction", structured_output=STRUCTURED_OUTPUT)
+    alias_generator = LLMTextGenerator(role="alias_generation", structured_output=STRUCTURED_OUTPUT)
     DATA_DIR = "generated_data/wikipedia"
 
     os.makedirs(DATA_DIR, exist_ok=True)
@@ -27,13 +60,58 @@ if __name__ == "__main__":
     NUM_DATA_FOR_ALL = 100 # The total number of data instances to retrieve for all classes (excluding TimeInterval instances)
     MAX_RETRIEVAL_PER_QUERY = 5 # The maximum number of relevant pages to retrieve for each search query (Lower=More variety)
     NUM_QUERIES_PER_CLASS_GENERATE = 3 # The number of initial queries to generate for each class.
+    USE_HIERARCHICAL_CLASSIFICATION = False # Classify by descending the class hierarchy one level at a time (smaller prompts)
+    HIERARCHICAL_BATCH_SIZE = 5 # The number of related pages classified within a single prompt at each level of the hierarchy
+    USE_BATCH_MODE = False # Run information extraction and alias generation as offline batch jobs (one per crawl wave)
+    BATCH_BACKEND = "standin" # The batch backend ("openai" for the OpenAI Batch API, "standin" to process the batch file locally)
+    BATCH_WAVE_SIZE = 1000 # The number of instances in each batch job
+    USE_FULL_ARTICLE = False # Extract information and time intervals from the full article (in parallel chunks) rather than only the summary (synchronous mode only)
+    PAGE_TOKEN_BUDGET = 6000 # The maximum number of article tokens used for extraction per page when using the full article
+    USE_SEMANTIC_CACHE = False # Reuse the class of near-duplicate search query classification requests
+    SEMANTIC_CACHE_THRESHOLD = 0.95 # The minimum cosine similarity for a cached classification to be reused
+    SEMANTIC_CACHE_AUDIT_RATE = 0.05 # The fraction of reused classifications that are checked against a fresh classification
+    USE_LINK_FILTER = False # Rank the links of each page by their relevance to the ontology (embeddings), only classifying the top links
+    MAX_LINKS_PER_PAGE = 50 # The maximum number of links of each page that are fetched and classified when using the link filter
+    USE_RULE_BASED_ALIASES = True # Generate aliases from the canonical page title and class, only calling the LLM for ambiguous titles
+    FETCH_WORKERS = 4 # The number of threads fetching pages from Wikipedia
+    EXTRACT_WORKERS = 8 # The number of threads running information extraction, alias and time interval generation
+    CLASSIFY_WORKERS = 4 # The number of threads classifying related pages
+    STAGE_QUEUE_SIZE = 16 # The maximum number of items waiting between pipeline stages (backpressure)
+    DISTRIBUTED = False # Share the frontier and seen pages with other worker processes (run this script N times to add workers)
+    WORK_QUEUE = "sqlite" # The shared work queue for the distributed mode ("sqlite" for worker processes on one node)
+    WORK_QUEUE_PATH = f"{DATA_DIR}/work_queue.db" # The path of the SQLite work queue
+    LEASE_SECONDS = 600 # The number of seconds after which a search query leased by a worker (e.g., that crashed) is given to another worker
+    WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
     known_classes = set(CLASSES)
 
     with open("rdf_components/class_hierarchy_tree.json") as f:
-        class_hierarchy_tree = json.load(f)
-        class_hierarchy_tree = json.dumps(class_hierarchy_tree, indent=4)
+        class_hierarchy_tree_dict = json.load(f)
+        class_hierarchy_tree = json.dumps(class_hierarchy_tree_dict, indent=4)
     print(class_hierarchy_tree, type(class_hierarchy_tree))
 
+    classification_batch_size = 1
+    if USE_HIERARCHICAL_CLASSIFICATION:
+        search_query_classifier = HierarchicalClassifier(
+                                                        class_hierarchy_tree=class_hierarchy_tree_dict,
+                                                        known_classes=known_classes,
+                                                        batch_size=HIERARCHICAL_BATCH_SIZE
+                                                        )
+        classification_batch_size = HIERARCHICAL_BATCH_SIZE
+    if USE_SEMANTIC_CACHE:
+        search_query_classifier = SemanticClassificationCache(
+                                                            classifier=search_query_classifier,
+                                                            similarity_threshold=SEMANTIC_CACHE_THRESHOLD,
+                                                            audit_rate=SEMANTIC_CACHE_AUDIT_RATE
+                                                            )
+
+    link_filter = None
+    if USE_LINK_FILTER:
+        link_filter = LinkRelevanceFilter(
+                                        class_names=CLASSES,
+                                        max_links=MAX_LINKS_PER_PAGE,
+                                        stop_list_path=f"{DATA_DIR}/link_rejections.json" # Persisted so repeatedly rejected links are skipped in later runs
+                                        )
+
     if os.path.exists("rdf_components/trimmed_class_property_mappings.json"):
         with open("rdf_components/trimmed_class_property_mappings.json") as f:
             trimmed_class_property_mappings = json.load(f)
@@ -43,133 +121,331 @@ if __name__ == "__main__":
         with open("rdf_components/trimmed_class_property_mappings.json", "w") as f:
             json.dump(trimmed_class_property_mappings, f, indent=4)
 
-    initial_search_queries = get_initial_search_queries(
-                                                initial_queries_dict=INITIAL_QUERIES_DICT,
-                                                class_property_mappings=CLASS_PROPERTY_MAPPINGS,
-                                                max_num_queries=NUM_DATA_FOR_ALL
-                                                )
-    for i in range(len(initial_search_queries)):
-        print(f"Search query: {initial_search_queries[i].search_query} | Set class: {initial_search_queries[i].predicted_class}")
-    
-    all_generated_queries = [data_instance.search_query for data_instance in initial_search_queries]
-    print(all_generated_queries)
-    generated_search_query_start_time = time.perf_counter()
-    generated_search_queries = get_generated_search_queries(
-                                                trimmed_class_property_mappings=trimmed_class_property_mappings,
-                                                class_hierarchy_tree=class_hierarchy_tree,
-                                                search_query_classifier=search_query_classifier,
-                                                known_classes=known_classes,
-                                                all_generated_queries=all_generated_queries,
-                                                num_queries_per_class=NUM_QUERIES_PER_CLASS_GENERATE,
-                                                )
-    generated_search_query_end_time = time.perf_counter()
-    time_taken_to_generate_search_queries = generated_search_query_end_time - generated_search_query_start_time
-        
-    for c_class, data_instance_dict in generated_search_queries.items():
-        print(f"Class: {c_class} | Num queries: {len(data_instance_dict)}")
-        for search_query, data_instance in data_instance_dict.items():
-            print(f"Search query: {search_query} | Set class: {data_instance.predicted_class}")
-        print()
+    if DISTRIBUTED:
+        work_queue = WORK_QUEUES[WORK_QUEUE](db_path=WORK_QUEUE_PATH, lease_seconds=LEASE_SECONDS)
+    else:
+        work_queue = WORK_QUEUES["memory"]()
+
+    # Only one worker generates the initial search queries, the others wait for them (and take over if the claim of
+    # that worker expires, e.g., because it crashed)
+    time_taken_to_generate_search_queries = 0.0
+    while not work_queue.is_seen("seed:finished"):
+        if not work_queue.claim("seed", owner=WORKER_ID):
+            print("Waiting for the initial search queries from another worker...")
+            time.sleep(5.0)
+            continue
+
+        initial_search_queries = get_initial_search_queries(
+                                                    initial_queries_dict=INITIAL_QUERIES_DICT,
+                                                    class_property_mappings=CLASS_PROPERTY_MAPPINGS,
+                                                    max_num_queries=NUM_DATA_FOR_ALL
+                                                    )
+        for i in range(len(initial_search_queries)):
+            print(f"Search query: {initial_search_queries[i].search_query} | Set class: {initial_search_queries[i].predicted_class}")
+
+        all_generated_queries = [data_instance.search_query for data_instance in initial_search_queries]
+        print(all_generated_queries)
+        generated_search_query_start_time = time.perf_counter()
+        generated_search_queries = get_generated_search_queries(
+                                                    trimmed_class_property_mappings=trimmed_class_property_mappings,
+                                                    class_hierarchy_tree=class_hierarchy_tree,
+                                                    search_query_classifier=search_query_classifier,
+                                                    known_classes=known_classes,
+                                                    all_generated_queries=all_generated_queries,
+                                                    num_queries_per_class=NUM_QUERIES_PER_CLASS_GENERATE,
+                                                    )
+        generated_search_query_end_time = time.perf_counter()
+        time_taken_to_generate_search_queries = generated_search_query_end_time - generated_search_query_start_time
+
+        for c_class, data_instance_dict in generated_search_queries.items():
+            print(f"Class: {c_class} | Num queries: {len(data_instance_dict)}")
+            for search_query, data_instance in data_instance_dict.items():
+                print(f"Search query: {search_query} | Set class: {data_instance.predicted_class}")
+            print()
+
+        # Aggregate all of the data instances into the frontier.
+        search_queries = [data_instance for data_instance in initial_search_queries]
+        for c_class, data_instance_dict in generated_search_queries.items():
+            generated_class_queries = data_instance_dict.values()
+            print(generated_class_queries)
+            search_queries.extend(generated_class_queries)
+        work_queue.add(search_queries)
+        work_queue.mark_seen("seed:finished")
 
     data_retrieval_start_time = time.perf_counter()
-    # Aggregate all of the data instances into a single list.
-    search_queries = [data_instance for data_instance in initial_search_queries]
-    for c_class, data_instance_dict in generated_search_queries.items():
-        generated_class_queries = data_instance_dict.values()
-        print(generated_class_queries)
-        search_queries.extend(generated_class_queries)
 
     # Start retrieval
-    TIIG = TimeIntervalInstanceGenerator(class_property_mappings=CLASS_PROPERTY_MAPPINGS)
-    data_for_each_class = {c_class: [] for c_class in CLASSES}
-    print(data_for_each_class)
-    total_data_retrieved = 0
-    while len(search_queries) > 0 and total_data_retrieved < NUM_DATA_FOR_ALL:
-        print(f"Number of search queries: {len(search_queries)}")
-        base_data_instance = search_queries.pop(0) # Get the first search query
+    TIIG = TimeIntervalInstanceGenerator(
+                                        class_property_mappings=CLASS_PROPERTY_MAPPINGS,
+                                        use_full_article=USE_FULL_ARTICLE,
+                                        page_token_budget=PAGE_TOKEN_BUDGET
+                                        )
+    alias_engine = None
+    if USE_RULE_BASED_ALIASES:
+        if DISTRIBUTED:
+            # Aliases are assigned in the work queue (persisted with it), so they are unique and stable across workers and runs
+            alias_registry = AliasRegistry(shared_store=work_queue)
+        else:
+            alias_registry = AliasRegistry(file_path=f"{DATA_DIR}/alias_registry.json") # Persisted so aliases stay unique and stable across runs
+        alias_engine = RuleBasedAliasGenerator(registry=alias_registry, llm=alias_generator)
+    full_article_extractor = ChunkedExtractor(llm=information_extractor, page_token_budget=PAGE_TOKEN_BUDGET)
+    # Instances are written as they are completed (to a directory per worker, merged at the end, in the distributed mode)
+    worker_data_dir = f"{DATA_DIR}/workers/{WORKER_ID}" if DISTRIBUTED else DATA_DIR
+    data_writer = ClassDataWriter(data_dir=worker_data_dir, class_names=CLASSES)
+    batch_lock = threading.Lock() # Only one thread adds to or runs the batch job at a time
+    batch_items = {} # Instance ID -> ID of the search query, for the instances queued in the batch job
+    if USE_BATCH_MODE:
+        batch_extractor = BatchExtractor(
+                                        batch_backend=BATCH_BACKENDS[BATCH_BACKEND](),
+                                        information_extractor=information_extractor,
+                                        alias_generator=alias_generator,
+                                        batch_dir=f"{DATA_DIR}/batches",
+                                        alias_engine=alias_engine
+                                        )
+
+    def finish_search_query(item_id, is_retrieved=False, seen_keys=()):
+        if not work_queue.complete(item_id, worker_id=WORKER_ID, is_retrieved=is_retrieved, seen_keys=seen_keys):
+            print(f"The lease of search query {item_id} expired before it was completed (it was given to another worker)")
+
+    def run_batch_wave(emit, min_size=1):
+        # Runs the batch job once enough instances are queued. Their search queries stay leased until then, and are only
+        # counted as retrieved if their instance is written.
+        with batch_lock:
+            if len(batch_extractor) < min_size:
+                return
+            wave_items = dict(batch_items)
+            batch_items.clear()
+            try:
+                completed_data_instances = batch_extractor.run()
+            except Exception:
+                for instance_id, item_id in wave_items.items():
+                    finish_search_query(item_id, seen_keys=[f"page:{instance_id}"])
+                raise
+        for data_instance, text in completed_data_instances:
+            emit("write", data_instance)
+            for ti_data_instance in TIIG.execute(data_instance=data_instance, page_summary=text):
+                emit("write", ti_data_instance)
+            item_id = wave_items.pop(data_instance.id, None)
+            if item_id is not None: # None if its search query was completed when a previous run of the batch job failed
+                finish_search_query(item_id, is_retrieved=True, seen_keys=[f"page:{data_instance.id}"])
+        for instance_id, item_id in wave_items.items(): # Failed in the batch job
+            finish_search_query(item_id, seen_keys=[f"page:{instance_id}"])
+
+    def fetch_stage(item, emit):
+        # Wikipedia requests for a page, overlapping with the extraction and classification of the previous pages
+        item_id, base_data_instance = item
         base_search_query = base_data_instance.search_query
         base_predicted_class = base_data_instance.predicted_class
+        try:
+            if work_queue.get_counts()["retrieved"] >= NUM_DATA_FOR_ALL:
+                finish_search_query(item_id)
+                return
 
-        _, base_page = retrieve_first_wikipedia_page(search_term=base_search_query)
+            _, base_page = retrieve_first_wikipedia_page(search_term=base_search_query)
+            if base_page is None: # Cannot find page, so cannot extract info or get related pages
+                print(f"Page not found for search query: {base_search_query}")
+                finish_search_query(item_id)
+                return
 
-        if base_page is None: # Cannot find page, so cannot extract info or get related pages
-            print(f"Page not found for search query: {base_search_query}")
-            continue
+            # Different search queries can resolve to the same page, so it is only processed once per class (by any worker).
+            # The page is claimed while it is processed, and only marked as seen once its search query is completed, so
+            # the claim of a worker that crashed expires with its lease.
+            instance_id = create_instance_id(source="wikipedia", source_key=base_page.title, predicted_class=base_predicted_class)
+            page_key = f"page:{instance_id}"
+            if work_queue.is_seen(page_key) or not work_queue.claim(page_key, owner=f"{WORKER_ID}:{item_id}"):
+                print(f"Page already processed: {base_page.title} ({base_predicted_class})")
+                finish_search_query(item_id)
+                return
+
+            page_content = None
+            if USE_FULL_ARTICLE and not USE_BATCH_MODE:
+                try:
+                    page_content = retrieve_page_content(page=base_page)
+                except Exception as e:
+                    print(f"Error retrieving the full article for search query: {base_search_query} | Error: {e}")
+
+            # Find related pages from the first possible ID
+            try:
+                related_pages = retrieve_page_links(page=base_page)
+            except Exception as e:
+                print(f"Error retrieving related pages for search query: {base_search_query} | Error: {e}")
+                related_pages = []
+        except Exception:
+            finish_search_query(item_id)
+            raise
+
+        emit("extract", (item_id, base_data_instance, base_page, page_content, page_key))
+        emit("classify", (base_search_query, base_page.title, related_pages))
 
+    def extract_stage(item, emit):
+        # LLM requests for information extraction, alias generation and time interval generation
+        item_id, base_data_instance, base_page, page_content, page_key = item
+        base_search_query = base_data_instance.search_query
+        base_predicted_class = base_data_instance.predicted_class
         text = base_page.summary
         class_json_structure = CLASSES_TO_JSON_FIELDS[base_predicted_class] # The json fields for the class we are interested in
         print(class_json_structure)
-        extracted_info_json = information_extractor.execute(text=text, json_structure=class_json_structure)
-        print("JSON Answer", extracted_info_json)
-        print(base_search_query, base_predicted_class)
-        if extracted_info_json is None:
-            print("Failed to extract information.")
-            continue
 
-        # Generate the alias for the instance
-        generated_alias_json = alias_generator.execute(
-                                                text=text, 
-                                                search_query=base_search_query, 
-                                                class_hierarchy_tree=class_hierarchy_tree, 
-                                                predicted_class=base_predicted_class
-                                                )
-        print(generated_alias_json)
-        if generated_alias_json is None:
-            print("Alias generation failed.")
-            continue
-        generated_alias = generated_alias_json["alias"]
-
-        # Package the data into a single JSON object
-        class_obj_props = CLASS_PROPERTY_MAPPINGS[base_predicted_class]["object_properties"] # Info on object properties
-        json_data = {
-            "object_properties": deepcopy(class_obj_props), # Deep copy because we need to add IDs later on for each separate instance
-            "data_properties": extracted_info_json
-            }
-
-        data_instance = DataInstance(
-                                    predicted_class=base_predicted_class, 
-                                    search_query=base_search_query, 
-                                    alias=generated_alias, 
-                                    json_data=json_data
-                                    )
-        data_instance_json = data_instance.convert_to_json()
-        print(data_instance_json)
-        # Add data to the corresponding class
-        total_data_retrieved += 1
-        data_for_each_class[base_predicted_class].append(data_instance_json)
-        print(f"Num data for class: {len(data_for_each_class[base_predicted_class])}")
-
-        # Check if we need to create time interval instances
-        generated_ti_data_instances = TIIG.execute(data_instance=data_instance, page_summary=text)
+        if USE_BATCH_MODE:
+            # Extraction is deferred to the batch job for the wave (which completes the search query)
+            data_instance = DataInstance(predicted_class=base_predicted_class, search_query=base_search_query, source_key=base_page.title)
+            try:
+                with batch_lock:
+                    batch_extractor.add(
+                                        data_instance=data_instance,
+                                        text=text,
+                                        json_structure=class_json_structure,
+                                        class_hierarchy_tree=class_hierarchy_tree,
+                                        page_title=base_page.title
+                                        )
+                    batch_items[data_instance.id] = item_id
+            except Exception:
+                finish_search_query(item_id, seen_keys=[page_key])
+                raise
+            run_batch_wave(emit=emit, min_size=BATCH_WAVE_SIZE)
+            return
+
+        is_retrieved = False
+        try:
+            if USE_FULL_ARTICLE:
+                extracted_info_json = full_article_extractor.execute(summary=text, content=page_content, json_structure=class_json_structure)
+            else:
+                extracted_info_json = information_extractor.execute(text=text, json_structure=class_json_structure)
+            print("JSON Answer", extracted_info_json)
+            print(base_search_query, base_predicted_class)
+            if extracted_info_json is None:
+                print("Failed to extract information.")
+                return
+
+            # Generate the alias for the instance
+            if USE_RULE_BASED_ALIASES:
+                generated_alias_json = alias_engine.execute(
+                                                        page_title=base_page.title,
+                                                        predicted_class=base_predicted_class,
+                                                        text=text,
+                                                        search_query=base_search_query,
+                                                        class_hierarchy_tree=class_hierarchy_tree
+                                                        )
+            else:
+                generated_alias_json = alias_generator.execute(
+                                                        text=text, 
+                                                        search_query=base_search_query, 
+                                                        class_hierarchy_tree=class_hierarchy_tree, 
+                                                        predicted_class=base_predicted_class
+                                                        )
+            print(generated_alias_json)
+            if generated_alias_json is None:
+                print("Alias generation failed.")
+                return
+            generated_alias = generated_alias_json["alias"]
+
+            # Package the data into a single JSON object
+            class_obj_props = CLASS_PROPERTY_MAPPINGS[base_predicted_class]["object_properties"] # Info on object properties
+            json_data = {
+                "object_properties": ObjectPropertyLinks(schema=class_obj_props), # Only the IDs added later on are stored per instance
+                "data_properties": extracted_info_json
+                }
+
+            data_instance = DataInstance(
+                                        predicted_class=base_predicted_class, 
+                                        search_query=base_search_query, 
+                                        alias=generated_alias, 
+                                        json_data=json_data,
+                                        source_key=base_page.title
+                                        )
+            print(data_instance.convert_to_json())
+            is_retrieved = True
+
+            # Check if we need to create time interval instances (these link to the instance, so it is written afterwards)
+            generated_ti_data_instances = TIIG.execute(data_instance=data_instance, page_summary=text, page_content=page_content)
+        finally:
+            finish_search_query(item_id, is_retrieved=is_retrieved, seen_keys=[page_key])
+
+        emit("write", data_instance)
         for ti_data_instance in generated_ti_data_instances:
             # Note: Do not add to "total_data_retrieved", this does not count towards the total number of data instances we want to retrieve.
-            ti_data_instance_json = ti_data_instance.convert_to_json()
-            data_for_each_class[ti_data_instance.predicted_class].append(ti_data_instance_json)
-        
-        # Find related pages from the first possible ID and add them to the search queries
-        related_pages = base_page.links
-        num_to_search_for = max(NUM_DATA_FOR_ALL - len(search_queries) - total_data_retrieved, 0) # Limit to 0
+            emit("write", ti_data_instance)
+
+    def classify_stage(item, emit):
+        # Classify the related pages and add them to the search queries
+        base_search_query, base_page_title, related_pages = item
+        if link_filter is not None:
+            link_filter.add_relevant_titles([base_page_title]) # Pages in the frontier were classified as relevant
+        counts = work_queue.get_counts()
+        num_to_search_for = max(NUM_DATA_FOR_ALL - counts["pending"] - counts["retrieved"] - counts["leased"], 0) # Limit to 0
         print(f"Num to search for: {num_to_search_for}")
-        if num_to_search_for > 0:
-            additional_search_queries = retrieve_related_pages(
-                                                            search_query_classifier=search_query_classifier,
-                                                            related_pages=related_pages,
-                                                            num_to_search_for=num_to_search_for,
-                                                            class_hierarchy_tree=class_hierarchy_tree,
-                                                            known_classes=known_classes,
-                                                            max_retrieval_per_query=MAX_RETRIEVAL_PER_QUERY
-                                                            )
-            search_queries.extend(additional_search_queries)
-    
-    for c_class, data_for_class in data_for_each_class.items():
-        # Save all the JSON data aggregated for the class
-        save_data = {"class_name": c_class, "data": data_for_class}
-        print(f"Class: {c_class} | Num data for class: {len(data_for_class)}")
-        clean_class_name = c_class.replace(".", "_") # E.g., Thing.Composers -> Thing_Composers
-        with open(f"{DATA_DIR}/{clean_class_name}.json", "w") as f:
-            json.dump(save_data, f, indent=4)
+        if num_to_search_for == 0:
+            return
+        additional_search_queries = retrieve_related_pages(
+                                                        search_query_classifier=search_query_classifier,
+                                                        related_pages=related_pages,
+                                                        num_to_search_for=num_to_search_for,
+                                                        class_hierarchy_tree=class_hierarchy_tree,
+                                                        known_classes=known_classes,
+                                                        max_retrieval_per_query=MAX_RETRIEVAL_PER_QUERY,
+                                                        batch_size=classification_batch_size,
+                                                        link_filter=link_filter
+                                                        )
+        work_queue.add(additional_search_queries)
+
+    def write_stage(data_instance, emit):
+        data_writer.write(data_instance)
+
+    pipeline = Pipeline()
+    pipeline.add_stage("fetch", fetch_stage, num_workers=FETCH_WORKERS, max_queue_size=STAGE_QUEUE_SIZE)
+    pipeline.add_stage("extract", extract_stage, num_workers=EXTRACT_WORKERS, max_queue_size=STAGE_QUEUE_SIZE)
+    pipeline.add_stage("classify", classify_stage, num_workers=CLASSIFY_WORKERS, max_queue_size=STAGE_QUEUE_SIZE)
+    pipeline.add_stage("write", write_stage, num_workers=1, max_queue_size=STAGE_QUEUE_SIZE) # A single writer, as the files are appended to
+    pipeline.start()
+
+    while True:
+        counts = work_queue.get_counts()
+        if counts["retrieved"] >= NUM_DATA_FOR_ALL:
+            break
+        item_id, base_data_instance = None, None
+        # Only lease as many search queries as could still be needed (by all workers), so the frontier is not over-fetched
+        if counts["pending"] > 0 and counts["retrieved"] + counts["leased"] < NUM_DATA_FOR_ALL:
+            item_id, base_data_instance = work_queue.lease(worker_id=WORKER_ID) # Get the first search query
+
+        if base_data_instance is None:
+            # Wait for the pipeline (or other workers) to add search queries or finish
+            num_pending = pipeline.wait_for_progress(timeout=1.0)
+            if USE_BATCH_MODE and num_pending == 0 and len(batch_extractor) > 0:
+                run_batch_wave(emit=pipeline.submit) # The queued instances are needed before deciding whether to continue
+                continue
+            work_queue.release_expired()
+            counts = work_queue.get_counts()
+            if num_pending == 0 and counts["pending"] == 0 and counts["leased"] == 0:
+                break
+            if num_pending == 0:
+                time.sleep(1.0) # Only other workers are processing search queries
+            continue
+        print(f"Number of search queries: {counts['pending']}")
+        pipeline.submit("fetch", (item_id, base_data_instance)) # Blocks while the fetch queue is full
+
+    pipeline.join()
+    if USE_BATCH_MODE:
+        run_batch_wave(emit=pipeline.submit) # Remaining instances of the last wave
+    pipeline.stop()
+    data_writer.close()
+    if DISTRIBUTED:
+        # Merge the outputs of all workers that have finished (the last worker to finish merges all of them)
+        worker_data_dirs = [os.path.join(f"{DATA_DIR}/workers", worker_id) for worker_id in os.listdir(f"{DATA_DIR}/workers")]
+        num_data_for_each_class = merge_class_files(input_dirs=worker_data_dirs, output_dir=DATA_DIR)
+        print(f"Merged the data of {len(worker_data_dirs)} workers: {num_data_for_each_class}")
 
     data_retrieval_end_time = time.perf_counter()
     time_taken_to_retrieve_data = data_retrieval_end_time - data_retrieval_start_time
     print(f"Time taken to generate search queries: {time_taken_to_generate_search_queries:.5f} seconds")
-    print(f"Time taken to retrieve data: {time_taken_to_retrieve_data:.5f} seconds")
\ No newline at end of file
+    print(f"Time taken to retrieve data: {time_taken_to_retrieve_data:.5f} seconds")
+    pipeline.report()
+    report_endpoint_stats()
+    report_generator_stats()
+    if USE_RULE_BASED_ALIASES:
+        alias_registry.save()
+        print(f"Aliases | Rule-based: {alias_engine.num_rule_based} | LLM fallbacks: {alias_engine.num_llm_fallbacks}")
+    if USE_SEMANTIC_CACHE:
+        search_query_classifier.report()
+    if USE_LINK_FILTER:
+        link_filter.save()
+        link_filter.report()
\ No newline at end of file
@@ -3,12 +3,25 @@ from rdflib import Namespace
 
 # from scripts.musicbrainz import MusicBrainzClient # Changed to relative import
 from music_history_ontology.data_ingestion.musicbrainz.musicbrainz import MusicBrainzClient  # Reverted to original import
+from music_history_ontology.data_ingestion.musicbrainz.cache import ResponseCache
+from music_history_ontology.data_ingestion.musicbrainz.resolution import ResolutionTable
+from music_history_ontology.data_ingestion.musicbrainz.entity_sink import EntitySink, create_sink
+from music_history_ontology.data_ingestion.musicbrainz.processed_cache import ProcessedCache, hash_entity
+from music_history_ontology.data_ingestion.musicbrainz.dump import (
+    MusicBrainzDump,
+    MusicBrainzDumpClient,
+)
+from music_history_ontology.data_ingestion.resilience import SharedTokenBucket
+from music_history_ontology.data_ingestion.scheduler import TaskGraph
 from datetime import datetime
 import re
-import time  # For potential delays if needed beyond client rate limiting
-import json  # Added
+import math
+import time
+import argparse
 import os  # Added
-from typing import Optional, Dict, Any  # Added for type hinting
+import threading
+from functools import wraps
+from typing import Optional, Dict, Any, List  # Added for type hinting
 
 # --- Pydantic Models ---
 from pydantic import ValidationError
@@ -43,6 +56,23 @@ except ImportError:
 # ONTOLOGY_FILE = "history_of_music_ontology.rdf" # No longer reading ontology file
 # OUTPUT_FILE = "history_of_music_ontology.rdf" # No longer writing ontology file
 DATA_DIR = "generated_data/musicbrainz"  # Directory to store JSON files
+ENTITY_SINK_TYPE = "jsonl"  # How the entities are written: "jsonl" (one file per type), "sqlite" or "directory" (one file per entity)
+PROCESSED_CACHE_PATH = f"{DATA_DIR}/processed.db"  # Entities saved (identifier -> content hash), shared across runs for --resume
+PROCESSED_CACHE_MEMORY_ENTRIES = 10000  # Entries of the processed cache kept in memory
+RESPONSE_CACHE_PATH = f"{DATA_DIR}/response_cache.db"  # On-disk cache of API responses (None to disable)
+OFFLINE_MODE = False  # Only replay cached responses, making no requests to the API
+RESOLUTION_TABLE_PATH = f"{DATA_DIR}/resolution.db"  # Names resolved to MBIDs, shared across runs (None to disable)
+RATE_LIMIT_PATH = f"{DATA_DIR}/rate_limit.json"  # Token bucket shared by all processes making requests to the API
+REQUESTS_PER_SECOND = 1.0  # Total across all processes
+RATE_LIMIT_BURST = 1.0  # The largest burst of requests allowed after idling
+BROWSE_LIMIT = 100  # The number of entities per browse request (the maximum allowed by the API)
+NUM_WORKERS = 4  # Worker threads processing entities while others wait for the API (1 to process sequentially)
+# Local MusicBrainz JSON dump files to read instead of the API, e.g., ["dumps/artist.tar.xz", "dumps/release.tar.xz"]
+MUSICBRAINZ_DUMP_PATHS = None
+DUMP_ENTITY_TYPES_TO_PROCESS = None  # Process every entity of these types in the dumps (e.g., ["artist"]), None for the lists below
+DUMP_TAGS = None  # Only process the dump entities with one of these tags/genres, e.g., ["jazz"] (None for all)
+DUMP_ARTISTS = None  # Only process the dump entities by (or being) one of these artists, names or MBIDs (None for all)
+NUM_DUMP_INDEX_WORKERS = None  # Processes indexing the dump files in parallel (None for one per CPU)
 BASE_URI = "http://www.semanticweb.org/lianmatsuo/ontologies/2025/2/history_of_music#"  # Still useful for context
 MB_BASE_URI = "http://musicbrainz.org/"
 
@@ -150,10 +180,86 @@ ALBUMS_TEST = [
 ]
 
 # --- Global Cache/State ---
-# Simple cache to avoid reprocessing the exact same entity (by identifier) in one run
-PROCESSED_CACHE: Dict[
-    str, BaseEntity
-] = {}  # Store identifier -> Pydantic model instance
+# Persistent cache to avoid reprocessing the exact same entity (by identifier) in one run, or in the run
+# being resumed (see ProcessedCache)
+PROCESSED_CACHE: Optional[ProcessedCache] = None
+RESUME = False  # Set by --resume
+PROCESSED_CACHE_LOCK = threading.Lock()
+SAVING = set()  # The identifiers of the entities being saved
+# Identifier -> event set once the task processing the entity finishes, so that other tasks wait for it
+IN_PROGRESS: Dict[str, threading.Event] = {}
+CLAIMS = threading.local()  # The identifiers claimed by the current thread
+
+
+def claim_entity(identifier: str) -> bool:
+    """
+    Claims an entity for processing by the current task. Returns False if it was already processed,
+    waiting first if another task is processing it (and claiming it if that task failed).
+    """
+    while True:
+        with PROCESSED_CACHE_LOCK:
+            if identifier in PROCESSED_CACHE:
+                return False
+            event = IN_PROGRESS.get(identifier)
+            if event is None:
+                IN_PROGRESS[identifier] = threading.Event()
+                if not hasattr(CLAIMS, "identifiers"):
+                    CLAIMS.identifiers = []
+                CLAIMS.identifiers.append(identifier)
+                return True
+            if identifier in getattr(CLAIMS, "identifiers", []):
+                return False  # Claimed further up the current task
+        event.wait()
+
+
+def releases_claims(func):
+    """Releases the entities claimed during a call of a process_* function once it returns."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not hasattr(CLAIMS, "identifiers"):
+            CLAIMS.identifiers = []
+        num_claims = len(CLAIMS.identifiers)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            while len(CLAIMS.identifiers) > num_claims:
+                identifier = CLAIMS.identifiers.pop()
+                with PROCESSED_CACHE_LOCK:
+                    event = IN_PROGRESS.pop(identifier)
+                event.set()
+
+    return wrapper
+
+# Persistent (entity type, normalized name) -> MBID/identifier table, checked before searching
+RESOLUTION_TABLE: Optional[ResolutionTable] = None
+# Destination of the saved entities (see ENTITY_SINK_TYPE)
+ENTITY_SINK: Optional[EntitySink] = None
+
+
+def resolve_name(entity_type: str, name: str) -> Optional[Dict[str, Any]]:
+    """Returns the resolution of a name resolved before (in this or a previous run), or None."""
+    if RESOLUTION_TABLE is None:
+        return None
+    return RESOLUTION_TABLE.get(entity_type, name)
+
+
+def record_resolution(
+    entity_type: str,
+    name: str,
+    identifier: str,
+    mbid: Optional[str] = None,
+    mb_name: Optional[str] = None,
+    search_result: Optional[Dict[str, Any]] = None,
+):
+    """Records the resolution of a name, so that later searches for it are skipped."""
+    if RESOLUTION_TABLE is not None:
+        RESOLUTION_TABLE.set(entity_type, name, identifier, mbid, mb_name, search_result)
+
+
+# Artist MBID -> MB artist type (Person / Group), so that each credited artist is looked up once
+ARTIST_TYPES: Dict[str, Optional[str]] = {}
+
 
 # --- Helper Functions ---
 
@@ -223,7 +329,7 @@ def parse_mb_date(date_str: Optional[str]) -> Optional[str]:
 
 # Modified save_entity to accept Pydantic model
 def save_entity(entity_instance: BaseEntity):
-    """Saves a Pydantic entity model instance to a JSON file."""
+    """Saves a Pydantic entity model instance to the entity sink."""
     global PROCESSED_CACHE
     if (
         not entity_instance
@@ -236,35 +342,35 @@ def save_entity(entity_instance: BaseEntity):
     identifier = entity_instance.identifier
     entity_type = entity_instance.entity_type
 
-    # Check cache before saving
-    if identifier in PROCESSED_CACHE:
-        # Optionally compare if existing data is different? For now, assume first pass is good.
-        # print(f"  -> Entity {identifier} already processed/saved in this run. Skipping duplicate save.")
-        return
-
-    dir_path = os.path.join(DATA_DIR, entity_type)
-    filename = f"{identifier}.json"
-    filepath = os.path.join(dir_path, filename)
+    # Check cache before saving (and mark it as being saved, so that concurrent tasks do not save it twice)
+    with PROCESSED_CACHE_LOCK:
+        if identifier in PROCESSED_CACHE or identifier in SAVING:
+            # Optionally compare if existing data is different? For now, assume first pass is good.
+            # print(f"  -> Entity {identifier} already processed/saved in this run. Skipping duplicate save.")
+            return
+        SAVING.add(identifier)
 
     try:
-        os.makedirs(dir_path, exist_ok=True)
         # Dump model to dict, excluding None values and fields that weren't explicitly set
         # Use mode='json' to ensure complex types (like HttpUrl if used) are serialized correctly
         entity_dict = entity_instance.model_dump(
             mode="json", exclude_none=True, exclude_unset=True
         )
+        content_hash = hash_entity(entity_dict)
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(entity_dict, f, indent=2, ensure_ascii=False)
-        # print(f"  -> Saved {entity_type}: {identifier} to {filepath}")
-
-        # Add to cache after successful save
-        PROCESSED_CACHE[identifier] = entity_instance
+        # When resuming, entities already saved with the same content are not written again
+        if not (RESUME and PROCESSED_CACHE.is_saved(identifier, content_hash)):
+            ENTITY_SINK.write(entity_type, identifier, entity_dict)
+            # print(f"  -> Saved {entity_type}: {identifier}")
+        PROCESSED_CACHE.add(identifier, entity_type, content_hash)  # Only successfully saved entities are cached
 
     except ValidationError as ve:
         print(f"Error validating {entity_type} {identifier} before saving: {ve}")
     except Exception as e:
-        print(f"Error saving {entity_type} {identifier} to {filepath}: {e}")
+        print(f"Error saving {entity_type} {identifier}: {e}")
+    finally:
+        with PROCESSED_CACHE_LOCK:
+            SAVING.discard(identifier)
 
 
 def create_and_save_time_interval(
@@ -425,13 +531,19 @@ def process_label(label_data: Dict[str, Any]) -> Optional[str]:
 # --- Processing Functions (Refactored with Pydantic) ---
 
 
+@releases_claims
 def process_artist(
-    client: MusicBrainzClient, name: str, is_ensemble: bool
+    client: MusicBrainzClient,
+    name: str,
+    is_ensemble: bool,
+    search_result: Optional[Dict[str, Any]] = None,
 ) -> Optional[str]:
     """
     Searches for an artist/ensemble, fetches details, builds Pydantic model,
     saves related entities (Place, Country, Genre, Membership, TimeInterval),
     and saves the main artist/ensemble JSON. Returns the identifier.
+    The search is skipped if the artist was already resolved (search_result), e.g., an artist of the dumps,
+    which may share its name with a more prominent artist.
     """
     global PROCESSED_CACHE
     print(f"Processing Artist/Ensemble: {name}...")
@@ -440,15 +552,27 @@ def process_artist(
     hom_entity_type = "MusicEnsemble" if is_ensemble else "Musician"
     model_class = MusicEnsemble if is_ensemble else Musician
 
-    # --- Initial Search ---
-    search_results = search_func(name, limit=1)
-    time.sleep(0.1)  # Small delay
+    # --- Resolve Name (before any request) ---
+    resolution = resolve_name(hom_entity_type, name) if search_result is None else None
+    if resolution is not None and resolution["identifier"] in PROCESSED_CACHE:
+        print(
+            f"  -> Already processed {hom_entity_type} {resolution['mb_name']} ({resolution['identifier']}). Skipping."
+        )
+        return resolution["identifier"]
 
-    if not search_results or not search_results.get(mb_entity_type + "s"):
-        print(f"  -> Could not find {name} on MusicBrainz.")
-        return None
+    if search_result is not None:
+        entity_data_mb = search_result
+    elif resolution is not None:
+        entity_data_mb = resolution["search_result"]
+    else:
+        # --- Initial Search ---
+        search_results = search_func(name, limit=1)
+
+        if not search_results or not search_results.get(mb_entity_type + "s"):
+            print(f"  -> Could not find {name} on MusicBrainz.")
+            return None
+        entity_data_mb = search_results[mb_entity_type + "s"][0]
 
-    entity_data_mb = search_results[mb_entity_type + "s"][0]
     mbid = entity_data_mb.get("id")
     mb_name = entity_data_mb.get("name")
     if not mbid:
@@ -456,10 +580,12 @@ def process_artist(
         return None
 
     identifier = create_identifier(hom_entity_type, mb_name, mbid)
+    if resolution is None and search_result is None:  # The name may resolve to another entity
+        record_resolution(hom_entity_type, name, identifier, mbid, mb_name, entity_data_mb)
     # Removed: mb_uri = get_mb_uri(mb_entity_type, mbid)
 
     # --- Check Cache ---
-    if identifier in PROCESSED_CACHE:
+    if not claim_entity(identifier):
         print(
             f"  -> Already processed {hom_entity_type} {mb_name} ({identifier}). Skipping."
         )
@@ -488,7 +614,6 @@ def process_artist(
     # Request relations, tags, area, urls etc.
     inc_params = ["artist-rels", "tags", "area-rels", "place-rels", "url-rels"]
     details = client.lookup_artist(mbid, inc=inc_params)
-    time.sleep(0.1)
 
     if not details:
         print(
@@ -678,25 +803,39 @@ def process_artist(
         return None
 
 
-def process_instrument(client: MusicBrainzClient, name: str) -> Optional[str]:
-    """Searches for instrument, fetches details, builds Pydantic model, saves JSON, returns identifier."""
+@releases_claims
+def process_instrument(
+    client: MusicBrainzClient, name: str, search_result: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """
+    Searches for instrument, fetches details, builds Pydantic model, saves JSON, returns identifier.
+    The search is skipped if the instrument was already resolved (search_result).
+    """
     global PROCESSED_CACHE
     print(f"Processing Instrument: {name}...")
     hom_entity_type = "Instrument"
     model_class = Instrument
 
-    # Check cache based on name first (MBID lookup needed)
-    # temp_identifier = create_identifier(hom_entity_type, name)
-    # if temp_identifier in PROCESSED_CACHE: return temp_identifier # Risky if name collision
+    # Check cache based on the resolved name first (MBID lookup needed)
+    resolution = resolve_name(hom_entity_type, name) if search_result is None else None
+    if resolution is not None and resolution["identifier"] in PROCESSED_CACHE:
+        print(
+            f"  -> Already processed {hom_entity_type} {resolution['mb_name']} ({resolution['identifier']}). Skipping."
+        )
+        return resolution["identifier"]
 
-    search_results = client.search_instrument(name, limit=1)
-    time.sleep(0.1)
+    if search_result is not None:
+        instr_data_mb = search_result
+    elif resolution is not None:
+        instr_data_mb = resolution["search_result"]
+    else:
+        search_results = client.search_instrument(name, limit=1)
 
-    if not search_results or not search_results.get("instruments"):
-        print(f"  -> Could not find {name} on MusicBrainz.")
-        return None
+        if not search_results or not search_results.get("instruments"):
+            print(f"  -> Could not find {name} on MusicBrainz.")
+            return None
+        instr_data_mb = search_results["instruments"][0]
 
-    instr_data_mb = search_results["instruments"][0]
     mbid = instr_data_mb.get("id")
     mb_name = instr_data_mb.get("name")
     if not mbid:
@@ -704,10 +843,12 @@ def process_instrument(client: MusicBrainzClient, name: str) -> Optional[str]:
         return None  # Need MBID for reliable processing
 
     identifier = create_identifier(hom_entity_type, mb_name, mbid)
+    if resolution is None and search_result is None:
+        record_resolution(hom_entity_type, name, identifier, mbid, mb_name, instr_data_mb)
     # Removed: mb_uri = get_mb_uri('instrument', mbid)
 
     # Check cache with proper identifier
-    if identifier in PROCESSED_CACHE:
+    if not claim_entity(identifier):
         print(
             f"  -> Already processed {hom_entity_type} {mb_name} ({identifier}). Skipping."
         )
@@ -727,7 +868,6 @@ def process_instrument(client: MusicBrainzClient, name: str) -> Optional[str]:
     # Fetch details
     # Include 'artist-rels' for inventor? Yes, mapping: wasInventedBy (Agent)
     details = client.lookup_instrument(mbid, inc=["tags", "artist-rels", "url-rels"])
-    time.sleep(0.1)
 
     if not details:
         print(
@@ -805,6 +945,7 @@ def process_instrument(client: MusicBrainzClient, name: str) -> Optional[str]:
         return None
 
 
+@releases_claims
 def process_genre(client: MusicBrainzClient, name: str) -> Optional[str]:
     """Creates or finds genre entity, saves JSON using Pydantic model. Searches MB tag."""
     global PROCESSED_CACHE
@@ -813,33 +954,45 @@ def process_genre(client: MusicBrainzClient, name: str) -> Optional[str]:
     model_class = MusicGenre
 
     # --- Check Cache/Existing File ---
-    # Need MBID for reliable ID. Search MB first.
+    # Need MBID for reliable ID. Use the resolved name, or search MB first.
     mbid_found = None
 
-    print(f"  -> Searching MusicBrainz tag: {name}...")
-    search_results = client.search_genre(name, limit=1)  # Search MB 'tag' endpoint
-    time.sleep(0.1)
-
-    if search_results and search_results.get("tags"):
-        tag_data = search_results["tags"][0]
-        # Basic name match check (case-insensitive)
-        if tag_data.get("name", "").lower() == name.lower():
-            mbid_found = tag_data.get("id")  # This is the tag UUID
-            mb_name_found = tag_data.get("name")
-            if mbid_found:
-                print(f"  -> Found MB tag: {mb_name_found} (ID: {mbid_found})")
+    resolution = resolve_name(hom_entity_type, name)
+    if resolution is not None:
+        mbid_found = resolution["mbid"]
+    else:
+        print(f"  -> Searching MusicBrainz tag: {name}...")
+        search_results = client.search_genre(name, limit=1)  # Search MB 'tag' endpoint
+
+        if search_results and search_results.get("tags"):
+            tag_data = search_results["tags"][0]
+            # Basic name match check (case-insensitive)
+            if tag_data.get("name", "").lower() == name.lower():
+                mbid_found = tag_data.get("id")  # This is the tag UUID
+                mb_name_found = tag_data.get("name")
+                if mbid_found:
+                    print(f"  -> Found MB tag: {mb_name_found} (ID: {mbid_found})")
+            else:
+                print(
+                    f"  -> Found tag '{tag_data.get('name')}', but name mismatch. Treating as non-MB genre."
+                )
         else:
-            print(
-                f"  -> Found tag '{tag_data.get('name')}', but name mismatch. Treating as non-MB genre."
+            print("  -> No matching tag found on MusicBrainz.")
+
+        if search_results is not None:  # Not resolved if the request failed
+            record_resolution(
+                hom_entity_type,
+                name,
+                create_identifier(hom_entity_type, name, mbid_found),
+                mbid_found,
+                name,
             )
-    else:
-        print("  -> No matching tag found on MusicBrainz.")
 
     # --- Create Identifier & Check Cache ---
     # Use name for identifier if no MBID found
     identifier = create_identifier(hom_entity_type, name, mbid_found)
 
-    if identifier in PROCESSED_CACHE:
+    if not claim_entity(identifier):
         print(
             f"  -> Already processed {hom_entity_type} {name} ({identifier}). Skipping."
         )
@@ -869,6 +1022,52 @@ def process_genre(client: MusicBrainzClient, name: str) -> Optional[str]:
         return None
 
 
+def get_artist_type(
+    client: MusicBrainzClient, artist_info: Dict[str, Any]
+) -> Optional[str]:
+    """
+    Returns the type (Person / Group) of a credited artist, from the artist credit if it includes it,
+    otherwise from a lookup made once per artist.
+    """
+    artist_mbid = artist_info.get("id")
+    if artist_info.get("type"):
+        ARTIST_TYPES[artist_mbid] = artist_info["type"]
+    if artist_mbid not in ARTIST_TYPES:
+        artist_details = client.lookup_artist(artist_mbid, inc=[])  # No inc needed, just type
+        if artist_details is None:
+            return None  # Not remembered, so that the lookup is retried
+        ARTIST_TYPES[artist_mbid] = artist_details.get("type")
+    return ARTIST_TYPES[artist_mbid]
+
+
+def fetch_releases(
+    client: MusicBrainzClient, rg_mbid: str, release_mbids: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetches releases of a release group with their recordings and artist credits by browsing the
+    releases of the group (100 per request), instead of looking up each release. Browsing stops
+    once all the releases were found, or after as many pages as the releases could fill (the browse
+    order differs from the order of the releases), and releases that were not found are not returned
+    (so that they are looked up instead).
+    """
+    releases = {}
+    max_pages = math.ceil(len(set(release_mbids)) / BROWSE_LIMIT)
+    for release in client.iter_browse(
+        "release",
+        "release-group",
+        rg_mbid,
+        inc=["recordings", "artist-credits"],
+        limit=BROWSE_LIMIT,
+        max_pages=max_pages,
+    ):
+        if release.get("id") in release_mbids:
+            releases[release["id"]] = release
+            if len(releases) == len(set(release_mbids)):
+                break
+    return releases
+
+
+@releases_claims
 def process_recording(
     client: MusicBrainzClient,
     recording_data_mb: Dict[str, Any],
@@ -890,7 +1089,7 @@ def process_recording(
     # Removed: mb_uri = get_mb_uri('recording', mbid)
 
     # Check cache
-    if identifier in PROCESSED_CACHE:
+    if not claim_entity(identifier):
         # print(f"    -> Already processed Recording {mb_title} ({identifier}). Skipping.")
         return identifier
 
@@ -921,13 +1120,7 @@ def process_recording(
                     print(
                         f"      -> Processing artist credit: {artist_name_rec} ({artist_mbid_rec})"
                     )
-                    artist_details_rec = client.lookup_artist(
-                        artist_mbid_rec, inc=[]
-                    )  # No inc needed, just type
-                    time.sleep(0.1)  # Rate limit
-                    artist_type_rec = (
-                        artist_details_rec.get("type") if artist_details_rec else None
-                    )
+                    artist_type_rec = get_artist_type(client, artist_info)
                     if artist_type_rec:
                         is_ensemble_rec = artist_type_rec == "Group"
                         artist_id_rec = process_artist(
@@ -963,13 +1156,20 @@ def process_recording(
         return None
 
 
+@releases_claims
 def process_release(
-    client: MusicBrainzClient, title: str, artist_name: str, release_type: str
+    client: MusicBrainzClient,
+    title: str,
+    artist_name: str,
+    release_type: str,
+    search_result: Optional[Dict[str, Any]] = None,
 ) -> Optional[str]:
     """
     Searches for a release (album/single), fetches details (incl. recordings),
     builds Pydantic model, saves related (Artist, Genre, Recording, Country, Label),
     saves JSON, returns identifier.
+    The search is skipped if the release group was already resolved (search_result), in which case
+    its primary artist is taken from its artist credit rather than searched for by name.
     """
     global PROCESSED_CACHE
     print(f"\nProcessing {release_type.capitalize()}: {title} by {artist_name}...")
@@ -980,19 +1180,21 @@ def process_release(
     model_class = MODEL_MAP[hom_entity_type]
 
     # --- Search Release Group ---
-    # Search MB release-group endpoint
-    search_results = client.search_release_group(
-        title, artist_name=artist_name, limit=1, type=release_type
-    )
-    time.sleep(0.1)
-
-    if not search_results or not search_results.get("release-groups"):
-        print(
-            f"  -> Could not find Release Group for {title} by {artist_name} on MusicBrainz."
+    if search_result is not None:
+        rg_data = search_result
+    else:
+        # Search MB release-group endpoint
+        search_results = client.search_release_group(
+            title, artist_name=artist_name, limit=1, type=release_type
         )
-        return None
 
-    rg_data = search_results["release-groups"][0]
+        if not search_results or not search_results.get("release-groups"):
+            print(
+                f"  -> Could not find Release Group for {title} by {artist_name} on MusicBrainz."
+            )
+            return None
+
+        rg_data = search_results["release-groups"][0]
     rg_mbid = rg_data.get("id")  # Release Group MBID
     rg_title = rg_data.get("title")
     primary_type_mb = rg_data.get("primary-type")  # Album, Single, EP etc. from MB
@@ -1005,7 +1207,7 @@ def process_release(
     # Removed: rg_mb_uri = get_mb_uri('release-group', rg_mbid)
 
     # --- Check Cache ---
-    if identifier in PROCESSED_CACHE:
+    if not claim_entity(identifier):
         print(
             f"  -> Already processed {hom_entity_type} {rg_title} ({identifier}). Skipping."
         )
@@ -1039,7 +1241,10 @@ def process_release(
             is_ensemble_artist = artist_type_mb == "Group"
             # Process the primary artist using MB data
             primary_artist_id = process_artist(
-                client, artist_name_mb, is_ensemble=is_ensemble_artist
+                client,
+                artist_name_mb,
+                is_ensemble=is_ensemble_artist,
+                search_result=primary_artist_mb_info if search_result is not None else None,
             )
     else:
         # Fallback: try processing using the input artist_name (requires guessing type)
@@ -1073,7 +1278,6 @@ def process_release(
     ]  # Include releases, artist credits, tags for the group
 
     details = client.lookup_release_group(rg_mbid, inc=inc_params)
-    time.sleep(0.1)
 
     if not details:
         print(
@@ -1119,7 +1323,13 @@ def process_release(
 
     if releases_mb:
         print(
-            f"  -> Found {len(releases_mb)} specific releases. Querying each for recordings & details (up to 5)... "
+            f"  -> Found {len(releases_mb)} specific releases. Fetching recordings & details (up to 5)... "
+        )
+        # Fetch the recordings of the releases in bulk, releases missing from the results are looked up
+        releases_with_recordings = fetch_releases(
+            client,
+            rg_mbid,
+            [release.get("id") for release in releases_mb[:5] if release.get("id")],
         )
 
         for release_specific_mb in releases_mb[:5]:  # Limit API calls
@@ -1184,10 +1394,11 @@ def process_release(
             # --- 2. Fetch recordings for THIS specific release ---
             print(f"    -> Fetching recordings for release: {release_mbid_spec}...")
             try:
-                release_details = client.lookup_release(
-                    release_mbid_spec, inc=["recordings", "artist-credits"]
-                )  # Include necessary fields
-                time.sleep(0.1)
+                release_details = releases_with_recordings.get(release_mbid_spec)
+                if release_details is None:
+                    release_details = client.lookup_release(
+                        release_mbid_spec, inc=["recordings", "artist-credits"]
+                    )  # Include necessary fields
                 if release_details:
                     recordings_list_spec = release_details.get("media", [])
                     if recordings_list_spec:
@@ -1240,21 +1451,38 @@ def process_release(
         return None
 
 
-def process_event(client: MusicBrainzClient, name: str) -> Optional[str]:
-    """Searches for performance event, fetches details, builds Pydantic model, saves JSON, returns identifier."""
+@releases_claims
+def process_event(
+    client: MusicBrainzClient, name: str, search_result: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """
+    Searches for performance event, fetches details, builds Pydantic model, saves JSON, returns identifier.
+    The search is skipped if the event was already resolved (search_result).
+    """
     global PROCESSED_CACHE
     print(f"Processing Event: {name}...")
     hom_entity_type = "PerformanceEvent"
     model_class = PerformanceEvent
 
-    search_results = client.search_event(name, limit=1)
-    time.sleep(0.1)
+    resolution = resolve_name(hom_entity_type, name) if search_result is None else None
+    if resolution is not None and resolution["identifier"] in PROCESSED_CACHE:
+        print(
+            f"  -> Already processed {hom_entity_type} {resolution['mb_name']} ({resolution['identifier']}). Skipping."
+        )
+        return resolution["identifier"]
 
-    if not search_results or not search_results.get("events"):
-        print(f"  -> Could not find event {name} on MusicBrainz.")
-        return None
+    if search_result is not None:
+        event_data_mb = search_result
+    elif resolution is not None:
+        event_data_mb = resolution["search_result"]
+    else:
+        search_results = client.search_event(name, limit=1)
+
+        if not search_results or not search_results.get("events"):
+            print(f"  -> Could not find event {name} on MusicBrainz.")
+            return None
+        event_data_mb = search_results["events"][0]
 
-    event_data_mb = search_results["events"][0]
     mbid = event_data_mb.get("id")
     mb_name = event_data_mb.get("name")
     event_type_mb = event_data_mb.get("type")  # Concert, Festival etc.
@@ -1264,10 +1492,12 @@ def process_event(client: MusicBrainzClient, name: str) -> Optional[str]:
         return None
 
     identifier = create_identifier(hom_entity_type, mb_name, mbid)
+    if resolution is None and search_result is None:
+        record_resolution(hom_entity_type, name, identifier, mbid, mb_name, event_data_mb)
     # Removed: mb_uri = get_mb_uri('event', mbid)
 
     # Check cache
-    if identifier in PROCESSED_CACHE:
+    if not claim_entity(identifier):
         print(
             f"  -> Already processed {hom_entity_type} {mb_name} ({identifier}). Skipping."
         )
@@ -1288,7 +1518,6 @@ def process_event(client: MusicBrainzClient, name: str) -> Optional[str]:
 
     # Fetch details
     details = client.lookup_event(mbid, inc=["place-rels", "artist-rels", "url-rels"])
-    time.sleep(0.1)
 
     if not details:
         print(
@@ -1391,8 +1620,61 @@ def process_event(client: MusicBrainzClient, name: str) -> Optional[str]:
         return None
 
 
+def add_dump_tasks(graph: TaskGraph, client: MusicBrainzDumpClient, dump: MusicBrainzDump):
+    """
+    Adds a task for each entity of DUMP_ENTITY_TYPES_TO_PROCESS in the dumps (with one of DUMP_TAGS
+    and by one of DUMP_ARTISTS, if set), processed by the same functions as the entities searched
+    for on the API. Each entity is passed as its own search result, so entities sharing a name with
+    a more prominent one are processed too (rather than resolved to it).
+    """
+    for entity_type in DUMP_ENTITY_TYPES_TO_PROCESS:
+        entities = dump.iter_entities(entity_type, tags=DUMP_TAGS, artists=DUMP_ARTISTS)
+        for entity in entities:
+            mbid = entity["id"]
+            if entity_type == "artist":
+                graph.add_task(
+                    ("artist", mbid),
+                    process_artist,
+                    client,
+                    entity["name"],
+                    entity.get("type") == "Group",
+                    entity,
+                )
+            elif entity_type == "release-group":
+                release_type = entity.get("primary-type")
+                artist_credit = entity.get("artist-credit") or []
+                if release_type not in ("Album", "Single") or not artist_credit:
+                    continue  # Only albums and singles are modelled
+                artist = artist_credit[0]["artist"]
+                graph.add_task(
+                    ("release-group", mbid),
+                    process_release,
+                    client,
+                    entity["title"],
+                    artist["name"],
+                    release_type,
+                    entity,
+                    dependencies=[("artist", artist["id"])],  # Release needs artist
+                )
+            elif entity_type in ("instrument", "event"):
+                process_func = process_instrument if entity_type == "instrument" else process_event
+                graph.add_task((entity_type, mbid), process_func, client, entity["name"], entity)
+            else:
+                print(f"Processing {entity_type} entities from the dumps is not supported.")
+                break
+    print(f"Added {len(graph.tasks)} tasks from the dumps")
+
+
 # --- Main Execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates the JSON files of the entities from MusicBrainz.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last run (e.g., after it was interrupted), skipping the entities it already saved.",
+    )
+    RESUME = parser.parse_args().resume
+
     start_time = time.time()
     print("Starting JSON generation process...")
     print(f"Output directory: {DATA_DIR}")
@@ -1400,16 +1682,42 @@ if __name__ == "__main__":
     # Ensure base data directory exists
     os.makedirs(DATA_DIR, exist_ok=True)
 
-    # Clear cache at the start of each run
-    PROCESSED_CACHE.clear()
+    # Start a new run (or continue the last one) of the cache
+    ARTIST_TYPES.clear()
+    if RESOLUTION_TABLE_PATH is not None:
+        RESOLUTION_TABLE = ResolutionTable(db_path=RESOLUTION_TABLE_PATH)
+    ENTITY_SINK = create_sink(ENTITY_SINK_TYPE, DATA_DIR)
+    PROCESSED_CACHE = ProcessedCache(
+        db_path=PROCESSED_CACHE_PATH,
+        resume=RESUME,
+        max_memory_entries=PROCESSED_CACHE_MEMORY_ENTRIES,
+        before_commit=ENTITY_SINK.flush,  # Entities are only recorded as saved once written
+    )
+    print(f"{'Resuming' if RESUME else 'Starting'} run {PROCESSED_CACHE.run_id}")
 
     # --- Initialize MusicBrainz Client ---
     # TODO: Replace with actual contact email
-    client = MusicBrainzClient(
-        app_name="MusicHistoryJSONGenerator",
-        app_version="0.2",
-        contact="user@example.com",
-    )
+    response_cache = None
+    dump = None
+    if MUSICBRAINZ_DUMP_PATHS is not None:
+        dump = MusicBrainzDump(
+            MUSICBRAINZ_DUMP_PATHS,
+            index_dir=f"{DATA_DIR}/dump_index",
+            num_index_workers=NUM_DUMP_INDEX_WORKERS,
+        )
+        client = MusicBrainzDumpClient(dump)  # Same requests, answered from the dumps
+    else:
+        if RESPONSE_CACHE_PATH is not None:
+            response_cache = ResponseCache(db_path=RESPONSE_CACHE_PATH, offline=OFFLINE_MODE)
+        client = MusicBrainzClient(
+            app_name="MusicHistoryJSONGenerator",
+            app_version="0.2",
+            contact="user@example.com",
+            cache=response_cache,
+            rate_limiter=SharedTokenBucket(
+                RATE_LIMIT_PATH, rate=REQUESTS_PER_SECOND, capacity=RATE_LIMIT_BURST
+            ),
+        )
 
     # --- Define Data to Process ---
     # Using the TEST lists defined at the top
@@ -1439,44 +1747,69 @@ if __name__ == "__main__":
     )
 
     # --- Process Entities ---
+    # Each entity is a task of a graph, started once the tasks it depends on have finished (e.g., a release
+    # after its artist), so that local work overlaps with the rate-limited requests of other tasks.
+    # Entities reached from several tasks (e.g., members, genres) are only processed once (see claim_entity).
+    print(f"\n--- Processing Entities ({NUM_WORKERS} workers) ---")
+    graph = TaskGraph(num_workers=NUM_WORKERS)
+    if dump is not None and DUMP_ENTITY_TYPES_TO_PROCESS is not None:
+        # Catalogue scale: every matching entity of the dumps instead of the lists
+        all_artists_mentioned = {}
+        instruments_to_process = genres_to_process = events_to_process = []
+        albums_to_process = singles_to_process = []
+        add_dump_tasks(graph, client, dump)
 
-    print("\n--- Processing Artists (Musicians & Ensembles) ---")
-    # Process known artists first
     for name, is_ensemble in all_artists_mentioned.items():
         # process_artist handles cache check internally now
-        process_artist(client, name, is_ensemble=is_ensemble)
+        graph.add_task(("artist", name), process_artist, client, name, is_ensemble)
 
-    # Note: Artists needed for releases/events might be re-processed if lookup finds
-    # MBID where previous attempt failed, or if more details are found. This is okay,
-    # save_entity overwrites the JSON with the more complete data.
-
-    print("\n--- Processing Instruments ---")
     for name in instruments_to_process:
-        process_instrument(client, name)
+        graph.add_task(("instrument", name), process_instrument, client, name)
 
-    print("\n--- Processing Music Genres ---")
     for name in genres_to_process:
-        process_genre(client, name)
-
-    print("\n--- Processing Albums ---")
-    for title, artist_name in albums_to_process:
-        process_release(
-            client, title, artist_name, release_type="Album"
-        )  # Use correct case
-
-    print("\n--- Processing Singles ---")
-    for title, artist_name in singles_to_process:
-        process_release(
-            client, title, artist_name, release_type="Single"
-        )  # Use correct case
+        graph.add_task(("genre", name), process_genre, client, name)
+
+    for release_type, releases in [
+        ("Album", albums_to_process),
+        ("Single", singles_to_process),
+    ]:  # Use correct case
+        for title, artist_name in releases:
+            graph.add_task(
+                (release_type, title, artist_name),
+                process_release,
+                client,
+                title,
+                artist_name,
+                release_type,
+                dependencies=[("artist", artist_name)],  # Release needs artist
+            )
 
-    print("\n--- Processing Performance Events ---")
     for name in events_to_process:
-        process_event(client, name)
+        graph.add_task(("event", name), process_event, client, name)
+
+    try:
+        graph.run()
+    finally:
+        PROCESSED_CACHE.commit()  # Also when interrupted, so that the run can be resumed
 
     # --- Completion ---
     end_time = time.time()
     print("\n--- JSON Generation Complete ---")
     print(f"Data saved in '{DATA_DIR}' directory.")
     print(f"Total entities processed/saved in this run: {len(PROCESSED_CACHE)}")
+    print(f"Entities written ({ENTITY_SINK.name}): {ENTITY_SINK.num_written}")
+    print(
+        f"Requests made to the API: {client.num_network_requests} "
+        f"(waited {client.rate_limit_wait:.2f} seconds for the rate limit)"
+    )
+    if response_cache is not None:
+        response_cache.report()
+    if RESOLUTION_TABLE is not None:
+        RESOLUTION_TABLE.report()
+    PROCESSED_CACHE.report()
+    PROCESSED_CACHE.close()
+    ENTITY_SINK.close()
+    if dump is not None:
+        dump.close()
+    graph.report()
     print(f"Total time: {end_time - start_time:.2f} seconds")
\ No newline at end of file
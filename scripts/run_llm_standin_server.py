@@ -0,0 +1,30 @@
+import set_path
+import argparse
+from music_history_ontology.data_ingestion.wikipedia.standin_server import StandInServer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the local LLM stand-in server for offline load testing of the Wikipedia ingestion pipeline.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-mean", type=float, default=0.5, help="Mean simulated latency of a completion (seconds)")
+    parser.add_argument("--latency-jitter", type=float, default=0.2, help="Maximum deviation from the mean latency (seconds)")
+    parser.add_argument("--requests-per-second", type=float, default=None, help="Simulated rate limit (no limit if not set)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of completions returned as malformed JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    server = StandInServer(
+                        server_address=(args.host, args.port),
+                        latency_mean=args.latency_mean,
+                        latency_jitter=args.latency_jitter,
+                        requests_per_second=args.requests_per_second,
+                        malformed_rate=args.malformed_rate,
+                        seed=args.seed,
+                        )
+    print(f"LLM stand-in server listening on http://{args.host}:{args.port}")
+    print(f"Use it with: LLM_BACKEND=standin LLM_STANDIN_URL=http://{args.host}:{args.port} python scripts/fetch_wikipedia_data.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Stats: {server.stats}")
+        server.server_close()